@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Sign-in helper for the functional test scripts
+Every API route except /health, / and /auth/* needs a bearer token, so the
+scripts sign in before their first request. TEST_USERNAME / TEST_PASSWORD
+pick the account (registered on first use); without them each run gets a
+fresh throwaway account, so runs never see each other's data.
+"""
+
+import os
+import uuid
+
+import requests
+
+
+def sign_in(base_url, username=None, password=None):
+    """Register (or, if the name is taken, log in) and return the token response"""
+    username = username or os.environ.get("TEST_USERNAME") or f"tester-{uuid.uuid4().hex[:10]}"
+    password = password or os.environ.get("TEST_PASSWORD", "test-password-123")
+    credentials = {"username": username, "password": password}
+    response = requests.post(f"{base_url}/auth/register", json=credentials)
+    if response.status_code == 409:
+        response = requests.post(f"{base_url}/auth/login", json=credentials)
+    response.raise_for_status()
+    return response.json()
+
+
+def auth_headers(base_url, username=None, password=None):
+    """Authorization header for the account"""
+    return {"Authorization": f"Bearer {sign_in(base_url, username, password)['access_token']}"}
@@ -1,28 +1,142 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Query, Depends
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import Response, StreamingResponse, JSONResponse, PlainTextResponse
+from fastapi.routing import APIRoute
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
+import asyncio
+import socket
+import time
+import contextvars
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional, Literal, Dict, Any
+from pydantic import BaseModel, Field, ValidationError
+from pymongo import UpdateOne, ReplaceOne
+from pymongo import ReturnDocument
+from pymongo import read_preferences
+from pymongo.read_concern import ReadConcern
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo import monitoring
+from typing import List, Optional, Literal, Dict, Any, Type, Tuple, NamedTuple, Iterator, Union, Annotated
 import uuid
-from datetime import datetime, timezone, date, time as dtime
+import tempfile
+import calendar
+import functools
+import itertools
+import multiprocessing
+import csv
+import codecs
+import zlib
+import orjson
+import secrets
+import jwt
+from passlib.context import CryptContext
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone, date, timedelta, time as dtime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from urllib.parse import unquote
+
+# Optional response codecs; gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# ---- Request profiling ----
+# ProfilingMiddleware puts a RequestProfile into this context var for each
+# request. Motor copies the context into its executor threads, so the pymongo
+# command listener below attributes round trips to the request that issued them.
+
+class RequestProfile:
+    __slots__ = ("mongo_calls", "mongo_seconds", "serialize_seconds", "endpoint_done")
+
+    def __init__(self):
+        self.mongo_calls = 0
+        self.mongo_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.endpoint_done: Optional[float] = None  # perf_counter() when the endpoint function returned
+
+_request_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("request_profile", default=None)
+
+def profile_serialize(seconds: float):
+    prof = _request_profile.get()
+    if prof:
+        prof.serialize_seconds += seconds
+
+class MongoCommandTimer(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event.duration_micros)
+
+    def failed(self, event):
+        self._record(event.duration_micros)
+
+    @staticmethod
+    def _record(micros: int):
+        prof = _request_profile.get()
+        if prof:
+            prof.mongo_calls += 1
+            prof.mongo_seconds += micros / 1e6
+
+def mark_endpoint_done():
+    prof = _request_profile.get()
+    if prof:
+        prof.endpoint_done = time.perf_counter()
+
+class ProfiledRoute(APIRoute):
+    """Charges what happens after the endpoint returns (response_model
+    validation, jsonable_encoder, rendering the body) to the request profile"""
+
+    def get_route_handler(self):
+        call = self.dependant.call
+        if asyncio.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def timed_call(*args, **kwargs):
+                result = await call(*args, **kwargs)
+                mark_endpoint_done()
+                return result
+        else:
+            @functools.wraps(call)
+            def timed_call(*args, **kwargs):
+                result = call(*args, **kwargs)
+                mark_endpoint_done()
+                return result
+        self.dependant.call = timed_call
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request: Request) -> Response:
+            response = await handler(request)
+            prof = _request_profile.get()
+            if prof and prof.endpoint_done is not None:
+                profile_serialize(time.perf_counter() - prof.endpoint_done)
+                prof.endpoint_done = None
+            return response
+
+        return profiled_handler
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandTimer()])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
 app = FastAPI()
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=ProfiledRoute)
 
 # --- Constants ---
 RANK_XP: Dict[str, int] = {
@@ -35,6 +149,130 @@ RANK_XP: Dict[str, int] = {
 STATUS_OPTIONS = ["Pending", "In Progress", "Completed", "Incomplete"]
 FREQUENCY_OPTIONS = ["Daily", "Weekly", "Weekdays", "Monthly", "Annual"]
 
+# Authentication: HS256 bearer tokens. Without JWT_SECRET each process makes up
+# its own secret, so tokens don't survive a restart or work across replicas.
+JWT_SECRET = os.environ.get('JWT_SECRET') or secrets.token_urlsafe(32)
+JWT_ALGORITHM = 'HS256'
+JWT_EXPIRE_MINUTES = int(os.environ.get('JWT_EXPIRE_MINUTES', str(7 * 24 * 60)))
+# Users whose closed-day XP stats stay cached in this process (least recently used go first)
+XP_CACHE_USERS = int(os.environ.get('XP_CACHE_USERS', '1000'))
+# Stored alongside every per-user document but never returned to clients
+DOC_PROJECTION = {"_id": 0, "user_id": 0}
+
+# Documents per cursor batch / response chunk on streamed list endpoints
+JSON_STREAM_BATCH = 1000
+EXPORT_BATCH = int(os.environ.get('EXPORT_BATCH', '2000'))
+IMPORT_BATCH = int(os.environ.get('IMPORT_BATCH', '1000'))
+IMPORT_MAX_ERRORS = 1000  # per-row errors echoed back; the rest are only counted
+IMPORT_CSV_MAX_RECORD_LINES = 1000  # a quoted CSV cell may span lines, up to this many
+ANALYTICS_MAX_DAYS = 3660
+PREVIEW_MAX_DATES = 100
+# Largest "every N days/weeks/months/years" a recurring rule accepts
+RECURRING_MAX_INTERVAL = 365
+# Units per redemption request (one reward's quantity, or a whole cart)
+REDEEM_MAX_QUANTITY = int(os.environ.get('REDEEM_MAX_QUANTITY', '100'))
+# Multi-document writes run in a transaction when the deployment supports
+# them (replica set / mongos); standalone servers fall back to plain writes
+MONGO_TRANSACTIONS = os.environ.get('MONGO_TRANSACTIONS', '1') not in ('0', 'false', 'False')
+
+# Read routing: staleness-tolerant routes may be served by secondaries, at most
+# READ_MAX_STALENESS seconds behind the primary (MongoDB's minimum is 90).
+# Per route class: READ_PREFERENCE_<ROUTE> (primary, primaryPreferred,
+# secondary, secondaryPreferred, nearest) and READ_CONCERN_<ROUTE> (local,
+# available, majority). Everything else, including every read a write depends
+# on (redeem's balance check, complete), goes to the primary.
+READ_MAX_STALENESS = int(os.environ.get('READ_MAX_STALENESS', '90'))
+READ_ROUTES = ("history", "analytics", "export")
+ROUTE_READ_PREFERENCE = {
+    route: os.environ.get(f'READ_PREFERENCE_{route.upper()}', 'secondaryPreferred') for route in READ_ROUTES
+}
+ROUTE_READ_CONCERN = {
+    route: os.environ.get(f'READ_CONCERN_{route.upper()}', 'majority') for route in READ_ROUTES
+}
+
+# XP ledger: a balance snapshot is written every LEDGER_SNAPSHOT_EVERY entries,
+# so a balance read scans at most that many entries
+LEDGER_SNAPSHOT_EVERY = int(os.environ.get('LEDGER_SNAPSHOT_EVERY', '1000'))
+LEDGER_MIGRATE_BATCH = 1000
+
+# History archival: completions/redemptions older than this move to HistoryArchive
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '365'))
+ARCHIVE_PART_ROWS = int(os.environ.get('ARCHIVE_PART_ROWS', '5000'))
+
+# Profiling: latency histogram buckets (seconds); Server-Timing is opt-in since it
+# exposes backend timings to every client
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '0') in ('1', 'true', 'True')
+# /api/metrics shows every route's traffic: it answers only to this bearer
+# token (Prometheus' bearer_token), and is off when it isn't set
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Response compression: bodies below COMPRESS_MIN_SIZE bytes go out as-is; chunks
+# above COMPRESS_THREAD_MIN are compressed off the event loop
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_THREAD_MIN = 256 * 1024
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '4'))
+ZSTD_LEVEL = int(os.environ.get('ZSTD_LEVEL', '3'))
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# Background jobs
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', '2'))
+JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', '300'))
+JOB_MAX_ATTEMPTS = 3
+JOB_SPOOL_DIR = os.environ.get('JOB_SPOOL_DIR') or tempfile.gettempdir()
+
+# In-process recurring generation schedule (local wall-clock time in RECURRING_TZ)
+RECURRING_SCHEDULER = os.environ.get('RECURRING_SCHEDULER', '1') not in ('0', 'false', 'False')
+RECURRING_RUN_AT = os.environ.get('RECURRING_RUN_AT', '00:05')  # HH:MM
+RECURRING_TZ = os.environ.get('RECURRING_TZ', 'UTC')
+RECURRING_LEASE_SECONDS = int(os.environ.get('RECURRING_LEASE_SECONDS', '600'))
+RECURRING_SCHEDULER_POLL = int(os.environ.get('RECURRING_SCHEDULER_POLL', '300'))
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+# Rule evaluation across a process pool (1 = evaluate in the event loop process)
+RECURRING_WORKERS = int(os.environ.get('RECURRING_WORKERS', '1'))
+RECURRING_PARALLEL_MIN_RULES = int(os.environ.get('RECURRING_PARALLEL_MIN_RULES', '2000'))
+
+# ---- Read routing ----
+READ_PREFERENCE_MODES = {
+    "primary": read_preferences.Primary,
+    "primaryPreferred": read_preferences.PrimaryPreferred,
+    "secondary": read_preferences.Secondary,
+    "secondaryPreferred": read_preferences.SecondaryPreferred,
+    "nearest": read_preferences.Nearest,
+}
+
+def route_read_options(route: str) -> Dict[str, Any]:
+    mode = ROUTE_READ_PREFERENCE[route]
+    if mode not in READ_PREFERENCE_MODES:
+        raise ValueError(f"READ_PREFERENCE_{route.upper()}: unknown read preference {mode!r}")
+    pref = read_preferences.Primary() if mode == "primary" else READ_PREFERENCE_MODES[mode](max_staleness=READ_MAX_STALENESS)
+    return {"read_preference": pref, "read_concern": ReadConcern(ROUTE_READ_CONCERN[route])}
+
+# validated once at import: a typo in the environment should stop the server, not one route
+ROUTE_READ_OPTIONS = {route: route_read_options(route) for route in READ_ROUTES}
+
+def reader(route: Optional[str] = None):
+    """The database as seen by `route`'s reads; None is the primary (default) view"""
+    if route is None:
+        return db
+    return db.client.get_database(db.name, **ROUTE_READ_OPTIONS[route])
+
+def reads_may_lag(route: Optional[str]) -> bool:
+    return route is not None and ROUTE_READ_PREFERENCE[route] != "primary"
+
+async def start_read_session(route: Optional[str]):
+    """Causally consistent session for several reads through `route`: once one
+    query has seen a write, later ones can't be served by a member that hasn't.
+    None when reads go to the primary anyway, or without session support."""
+    if not reads_may_lag(route):
+        return None
+    try:
+        return await db.client.start_session(causal_consistency=True)
+    except NotImplementedError:
+        return None
+
 # --- Models ---
 class Category(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -66,7 +304,7 @@ class ActiveQuestCreate(BaseModel):
     is_event: Optional[bool] = False  # distinguishes events from tasks
 
 class ActiveQuest(ActiveQuestCreate):
-    pass
+    occurrence_key: Optional[str] = None  # "<recurring_id>:<date>" on generated quests, unique per user
 
 class ActiveQuestUpdate(BaseModel):
     quest_name: Optional[str] = None
@@ -86,6 +324,7 @@ class CompletedQuest(BaseModel):
     quest_rank: Literal['Common', 'Rare', 'Epic', 'Legendary']
     xp_earned: int
     date_completed: datetime  # UTC
+    category_id: Optional[str] = None  # copied from the quest, for per-category rollups
 
 class RewardStoreItem(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -95,6 +334,10 @@ class RewardStoreItem(BaseModel):
 class RewardRedeemInput(BaseModel):
     reward_id: Optional[str] = None
     reward_name: Optional[str] = None  # allow direct name in case of future flexibility
+    quantity: int = Field(1, ge=1, le=REDEEM_MAX_QUANTITY)
+
+class RewardCartInput(BaseModel):
+    items: List[RewardRedeemInput] = Field(..., min_length=1)
 
 class RewardLogItem(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -110,6 +353,13 @@ class RewardInventoryItem(BaseModel):
     used: bool = False
     used_at: Optional[datetime] = None
 
+class RewardInventoryGroup(BaseModel):
+    reward_name: str
+    count: int
+    next_id: str  # oldest unused item, the one to use next
+    first_redeemed: datetime
+    last_redeemed: datetime
+
 class RecurringTask(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     task_name: str
@@ -118,7 +368,7 @@ class RecurringTask(BaseModel):
     days: Optional[str] = None  # e.g., "Mon, Fri" for Weekly
     monthly_on_date: Optional[int] = None  # 1..31 for Monthly (by date)
     # Custom support
-    interval: Optional[int] = 1  # every N units
+    interval: Optional[int] = Field(1, ge=1, le=RECURRING_MAX_INTERVAL)  # every N units
     monthly_mode: Optional[Literal['date','weekday']] = None
     monthly_week_index: Optional[int] = None  # 1..5 or -1 for last
     monthly_weekday: Optional[str] = None  # 'Mon'..'Sun'
@@ -130,14 +380,34 @@ class RecurringTask(BaseModel):
     # Presentation/creation hints
     category_id: Optional[str] = None
     is_event: Optional[bool] = None
+    timezone: Optional[str] = None  # IANA zone the rule's days are counted in; None = RECURRING_TZ
 
     status: Literal['Pending', 'In Progress', 'Completed', 'Incomplete'] = 'Pending'
     last_added: Optional[date] = None
+    next_due: Optional[date] = None  # precomputed by rule_next_due; None = never due again
+
+class ActiveQuestWithRecurrence(ActiveQuest):
+    recurrence: Optional[RecurringTask] = None  # embedded with ?include=recurrence
 
 class RulesDoc(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     content: str
 
+class UserCredentials(BaseModel):
+    username: str = Field(..., min_length=3, max_length=64)
+    password: str = Field(..., min_length=8, max_length=256)
+
+class AuthToken(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    user_id: str
+    username: str
+
+class UserInfo(BaseModel):
+    id: str
+    username: str
+    created_at: datetime
+
 # --- Helpers ---
 def serialize_dates_for_mongo(data: dict) -> dict:
     """Convert date objects to ISO strings for MongoDB storage"""
@@ -147,39 +417,304 @@ def serialize_dates_for_mongo(data: dict) -> dict:
             result[key] = value.isoformat()
     return result
 
-async def seed_reward_store_if_empty():
-    count = await db.RewardStore.count_documents({})
-    if count == 0:
-        defaults = [
-            {"reward_name": "1 Hour of Movie", "xp_cost": 100},
-            {"reward_name": "$1 Credit", "xp_cost": 25},
-            {"reward_name": "1 Hour of Gaming", "xp_cost": 100},
-            {"reward_name": "1 Hour of Scrolling", "xp_cost": 100},
-        ]
-        for item in defaults:
-            await db.RewardStore.insert_one(RewardStoreItem(**item).dict())
-
-async def compute_xp_summary() -> Dict[str, int]:
-    # Total earned from CompletedQuests
-    earned_cur = db.CompletedQuests.find({}, {"xp_earned": 1, "_id": 0})
-    total_earned = 0
-    async for doc in earned_cur:
-        total_earned += int(doc.get("xp_earned", 0))
-
-    # Total spent from RewardLog
-    spent_cur = db.RewardLog.find({}, {"xp_cost": 1, "_id": 0})
-    total_spent = 0
-    async for doc in spent_cur:
-        total_spent += int(doc.get("xp_cost", 0))
-
-    return {"total_earned": total_earned, "total_spent": total_spent, "balance": total_earned - total_spent}
-
-async def get_reward_by_identifier(reward_id: Optional[str], reward_name: Optional[str]) -> Optional[Dict[str, Any]]:
-    if reward_id:
-        return await db.RewardStore.find_one({"id": reward_id})
-    if reward_name:
-        return await db.RewardStore.find_one({"reward_name": reward_name})
-    return None
+_STORED_DEFAULTS: Dict[Type[BaseModel], Dict[str, Any]] = {}
+
+def stored_defaults(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Static field defaults of a model, used to fill keys missing from older documents"""
+    defaults = _STORED_DEFAULTS.get(model)
+    if defaults is None:
+        defaults = {
+            name: field.default
+            for name, field in model.model_fields.items()
+            if not field.is_required() and field.default_factory is None
+        }
+        _STORED_DEFAULTS[model] = defaults
+    return defaults
+
+async def iter_json_array(cursor, model: Type[BaseModel], enrich=None):
+    """Yield a JSON array of cursor documents in orjson-encoded chunks.
+
+    Documents were validated through `model` when written, so they are only
+    padded with the model's defaults instead of being rebuilt per request.
+    `enrich`, if given, is awaited with each batch of documents before encoding
+    (used to embed related documents with one query per batch).
+    """
+    defaults = stored_defaults(model)
+    yield b"["
+    first = True
+    batch: List[Dict[str, Any]] = []
+
+    async def encode(docs: List[Dict[str, Any]]) -> bytes:
+        if enrich:
+            await enrich(docs)
+        t0 = time.perf_counter()
+        chunk = (b"" if first else b",") + b",".join(orjson.dumps(doc) for doc in docs)
+        profile_serialize(time.perf_counter() - t0)
+        return chunk
+
+    async for doc in cursor:
+        for key, value in defaults.items():
+            doc.setdefault(key, value)
+        batch.append(doc)
+        if len(batch) >= JSON_STREAM_BATCH:
+            yield await encode(batch)
+            first = False
+            batch = []
+    if batch:
+        yield await encode(batch)
+    yield b"]"
+
+def stream_json_list(cursor, model: Type[BaseModel], enrich=None) -> StreamingResponse:
+    """Fast path for list endpoints: skips response_model revalidation (the
+    route's response_model still documents the schema in OpenAPI)."""
+    return StreamingResponse(
+        iter_json_array(cursor.batch_size(JSON_STREAM_BATCH), model, enrich),
+        media_type="application/json",
+    )
+
+async def seed_reward_store_if_empty(user_id: str):
+    if await db.RewardStore.find_one({"user_id": user_id}, {"_id": 1}):
+        return
+    defaults = [
+        {"reward_name": "1 Hour of Movie", "xp_cost": 100},
+        {"reward_name": "$1 Credit", "xp_cost": 25},
+        {"reward_name": "1 Hour of Gaming", "xp_cost": 100},
+        {"reward_name": "1 Hour of Scrolling", "xp_cost": 100},
+    ]
+    await db.RewardStore.insert_many([{"user_id": user_id, **RewardStoreItem(**item).dict()} for item in defaults])
+
+# ---- XP ledger ----
+# XpLedger is the single append-only record of XP movements, one document per
+# completion or redemption: {user_id, seq, kind: quest|reward, amount (signed
+# XP), at, ...the CompletedQuest / RewardLogItem fields}. seq numbers each
+# user's entries 1, 2, 3... in append order. XpSnapshots holds {user_id, seq,
+# earned, spent, balance, at}: the totals over the entries up to seq, written
+# every LEDGER_SNAPSHOT_EVERY entries. "CompletedQuests" and "RewardLog" remain
+# the names the list, export, import and archive endpoints use for the two kinds.
+
+# logical collection -> (kind, xp field, sign of the amount)
+LEDGER_KINDS: Dict[str, Tuple[str, str, int]] = {
+    "CompletedQuests": ("quest", "xp_earned", 1),
+    "RewardLog": ("reward", "xp_cost", -1),
+}
+LEDGER_PROJECTION = {"_id": 0, "user_id": 0, "seq": 0, "kind": 0, "amount": 0, "at": 0}
+
+def ledger_entry(collection: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """The ledger entry recording a CompletedQuest / RewardLogItem document"""
+    kind, xp_field, sign = LEDGER_KINDS[collection]
+    time_field, _ = EXPORT_COLLECTIONS[collection]
+    return {"kind": kind, "amount": sign * int(doc[xp_field]), "at": doc[time_field], **doc}
+
+async def last_ledger_seq(user_id: str, session=None) -> int:
+    doc = await db.XpLedger.find_one({"user_id": user_id}, {"_id": 0, "seq": 1}, sort=[("seq", -1)], session=session)
+    return doc["seq"] if doc else 0
+
+async def append_ledger(user_id: str, entries: List[Dict[str, Any]], session=None) -> int:
+    """Append entries under the user's next seq numbers; returns the last seq.
+
+    Concurrent appends race for the same numbers on the unique (user_id, seq)
+    index: the loser keeps what it inserted and retries the rest after the
+    winner's entries. In a transaction the race surfaces as a write conflict
+    instead, which with_transaction retries. Outside one, a snapshot is
+    written when the append crosses a LEDGER_SNAPSHOT_EVERY boundary."""
+    pending = list(entries)
+    first = seq = await last_ledger_seq(user_id, session)
+    while pending:
+        docs = [{"user_id": user_id, "seq": seq + i + 1, **entry} for i, entry in enumerate(pending)]
+        try:
+            await db.XpLedger.insert_many(docs, ordered=True, session=session)
+            seq += len(docs)
+            break
+        except BulkWriteError as e:
+            if session is not None or any(we.get("code") != 11000 for we in e.details.get("writeErrors", [])):
+                raise
+            pending = pending[e.details.get("nInserted", 0):]
+            seq = await last_ledger_seq(user_id)
+    if session is None and first // LEDGER_SNAPSHOT_EVERY != seq // LEDGER_SNAPSHOT_EVERY:
+        await snapshot_ledger(user_id)
+    return seq
+
+async def latest_ledger_snapshot(user_id: str, upto: Optional[int] = None, session=None) -> Dict[str, Any]:
+    query: Dict[str, Any] = {"user_id": user_id}
+    if upto is not None:
+        query["seq"] = {"$lte": upto}
+    doc = await db.XpSnapshots.find_one(query, {"_id": 0, "seq": 1, "earned": 1, "spent": 1}, sort=[("seq", -1)], session=session)
+    return doc or {"seq": 0, "earned": 0, "spent": 0}
+
+async def ledger_balance(user_id: str, upto: Optional[int] = None, session=None) -> Dict[str, int]:
+    """Totals over the user's ledger up to seq `upto` (default: all of it):
+    the latest snapshot plus a scan of the entries after it.
+
+    Archival only removes entries a snapshot already covers, so any `upto`
+    at or after the latest snapshot is exact."""
+    snapshot = await latest_ledger_snapshot(user_id, upto, session)
+    earned, spent = int(snapshot["earned"]), int(snapshot["spent"])
+    seq: Dict[str, Any] = {"$gt": snapshot["seq"]}
+    if upto is not None:
+        seq["$lte"] = upto
+    async for row in db.XpLedger.aggregate([
+        {"$match": {"user_id": user_id, "seq": seq}},
+        {"$group": {
+            "_id": None,
+            "earned": {"$sum": {"$cond": [{"$gt": ["$amount", 0]}, "$amount", 0]}},
+            "spent": {"$sum": {"$cond": [{"$lt": ["$amount", 0]}, {"$subtract": [0, "$amount"]}, 0]}},
+        }},
+    ], session=session):
+        earned += int(row["earned"])
+        spent += int(row["spent"])
+    return {"total_earned": earned, "total_spent": spent, "balance": earned - spent}
+
+async def snapshot_ledger(user_id: str, force: bool = False) -> int:
+    """Snapshot the user's ledger at the last LEDGER_SNAPSHOT_EVERY boundary
+    it has passed, or with `force` at its last entry; returns the seq of the
+    latest snapshot. Replicas computing the same snapshot write identical
+    documents, so the first insert wins and the rest are no-ops."""
+    last = await last_ledger_seq(user_id)
+    target = last if force else last - last % LEDGER_SNAPSHOT_EVERY
+    covered = (await latest_ledger_snapshot(user_id))["seq"]
+    if target <= covered:
+        return covered
+    totals = await ledger_balance(user_id, target)
+    await db.XpSnapshots.update_one(
+        {"user_id": user_id, "seq": target},
+        {"$setOnInsert": {
+            "earned": totals["total_earned"],
+            "spent": totals["total_spent"],
+            "balance": totals["balance"],
+            "at": datetime.now(timezone.utc),
+        }},
+        upsert=True,
+    )
+    return target
+
+async def merge_by_time(left, right, key):
+    """Merge two async iterators that are each sorted by key(doc)"""
+    a = await anext(left, None)
+    b = await anext(right, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and key(a) <= key(b)):
+            yield a
+            a = await anext(left, None)
+        else:
+            yield b
+            b = await anext(right, None)
+
+async def move_to_ledger(owner: Optional[str], batch: List[Tuple[str, Dict[str, Any]]]) -> int:
+    """Append (collection, doc) pairs to the owner's ledger, then delete the originals"""
+    ids = [doc["id"] for _, doc in batch]
+    # appended by an earlier run that stopped before deleting them
+    done = set(await db.XpLedger.distinct("id", {"user_id": owner, "id": {"$in": ids}}))
+    entries = [ledger_entry(collection, doc) for collection, doc in batch if doc["id"] not in done]
+    if entries:
+        await append_ledger(owner, entries)
+    for name in LEDGER_KINDS:
+        await db[name].delete_many({"user_id": owner, "id": {"$in": [doc["id"] for c, doc in batch if c == name]}})
+    return len(entries)
+
+async def migrate_history_to_ledger():
+    """Move CompletedQuests/RewardLog documents written before the ledger into
+    it, oldest first, per owner (None: data from before accounts).
+
+    Entries are appended before their originals are deleted, and originals
+    whose id is already in the ledger are not appended again, so an
+    interrupted migration resumes where it stopped. The retired collections
+    are dropped once empty."""
+    legacy = [name for name in LEDGER_KINDS if await db[name].find_one({}, {"_id": 1})]
+    if not legacy:
+        return
+    lease = "ledger-migration"
+    if not await acquire_lease(lease, "v1", RECURRING_LEASE_SECONDS):
+        logger.info("History is being moved into the XP ledger by another instance")
+        return
+    done = False
+    try:
+        owners = set()
+        for name in legacy:
+            owners.update(await db[name].distinct("user_id"))
+            if await db[name].find_one({"user_id": None}, {"_id": 1}):
+                owners.add(None)
+        for owner in owners:
+            def stream(name):
+                time_field, _ = EXPORT_COLLECTIONS[name]
+                cur = db[name].find({"user_id": owner}, DOC_PROJECTION).sort(time_field, 1)
+                return ((name, doc) async for doc in cur.batch_size(LEDGER_MIGRATE_BATCH))
+
+            moved = 0
+            batch: List[Tuple[str, Dict[str, Any]]] = []
+            async for item in merge_by_time(stream("CompletedQuests"), stream("RewardLog"),
+                                            lambda item: item[1][EXPORT_COLLECTIONS[item[0]][0]]):
+                batch.append(item)
+                if len(batch) >= LEDGER_MIGRATE_BATCH:
+                    moved += await move_to_ledger(owner, batch)
+                    batch = []
+            if batch:
+                moved += await move_to_ledger(owner, batch)
+            logger.info("Moved %d history documents of %s into the XP ledger", moved, owner)
+        for name in legacy:
+            if not await db[name].find_one({}, {"_id": 1}):
+                await db[name].drop()
+        done = True
+    finally:
+        await release_lease(lease, "v1", done)
+
+async def run_in_transaction(fn):
+    """Await fn(session) in a transaction; with_transaction retries it on
+    transient errors such as write conflicts. Without transaction support
+    (standalone server, MONGO_TRANSACTIONS=0) fn(None) runs once, unwrapped."""
+    global MONGO_TRANSACTIONS
+    if MONGO_TRANSACTIONS:
+        try:
+            async with await client.start_session() as session:
+                return await session.with_transaction(fn)
+        except (NotImplementedError, OperationFailure) as e:
+            # 20 IllegalOperation: "Transaction numbers are only allowed on a replica set member or mongos"
+            if isinstance(e, OperationFailure) and e.code != 20:
+                raise
+            logger.warning("MongoDB transactions unavailable, writing without them: %s", e)
+            MONGO_TRANSACTIONS = False
+    return await fn(None)
+
+# ---- Authentication ----
+# Users: {id, username, password_hash, created_at}. Every other per-user
+# document carries its owner's user_id and every query filters on it.
+pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# Collections of per-user documents; the first account claims any that predate users
+TENANT_COLLECTIONS = [
+    "ActiveQuests", "Categories", "XpLedger", "XpSnapshots", "RewardStore", "RewardInventory",
+    "Recurringtasks", "Rules", "XpDailyRollups", "HistoryArchive", "ArchiveState",
+]
+
+def issue_token(user: Dict[str, Any]) -> AuthToken:
+    now = datetime.now(timezone.utc)
+    claims = {"sub": user["id"], "name": user["username"], "iat": now, "exp": now + timedelta(minutes=JWT_EXPIRE_MINUTES)}
+    return AuthToken(
+        access_token=jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM),
+        user_id=user["id"],
+        username=user["username"],
+    )
+
+async def current_user_id(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> str:
+    """Owner of the request, taken from the bearer token without a database lookup"""
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        claims = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    return claims["sub"]
+
+CurrentUser = Annotated[str, Depends(current_user_id)]
+
+async def claim_unowned_data(user_id: str) -> Dict[str, int]:
+    """Hand documents written before multi-user support to `user_id`"""
+    claimed: Dict[str, int] = {}
+    for name in TENANT_COLLECTIONS:
+        res = await db[name].update_many({"user_id": None}, {"$set": {"user_id": user_id}})
+        if res.modified_count:
+            claimed[name] = res.modified_count
+    return claimed
 
 # --- Routes ---
 @api_router.get("/")
@@ -190,16 +725,51 @@ async def root():
 async def health():
     return {"ok": True}
 
+# Accounts
+@api_router.post("/auth/register", response_model=AuthToken, status_code=201)
+async def register(body: UserCredentials):
+    user = {
+        "id": str(uuid.uuid4()),
+        "username": body.username.strip().lower(),
+        # hashing is deliberately slow: keep it off the event loop
+        "password_hash": await asyncio.to_thread(pwd_context.hash, body.password),
+        "created_at": datetime.now(timezone.utc),
+    }
+    try:
+        await db.Users.insert_one(dict(user))
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Username already taken")
+    first = await db.Users.find_one({}, {"_id": 0, "id": 1}, sort=[("created_at", 1)])
+    if first and first["id"] == user["id"]:
+        claimed = await claim_unowned_data(user["id"])
+        if claimed:
+            logger.info("First account %s claimed existing data: %s", user["username"], claimed)
+    return issue_token(user)
+
+@api_router.post("/auth/login", response_model=AuthToken)
+async def login(body: UserCredentials):
+    user = await db.Users.find_one({"username": body.username.strip().lower()}, {"_id": 0})
+    if not user or not await asyncio.to_thread(pwd_context.verify, body.password, user["password_hash"]):
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+    return issue_token(user)
+
+@api_router.get("/auth/me", response_model=UserInfo)
+async def get_me(user_id: CurrentUser):
+    doc = await db.Users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+    if not doc:
+        raise HTTPException(status_code=401, detail="Unknown user", headers={"WWW-Authenticate": "Bearer"})
+    return UserInfo(**doc)
+
 # Categories CRUD
 @api_router.get("/categories", response_model=List[Category])
-async def list_categories():
-    cur = db.Categories.find({}, {"_id": 0}).sort("name", 1)
+async def list_categories(user_id: CurrentUser):
+    cur = db.Categories.find({"user_id": user_id}, DOC_PROJECTION).sort("name", 1)
     return [Category(**doc) async for doc in cur]
 
 @api_router.post("/categories", response_model=Category)
-async def create_category(body: CategoryCreate):
+async def create_category(body: CategoryCreate, user_id: CurrentUser):
     # Allow idempotent by name if needed: if exists with same name, return it
-    existing = await db.Categories.find_one({"name": body.name}, {"_id": 0})
+    existing = await db.Categories.find_one({"user_id": user_id, "name": body.name}, DOC_PROJECTION)
     if existing:
         # optionally update color/active if provided
         updates = {}
@@ -208,52 +778,109 @@ async def create_category(body: CategoryCreate):
         if body.active is not None and existing.get("active") != body.active:
             updates["active"] = body.active
         if updates:
-            await db.Categories.update_one({"id": existing["id"]}, {"$set": updates})
-            existing = await db.Categories.find_one({"id": existing["id"]}, {"_id": 0})
+            await db.Categories.update_one({"user_id": user_id, "id": existing["id"]}, {"$set": updates})
+            existing = await db.Categories.find_one({"user_id": user_id, "id": existing["id"]}, DOC_PROJECTION)
         return Category(**existing)
     cat = Category(name=body.name, color=body.color, active=bool(body.active))
-    await db.Categories.insert_one(cat.dict())
+    await db.Categories.insert_one({"user_id": user_id, **cat.dict()})
     return cat
 
 @api_router.patch("/categories/{category_id}", response_model=Category)
-async def patch_category(category_id: str, body: CategoryUpdate):
-    doc = await db.Categories.find_one({"id": category_id})
+async def patch_category(category_id: str, body: CategoryUpdate, user_id: CurrentUser):
+    doc = await db.Categories.find_one({"user_id": user_id, "id": category_id})
     if not doc:
         raise HTTPException(status_code=404, detail="Category not found")
     update = {k: v for k, v in body.dict(exclude_unset=True).items() if v is not None}
     if update:
-        await db.Categories.update_one({"id": category_id}, {"$set": update})
-    updated = await db.Categories.find_one({"id": category_id}, {"_id": 0})
+        await db.Categories.update_one({"user_id": user_id, "id": category_id}, {"$set": update})
+    updated = await db.Categories.find_one({"user_id": user_id, "id": category_id}, DOC_PROJECTION)
     return Category(**updated)
 
 @api_router.delete("/categories/{category_id}")
-async def delete_category(category_id: str):
-    # Unlink category from tasks first (idempotent)
-    await db.ActiveQuests.update_many({"category_id": category_id}, {"$set": {"category_id": None}})
-    res = await db.Categories.delete_one({"id": category_id})
+async def delete_category(category_id: str, user_id: CurrentUser, wait: bool = False):
+    res = await db.Categories.delete_one({"user_id": user_id, "id": category_id})
     if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
-    return {"ok": True}
+    # Unlinking quests touches every quest in the category: run it as a job unless asked to wait
+    if wait:
+        await unlink_category(user_id, category_id)
+        return {"ok": True}
+    job = await enqueue_job("unlink_category", {"category_id": category_id}, user_id)
+    return job_accepted(job, ok=True)
+
+async def unlink_category(user_id: str, category_id: str, report=None) -> Dict[str, int]:
+    res = await db.ActiveQuests.update_many({"user_id": user_id, "category_id": category_id}, {"$set": {"category_id": None}})
+    if report:
+        await report(res.modified_count, res.modified_count)
+    return {"unlinked": res.modified_count}
 
 # ActiveQuests CRUD
-@api_router.get("/quests/active", response_model=List[ActiveQuest])
-async def list_active_quests():
-    cur = db.ActiveQuests.find({}, {"_id": 0})
-    return [ActiveQuest(**doc) async for doc in cur]
+async def embed_recurrences(user_id: str, quests: List[Dict[str, Any]]):
+    """Attach each quest's recurring rule as `recurrence`, one $in query per batch"""
+    rec_ids = list({q["recurring_id"] for q in quests if q.get("recurring_id")})
+    rules: Dict[str, Dict[str, Any]] = {}
+    if rec_ids:
+        async for rule in db.Recurringtasks.find({"user_id": user_id, "id": {"$in": rec_ids}}, DOC_PROJECTION):
+            rules[rule["id"]] = rule
+    for q in quests:
+        q["recurrence"] = rules.get(q.get("recurring_id"))
+
+def quest_includes(include: Optional[str]) -> set:
+    parts = {p.strip() for p in (include or "").split(",") if p.strip()}
+    unknown = parts - {"recurrence"}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(unknown))}")
+    return parts
+
+@api_router.get("/quests/active", response_model=List[ActiveQuestWithRecurrence])
+async def list_active_quests(user_id: CurrentUser, include: Optional[str] = None):
+    cur = db.ActiveQuests.find({"user_id": user_id}, DOC_PROJECTION)
+    if "recurrence" in quest_includes(include):
+        return stream_json_list(cur, ActiveQuest, functools.partial(embed_recurrences, user_id))
+    return stream_json_list(cur, ActiveQuest)
+
+async def find_quest_with_recurrence(user_id: str, quest_id: str) -> Optional[Dict[str, Any]]:
+    """Quest plus its recurring rule (or None) in one $lookup round trip"""
+    pipeline = [
+        {"$match": {"user_id": user_id, "id": quest_id}},
+        {"$limit": 1},
+        {"$lookup": {"from": "Recurringtasks", "localField": "recurring_id", "foreignField": "id", "as": "recurrence"}},
+        {"$project": {"_id": 0, "user_id": 0, "recurrence._id": 0}},
+    ]
+    async for doc in db.ActiveQuests.aggregate(pipeline):
+        # a quest without recurring_id matches rules lacking an id field, and recurring_id
+        # is client-settable: only trust a real link to one of the user's own rules
+        rules = [r for r in doc.get("recurrence") or [] if r.pop("user_id", None) == user_id]
+        doc["recurrence"] = rules[0] if rules and doc.get("recurring_id") else None
+        return doc
+    return None
+
+@api_router.get("/quests/active/{quest_id}", response_model=ActiveQuestWithRecurrence, response_model_exclude_unset=True)
+async def get_active_quest(quest_id: str, user_id: CurrentUser, include: Optional[str] = None):
+    if "recurrence" in quest_includes(include):
+        doc = await find_quest_with_recurrence(user_id, quest_id)
+        if not doc:
+            raise HTTPException(status_code=404, detail="Quest not found")
+        return ActiveQuestWithRecurrence(**doc).dict()
+    doc = await db.ActiveQuests.find_one({"user_id": user_id, "id": quest_id}, DOC_PROJECTION)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Quest not found")
+    # plain dict so only `recurrence` counts as unset and is left out
+    return ActiveQuest(**doc).dict()
 
 @api_router.post("/quests/active", response_model=ActiveQuest)
-async def create_active_quest(input: ActiveQuestCreate):
+async def create_active_quest(input: ActiveQuestCreate, user_id: CurrentUser):
     if input.quest_rank not in RANK_XP:
         raise HTTPException(status_code=400, detail="Invalid quest_rank")
     if input.status not in STATUS_OPTIONS:
         raise HTTPException(status_code=400, detail="Invalid status")
     quest_data = serialize_dates_for_mongo(input.dict())
-    await db.ActiveQuests.insert_one(quest_data)
+    await db.ActiveQuests.insert_one({"user_id": user_id, **quest_data})
     return input
 
 @api_router.patch("/quests/active/{quest_id}", response_model=ActiveQuest)
-async def update_active_quest(quest_id: str, input: ActiveQuestUpdate):
-    doc = await db.ActiveQuests.find_one({"id": quest_id})
+async def update_active_quest(quest_id: str, input: ActiveQuestUpdate, user_id: CurrentUser):
+    doc = await db.ActiveQuests.find_one({"user_id": user_id, "id": quest_id})
     if not doc:
         raise HTTPException(status_code=404, detail="Quest not found")
     # Handle None values explicitly for optional fields like due_time and category_id
@@ -270,21 +897,21 @@ async def update_active_quest(quest_id: str, input: ActiveQuestUpdate):
         raise HTTPException(status_code=400, detail="Invalid status")
     # Serialize dates for MongoDB
     update = serialize_dates_for_mongo(update)
-    await db.ActiveQuests.update_one({"id": quest_id}, {"$set": update})
-    updated = await db.ActiveQuests.find_one({"id": quest_id}, {"_id": 0})
+    await db.ActiveQuests.update_one({"user_id": user_id, "id": quest_id}, {"$set": update})
+    updated = await db.ActiveQuests.find_one({"user_id": user_id, "id": quest_id}, DOC_PROJECTION)
     return ActiveQuest(**updated)
 
 @api_router.delete("/quests/active/{quest_id}")
-async def delete_active_quest(quest_id: str):
-    res = await db.ActiveQuests.delete_one({"id": quest_id})
+async def delete_active_quest(quest_id: str, user_id: CurrentUser):
+    res = await db.ActiveQuests.delete_one({"user_id": user_id, "id": quest_id})
     if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Quest not found")
     return {"ok": True}
 
 # Complete or Incomplete actions
 @api_router.post("/quests/active/{quest_id}/complete", response_model=CompletedQuest)
-async def complete_active_quest(quest_id: str):
-    doc = await db.ActiveQuests.find_one({"id": quest_id})
+async def complete_active_quest(quest_id: str, user_id: CurrentUser):
+    doc = await db.ActiveQuests.find_one({"user_id": user_id, "id": quest_id})
     if not doc:
         raise HTTPException(status_code=404, detail="Quest not found")
     quest_rank = doc["quest_rank"]
@@ -294,28 +921,29 @@ async def complete_active_quest(quest_id: str):
         quest_rank=quest_rank,
         xp_earned=xp,
         date_completed=datetime.now(timezone.utc),
+        category_id=doc.get("category_id"),
     )
-    await db.CompletedQuests.insert_one(completed.dict())
-    await db.ActiveQuests.delete_one({"id": quest_id})
+    await append_ledger(user_id, [ledger_entry("CompletedQuests", completed.dict())])
+    await db.ActiveQuests.delete_one({"user_id": user_id, "id": quest_id})
+    await bump_xp_rollups(user_id, [(completed.date_completed, rollup_completion_inc(completed.dict()))])
     return completed
 
 @api_router.post("/quests/active/{quest_id}/mark-incomplete")
-async def mark_incomplete_active_quest(quest_id: str):
-    res = await db.ActiveQuests.delete_one({"id": quest_id})
+async def mark_incomplete_active_quest(quest_id: str, user_id: CurrentUser):
+    res = await db.ActiveQuests.delete_one({"user_id": user_id, "id": quest_id})
     if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Quest not found")
     return {"ok": True}
 
 @api_router.get("/quests/completed", response_model=List[CompletedQuest])
-async def list_completed_quests():
-    cur = db.CompletedQuests.find({}, {"_id": 0})
-    return [CompletedQuest(**doc) async for doc in cur]
+async def list_completed_quests(user_id: CurrentUser, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    return await stream_history_list(user_id, "CompletedQuests", start, end)
 
 # Rewards Store
 @api_router.get("/rewards/store", response_model=List[RewardStoreItem])
-async def list_reward_store():
-    await seed_reward_store_if_empty()
-    cur = db.RewardStore.find({}, {"_id": 0})
+async def list_reward_store(user_id: CurrentUser):
+    await seed_reward_store_if_empty(user_id)
+    cur = db.RewardStore.find({"user_id": user_id}, DOC_PROJECTION)
     return [RewardStoreItem(**doc) async for doc in cur]
 
 class RewardStoreUpsert(BaseModel):
@@ -324,83 +952,499 @@ class RewardStoreUpsert(BaseModel):
     xp_cost: int
 
 @api_router.post("/rewards/store", response_model=RewardStoreItem)
-async def upsert_reward_store(item: RewardStoreUpsert):
+async def upsert_reward_store(item: RewardStoreUpsert, user_id: CurrentUser):
     if item.id:
         # update
-        existing = await db.RewardStore.find_one({"id": item.id})
+        existing = await db.RewardStore.find_one({"user_id": user_id, "id": item.id})
         if not existing:
             raise HTTPException(status_code=404, detail="Reward not found")
-        await db.RewardStore.update_one({"id": item.id}, {"$set": {"reward_name": item.reward_name, "xp_cost": item.xp_cost}})
-        updated = await db.RewardStore.find_one({"id": item.id}, {"_id": 0})
+        await db.RewardStore.update_one({"user_id": user_id, "id": item.id}, {"$set": {"reward_name": item.reward_name, "xp_cost": item.xp_cost}})
+        updated = await db.RewardStore.find_one({"user_id": user_id, "id": item.id}, DOC_PROJECTION)
         return RewardStoreItem(**updated)
     # create
     new_item = RewardStoreItem(reward_name=item.reward_name, xp_cost=item.xp_cost)
-    await db.RewardStore.insert_one(new_item.dict())
+    await db.RewardStore.insert_one({"user_id": user_id, **new_item.dict()})
     return new_item
 
 @api_router.delete("/rewards/store/{reward_id}")
-async def delete_reward_store(reward_id: str):
-    res = await db.RewardStore.delete_one({"id": reward_id})
+async def delete_reward_store(reward_id: str, user_id: CurrentUser):
+    res = await db.RewardStore.delete_one({"user_id": user_id, "id": reward_id})
     if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Reward not found")
     return {"ok": True}
 
 # Reward Log and Redeem
 @api_router.get("/rewards/log", response_model=List[RewardLogItem])
-async def list_reward_log():
-    cur = db.RewardLog.find({}, {"_id": 0})
-    return [RewardLogItem(**doc) async for doc in cur]
+async def list_reward_log(user_id: CurrentUser, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    return await stream_history_list(user_id, "RewardLog", start, end)
 
 @api_router.get("/rewards/inventory", response_model=List[RewardInventoryItem])
-async def list_reward_inventory():
-    cur = db.RewardInventory.find({}, {"_id": 0}).sort("date_redeemed", -1)
-    return [RewardInventoryItem(**doc) async for doc in cur]
-
-@api_router.post("/rewards/redeem", response_model=RewardInventoryItem)
-async def redeem_reward(input: RewardRedeemInput):
-    reward = await get_reward_by_identifier(input.reward_id, input.reward_name)
-    if not reward:
-        raise HTTPException(status_code=404, detail="Reward not found")
-    summary = await compute_xp_summary()
-    if summary["balance"] < int(reward["xp_cost"]):
-        raise HTTPException(status_code=400, detail="Not enough XP to redeem")
-    # Create log and inventory record
-    now = datetime.now(timezone.utc)
-    log_item = RewardLogItem(
-        date_redeemed=now,
-        reward_name=reward["reward_name"],
-        xp_cost=int(reward["xp_cost"]),
-    )
-    inv_item = RewardInventoryItem(
-        date_redeemed=now,
-        reward_name=reward["reward_name"],
-        xp_cost=int(reward["xp_cost"]),
-        used=False,
-        used_at=None,
-    )
-    await db.RewardLog.insert_one(log_item.dict())
-    await db.RewardInventory.insert_one(inv_item.dict())
-    return inv_item
+async def list_reward_inventory(user_id: CurrentUser, used: Optional[bool] = None):
+    query: Dict[str, Any] = {"user_id": user_id} if used is None else {"user_id": user_id, "used": used}
+    cur = db.RewardInventory.find(query, DOC_PROJECTION).sort("date_redeemed", -1)
+    return stream_json_list(cur, RewardInventoryItem)
+
+@api_router.get("/rewards/inventory/unused", response_model=List[RewardInventoryGroup])
+async def list_unused_inventory_groups(user_id: CurrentUser):
+    """Unused items grouped by reward_name; covered by the partial unused index"""
+    pipeline = [
+        {"$match": {"user_id": user_id, "used": False}},
+        {"$sort": {"reward_name": 1, "date_redeemed": 1}},
+        {"$group": {
+            "_id": "$reward_name",
+            "count": {"$sum": 1},
+            "next_id": {"$first": "$id"},
+            "first_redeemed": {"$first": "$date_redeemed"},
+            "last_redeemed": {"$last": "$date_redeemed"},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+    return [
+        RewardInventoryGroup(reward_name=doc.pop("_id"), **doc)
+        async for doc in db.RewardInventory.aggregate(pipeline)
+    ]
+
+async def find_cart_rewards(user_id: str, items: List[RewardRedeemInput]) -> List[Tuple[Dict[str, Any], int]]:
+    """(reward, quantity) per cart line, looked up in one query"""
+    ids = {item.reward_id for item in items if item.reward_id}
+    names = {item.reward_name for item in items if not item.reward_id and item.reward_name}
+    clauses = ([{"id": {"$in": list(ids)}}] if ids else []) + ([{"reward_name": {"$in": list(names)}}] if names else [])
+    by_id: Dict[str, Dict[str, Any]] = {}
+    by_name: Dict[str, Dict[str, Any]] = {}
+    if clauses:
+        async for doc in db.RewardStore.find({"user_id": user_id, "$or": clauses}, DOC_PROJECTION):
+            by_id[doc["id"]] = doc
+            by_name.setdefault(doc["reward_name"], doc)
+    lines = []
+    for item in items:
+        reward = by_id.get(item.reward_id) if item.reward_id else by_name.get(item.reward_name)
+        if not reward:
+            raise HTTPException(status_code=404, detail="Reward not found")
+        lines.append((reward, item.quantity))
+    return lines
+
+async def redeem_rewards(user_id: str, lines: List[Tuple[Dict[str, Any], int]]) -> List[RewardInventoryItem]:
+    """Redeem every unit with one balance check, one ledger append and one
+    inventory insert_many.
+
+    In a transaction, concurrent redemptions conflict on the next ledger seq
+    (and today's rollup document), so the loser is retried against the
+    winner's committed spend."""
+    if sum(qty for _, qty in lines) > REDEEM_MAX_QUANTITY:
+        raise HTTPException(status_code=400, detail=f"At most {REDEEM_MAX_QUANTITY} rewards per redemption")
+    total_cost = sum(int(reward["xp_cost"]) * qty for reward, qty in lines)
+    snapshot_due = False
+
+    async def redeem(session):
+        nonlocal snapshot_due
+        summary = await ledger_balance(user_id, session=session)
+        if summary["balance"] < total_cost:
+            raise HTTPException(status_code=400, detail="Not enough XP to redeem")
+        # Create log and inventory records
+        now = datetime.now(timezone.utc)
+        logs, items = [], []
+        for reward, qty in lines:
+            for _ in range(qty):
+                logs.append(RewardLogItem(
+                    date_redeemed=now,
+                    reward_name=reward["reward_name"],
+                    xp_cost=int(reward["xp_cost"]),
+                ).dict())
+                items.append(RewardInventoryItem(
+                    date_redeemed=now,
+                    reward_name=reward["reward_name"],
+                    xp_cost=int(reward["xp_cost"]),
+                    used=False,
+                    used_at=None,
+                ))
+        last = await append_ledger(user_id, [ledger_entry("RewardLog", log) for log in logs], session=session)
+        snapshot_due = (last - len(logs)) // LEDGER_SNAPSHOT_EVERY != last // LEDGER_SNAPSHOT_EVERY
+        await db.RewardInventory.insert_many([{"user_id": user_id, **item.dict()} for item in items], session=session)
+        await bump_xp_rollups(user_id, [(now, rollup_redemption_inc(log)) for log in logs], session=session)
+        return items
+
+    items = await run_in_transaction(redeem)
+    if snapshot_due:
+        # outside the transaction, so snapshots never conflict with redemptions
+        await snapshot_ledger(user_id)
+    return items
+
+@api_router.post("/rewards/redeem", response_model=Union[RewardInventoryItem, List[RewardInventoryItem]])
+async def redeem_reward(input: RewardRedeemInput, user_id: CurrentUser):
+    """One inventory item, or a list of them when quantity > 1"""
+    items = await redeem_rewards(user_id, await find_cart_rewards(user_id, [input]))
+    return items if input.quantity > 1 else items[0]
+
+@api_router.post("/rewards/redeem/cart", response_model=List[RewardInventoryItem])
+async def redeem_cart(cart: RewardCartInput, user_id: CurrentUser):
+    return await redeem_rewards(user_id, await find_cart_rewards(user_id, cart.items))
 
 @api_router.post("/rewards/use/{inventory_id}")
-async def use_reward(inventory_id: str):
-    doc = await db.RewardInventory.find_one({"id": inventory_id})
-    if not doc:
+async def use_reward(inventory_id: str, user_id: CurrentUser):
+    # conditional on used=False so concurrent uses of one item can't both succeed
+    doc = await db.RewardInventory.find_one_and_update(
+        {"user_id": user_id, "id": inventory_id, "used": False},
+        {"$set": {"used": True, "used_at": datetime.now(timezone.utc)}},
+        projection={"_id": 1},
+    )
+    if doc:
+        return {"ok": True}
+    if not await db.RewardInventory.find_one({"user_id": user_id, "id": inventory_id}, {"_id": 1}):
         raise HTTPException(status_code=404, detail="Inventory item not found")
-    if doc.get("used"):
-        raise HTTPException(status_code=400, detail="Reward already used")
-    await db.RewardInventory.update_one({"id": inventory_id}, {"$set": {"used": True, "used_at": datetime.now(timezone.utc)}})
-    return {"ok": True}
+    raise HTTPException(status_code=400, detail="Reward already used")
 
 # XP summary
 @api_router.get("/xp/summary")
-async def xp_summary():
-    return await compute_xp_summary()
+async def xp_summary(user_id: CurrentUser):
+    return await ledger_balance(user_id)
+
+# ---- XP analytics ----
+# Closed (UTC) days never change, so their stats are computed once and kept
+# here, per user, for the XP_CACHE_USERS most recently active users. Writes
+# that do change them bump the user's xp_cache_version in Users, which every
+# process checks (sync_xp_cache) before using its cached days.
+_XP_DAY_CACHE: "OrderedDict[str, Dict[date, Dict[str, Any]]]" = OrderedDict()
+_XP_OPENING_CACHE: "OrderedDict[str, Dict[date, int]]" = OrderedDict()
+# user_id -> xp_cache_version this process's cached days were computed at
+_XP_CACHE_VERSION: Dict[str, int] = {}
+# user_id -> monotonic time until which reads from a lagging secondary may
+# predate the user's last invalidation, and so must not be cached
+_XP_CACHE_HOLD: Dict[str, float] = {}
+
+UNCATEGORIZED_KEY = "uncategorized"
+
+def user_cache(cache: OrderedDict, user_id: str) -> Dict[date, Any]:
+    entries = cache.get(user_id)
+    if entries is None:
+        entries = cache[user_id] = {}
+        if len(cache) > XP_CACHE_USERS:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(user_id)
+    return entries
+
+def drop_xp_cache(user_id: str, hold_seconds: float = READ_MAX_STALENESS):
+    """Forget this process's cached days for user_id, and don't cache lagging
+    reads for the next hold_seconds"""
+    _XP_DAY_CACHE.pop(user_id, None)
+    _XP_OPENING_CACHE.pop(user_id, None)
+    now = time.monotonic()
+    if len(_XP_CACHE_HOLD) >= XP_CACHE_USERS:
+        for held, until in list(_XP_CACHE_HOLD.items()):
+            if until <= now:
+                del _XP_CACHE_HOLD[held]
+    if hold_seconds > 0:
+        _XP_CACHE_HOLD[user_id] = now + hold_seconds
+
+async def invalidate_xp_cache(user_id: str):
+    """Call after writes that touch closed days (imports, archival, rollup rebuilds)"""
+    await db.Users.update_one({"id": user_id}, {
+        "$inc": {"xp_cache_version": 1},
+        "$set": {"xp_cache_invalidated_at": datetime.now(timezone.utc)},
+    })
+    drop_xp_cache(user_id)
+
+async def sync_xp_cache(user_id: str):
+    """Drop user_id's cached days if any process invalidated them since they
+    were cached, holding off for what is left of that invalidation's window"""
+    doc = await db.Users.find_one({"id": user_id}, {"_id": 0, "xp_cache_version": 1, "xp_cache_invalidated_at": 1}) or {}
+    version = doc.get("xp_cache_version", 0)
+    if _XP_CACHE_VERSION.get(user_id) == version:
+        return
+    hold = 0.0
+    invalidated = doc.get("xp_cache_invalidated_at")
+    if invalidated:
+        if invalidated.tzinfo is None:
+            invalidated = invalidated.replace(tzinfo=timezone.utc)
+        hold = READ_MAX_STALENESS - (datetime.now(timezone.utc) - invalidated).total_seconds()
+    drop_xp_cache(user_id, hold)
+    if len(_XP_CACHE_VERSION) >= XP_CACHE_USERS:
+        for known in list(_XP_CACHE_VERSION):
+            if known not in _XP_DAY_CACHE and known not in _XP_OPENING_CACHE:
+                del _XP_CACHE_VERSION[known]
+    _XP_CACHE_VERSION[user_id] = version
+
+def xp_cacheable_before(user_id: str, route: Optional[str]) -> date:
+    """Days before this date, read through `route`, are final and may be cached.
+
+    On the primary that is every closed day. A secondary may still be missing
+    the last READ_MAX_STALENESS seconds of writes: the day that just closed,
+    or everything after a recent invalidation."""
+    today = datetime.now(timezone.utc).date()
+    if not reads_may_lag(route):
+        return today
+    until = _XP_CACHE_HOLD.get(user_id)
+    if until is not None:
+        if until > time.monotonic():
+            return date.min
+        del _XP_CACHE_HOLD[user_id]
+    return (datetime.now(timezone.utc) - timedelta(seconds=READ_MAX_STALENESS)).date()
+
+def day_start(d: date) -> datetime:
+    return datetime.combine(d, dtime.min)
+
+def empty_day_stats() -> Dict[str, Any]:
+    return {"earned": 0, "spent": 0, "completed": 0, "redeemed": 0, "ranks": {r: 0 for r in RANK_XP}, "categories": {}}
+
+async def aggregate_xp_days(user_id: str, start: Optional[date] = None, end: Optional[date] = None, session=None,
+                            route: Optional[str] = None) -> Dict[date, Dict[str, Any]]:
+    """One user's per-day stats straight from the XP ledger via one $group pipeline.
+
+    Only days with activity are returned. Without bounds the user's whole
+    history is aggregated (rollup backfill)."""
+    query: Dict[str, Any] = {"user_id": user_id}
+    rng: Dict[str, Any] = {}
+    if start:
+        rng["$gte"] = day_start(start)
+    if end:
+        rng["$lt"] = day_start(end + timedelta(days=1))
+    if rng:
+        query["at"] = rng
+    pipeline = [
+        {"$match": query},
+        {"$group": {
+            "_id": {
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$at"}},
+                "kind": "$kind",
+                "rank": "$quest_rank",
+                "category": "$category_id",
+            },
+            "xp": {"$sum": "$amount"},
+            "count": {"$sum": 1},
+        }},
+    ]
+    days: Dict[date, Dict[str, Any]] = {}
+    async for row in reader(route).XpLedger.aggregate(pipeline, session=session):
+        stats = days.setdefault(date.fromisoformat(row["_id"]["day"]), empty_day_stats())
+        count = int(row["count"])
+        if row["_id"]["kind"] == "reward":
+            stats["spent"] -= int(row["xp"])
+            stats["redeemed"] += count
+            continue
+        stats["earned"] += int(row["xp"])
+        stats["completed"] += count
+        rank = row["_id"].get("rank")
+        stats["ranks"][rank] = stats["ranks"].get(rank, 0) + count
+        category = row["_id"].get("category") or UNCATEGORIZED_KEY
+        stats["categories"][category] = stats["categories"].get(category, 0) + count
+    return days
+
+# ---- Daily XP rollups ----
+# XpDailyRollups holds one document per user and UTC day: {user_id, day:
+# "YYYY-MM-DD", earned, spent, completed, redeemed, ranks: {rank: n},
+# categories: {category_key: n}}, day being the UTC date like the ledger's.
+# Completion, redemption and import $inc it; rebuild_xp_rollups backfills it.
+
+def category_key(category_id: str) -> str:
+    """Field name for a category id under `categories`. Ids come from clients,
+    so '.' and '$' (nested fields / operators in an $inc path) are escaped,
+    and '%' so the escaping can be undone."""
+    return category_id.replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+def rollup_completion_inc(doc: Dict[str, Any]) -> Dict[str, int]:
+    category = doc.get("category_id") or UNCATEGORIZED_KEY
+    return {
+        "earned": int(doc.get("xp_earned", 0)),
+        "completed": 1,
+        f"ranks.{doc['quest_rank']}": 1,
+        f"categories.{category_key(category)}": 1,
+    }
+
+def rollup_redemption_inc(doc: Dict[str, Any]) -> Dict[str, int]:
+    return {"spent": int(doc.get("xp_cost", 0)), "redeemed": 1}
+
+async def bump_xp_rollups(user_id: str, events: List[Any], session=None):
+    """Apply (when, inc) pairs to the daily rollups, one upsert per touched day"""
+    per_day: Dict[str, Dict[str, int]] = {}
+    for when, inc in events:
+        if when.tzinfo is not None:
+            when = when.astimezone(timezone.utc)
+        bucket = per_day.setdefault(when.date().isoformat(), {})
+        for key, n in inc.items():
+            bucket[key] = bucket.get(key, 0) + n
+    if not per_day:
+        return
+    await db.XpDailyRollups.bulk_write(
+        [UpdateOne({"user_id": user_id, "day": day}, {"$inc": inc}, upsert=True) for day, inc in per_day.items()],
+        ordered=False,
+        session=session,
+    )
+
+def rollup_doc_to_stats(doc: Dict[str, Any]) -> Dict[str, Any]:
+    stats = empty_day_stats()
+    for field in ("earned", "spent", "completed", "redeemed"):
+        stats[field] = int(doc.get(field) or 0)
+    stats["ranks"].update(doc.get("ranks") or {})
+    stats["categories"].update({unquote(key): n for key, n in (doc.get("categories") or {}).items()})
+    return stats
+
+async def rebuild_xp_rollups(user_id: str) -> Dict[str, int]:
+    """Backfill: recompute each of the user's days from the XP ledger.
+
+    Days before the archive watermark are no longer in the ledger,
+    so their rollups are kept as they are."""
+    watermarks = [w for w in (await archive_watermarks(user_id)).values() if w]
+    start = max(watermarks).date() if watermarks else None
+    days = await aggregate_xp_days(user_id, start)
+    ops = [
+        ReplaceOne({"user_id": user_id, "day": d.isoformat()}, {
+            "user_id": user_id, "day": d.isoformat(), **stats,
+            "categories": {category_key(c): n for c, n in stats["categories"].items()},
+        }, upsert=True)
+        for d, stats in days.items()
+    ]
+    if ops:
+        await db.XpDailyRollups.bulk_write(ops, ordered=False)
+    stale: Dict[str, Any] = {"$nin": [d.isoformat() for d in days]}
+    if start:
+        stale["$gte"] = start.isoformat()
+    res = await db.XpDailyRollups.delete_many({"user_id": user_id, "day": stale})
+    await invalidate_xp_cache(user_id)
+    return {"days": len(days), "removed": res.deleted_count}
+
+async def query_xp_days(user_id: str, start: date, end: date, route: Optional[str] = None) -> Dict[date, Dict[str, Any]]:
+    """Per-day stats for [start, end]: closed days from rollups, today from the ledger"""
+    today = datetime.now(timezone.utc).date()
+    days = {start + timedelta(days=i): empty_day_stats() for i in range((end - start).days + 1)}
+    closed_end = min(end, today - timedelta(days=1))
+    if start <= closed_end:
+        cur = reader(route).XpDailyRollups.find(
+            {"user_id": user_id, "day": {"$gte": start.isoformat(), "$lte": closed_end.isoformat()}}, DOC_PROJECTION)
+        async for doc in cur:
+            days[date.fromisoformat(doc["day"])] = rollup_doc_to_stats(doc)
+    if start <= today <= end:
+        days[today] = (await aggregate_xp_days(user_id, today, today, route=route)).get(today, empty_day_stats())
+    return days
+
+async def xp_days(user_id: str, start: date, end: date, route: Optional[str] = None) -> Dict[date, Dict[str, Any]]:
+    """Daily stats for [start, end]; closed days come from cache, only the
+    uncached tail (normally just today) hits the database."""
+    today = datetime.now(timezone.utc).date()
+    await sync_xp_cache(user_id)
+    cache = user_cache(_XP_DAY_CACHE, user_id)
+    span = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    first_missing = next((d for d in span if d >= today or d not in cache), None)
+    fresh = await query_xp_days(user_id, first_missing, end, route) if first_missing else {}
+    settled = xp_cacheable_before(user_id, route)
+    for d, stats in fresh.items():
+        if d < settled:
+            cache[d] = stats
+    return {d: fresh[d] if d in fresh else cache[d] for d in span}
+
+async def xp_opening_balance(user_id: str, before: date, route: Optional[str] = None) -> int:
+    """Balance at the start of `before` (UTC), summed from closed-day rollups"""
+    today = datetime.now(timezone.utc).date()
+    await sync_xp_cache(user_id)
+    cache = user_cache(_XP_OPENING_CACHE, user_id)
+    if before <= today and before in cache:
+        return cache[before]
+    total = 0
+    closed_end = min(before, today)
+    async for row in reader(route).XpDailyRollups.aggregate([
+        {"$match": {"user_id": user_id, "day": {"$lt": closed_end.isoformat()}}},
+        {"$group": {"_id": None, "earned": {"$sum": "$earned"}, "spent": {"$sum": "$spent"}}},
+    ]):
+        total += int(row["earned"]) - int(row["spent"])
+    if before > today:
+        for d, stats in (await query_xp_days(user_id, today, before - timedelta(days=1), route)).items():
+            total += stats["earned"] - stats["spent"]
+    elif before <= xp_cacheable_before(user_id, route):
+        cache[before] = total
+    return total
+
+def bucket_start(d: date, bucket: str) -> date:
+    if bucket == "week":
+        return d - timedelta(days=d.weekday())
+    if bucket == "month":
+        return d.replace(day=1)
+    return d
+
+def xp_streaks(days: Dict[date, Dict[str, Any]], today: date) -> Dict[str, int]:
+    """Consecutive days with at least one completion, within the queried range"""
+    longest = run = 0
+    for d in sorted(days):
+        run = run + 1 if days[d]["completed"] else 0
+        longest = max(longest, run)
+    current = 0
+    d = min(max(days), today)
+    if d == today and not days[d]["completed"]:
+        d -= timedelta(days=1)  # today still counts as open
+    while d in days and days[d]["completed"]:
+        current += 1
+        d -= timedelta(days=1)
+    return {"current": current, "longest": longest}
+
+@api_router.get("/xp/analytics")
+async def xp_analytics(
+    user_id: CurrentUser,
+    bucket: Literal['day', 'week', 'month'] = 'day',
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+):
+    today = datetime.now(timezone.utc).date()
+    end = to_date or today
+    if from_date:
+        start = from_date
+    elif bucket == "day":
+        start = end - timedelta(days=29)
+    elif bucket == "week":
+        start = end - timedelta(weeks=11)
+    else:
+        months = end.year * 12 + end.month - 1 - 11
+        start = date(months // 12, months % 12 + 1, 1)
+    start = bucket_start(start, bucket)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if (end - start).days >= ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range limited to {ANALYTICS_MAX_DAYS} days")
+
+    days = await xp_days(user_id, start, end, "analytics")
+    balance = opening = await xp_opening_balance(user_id, start, "analytics")
+    buckets: Dict[date, Dict[str, Any]] = {}
+    for d in sorted(days):
+        stats = days[d]
+        b = buckets.setdefault(bucket_start(d, bucket), empty_day_stats())
+        b["earned"] += stats["earned"]
+        b["spent"] += stats["spent"]
+        b["completed"] += stats["completed"]
+        b["redeemed"] += stats["redeemed"]
+        for rank, n in stats["ranks"].items():
+            b["ranks"][rank] = b["ranks"].get(rank, 0) + n
+        for category, n in stats["categories"].items():
+            b["categories"][category] = b["categories"].get(category, 0) + n
+    series = []
+    totals = empty_day_stats()
+    for key in sorted(buckets):
+        b = buckets[key]
+        balance += b["earned"] - b["spent"]
+        series.append({"bucket_start": key.isoformat(), **b, "net": b["earned"] - b["spent"], "balance": balance})
+        for field in ("earned", "spent", "completed", "redeemed"):
+            totals[field] += b[field]
+        for rank, n in b["ranks"].items():
+            totals["ranks"][rank] = totals["ranks"].get(rank, 0) + n
+        for category, n in b["categories"].items():
+            totals["categories"][category] = totals["categories"].get(category, 0) + n
+    return {
+        "bucket": bucket,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "opening_balance": opening,
+        "closing_balance": balance,
+        "totals": {**totals, "net": totals["earned"] - totals["spent"]},
+        "streaks": xp_streaks(days, today),
+        "buckets": series,
+    }
+
+@api_router.post("/xp/rollups/rebuild")
+async def rebuild_xp_rollups_route(user_id: CurrentUser, wait: bool = False):
+    if wait:
+        return await rebuild_xp_rollups(user_id)
+    return job_accepted(await enqueue_job("rebuild_xp_rollups", {}, user_id))
 
 # Recurring tasks
 @api_router.get("/recurring", response_model=List[RecurringTask])
-async def list_recurring():
-    cur = db.Recurringtasks.find({}, {"_id": 0})
+async def list_recurring(user_id: CurrentUser):
+    cur = db.Recurringtasks.find({"user_id": user_id}, DOC_PROJECTION)
     return [RecurringTask(**doc) async for doc in cur]
 
 # --- Recurring helpers for custom rules ---
@@ -416,21 +1460,9 @@ WEEKDAY_INDEX = {
 
 def nth_weekday_day(year: int, month: int, weekday_idx: int, n: int) -> int:
     """Return the day-of-month for nth weekday (n=1..5, -1 for last)."""
-    # Find all days in this month with weekday_idx
-    first = date(year, month, 1)
-    # iterate days of month
-    days = []
-    d = first
-    while d.month == month:
-        if d.weekday() == weekday_idx:
-            days.append(d.day)
-        d = d.replace(day=d.day + 1) if d.day < 28 else (d + datetime.resolution).date()  # fallback
-        try:
-            d = date(d.year, d.month, d.day)
-        except Exception:
-            # rebuild safely
-            if d.month != month:
-                break
+    # All days in this month with weekday_idx
+    first_match = 1 + (weekday_idx - date(year, month, 1).weekday()) % 7
+    days = list(range(first_match, calendar.monthrange(year, month)[1] + 1, 7))
     if not days:
         return 1
     if n == -1:
@@ -446,23 +1478,25 @@ class RecurringUpsert(BaseModel):
     days: Optional[str] = None
     monthly_on_date: Optional[int] = None
     # Custom fields
-    interval: Optional[int] = 1
+    interval: Optional[int] = Field(1, ge=1, le=RECURRING_MAX_INTERVAL)
     monthly_mode: Optional[Literal['date','weekday']] = None
     monthly_week_index: Optional[int] = None
     monthly_weekday: Optional[str] = None
     ends: Optional[Literal['never','on_date','after']] = 'never'
     until_date: Optional[date] = None
     count: Optional[int] = None
+    timezone: Optional[str] = None
 
     status: Literal['Pending', 'In Progress', 'Completed', 'Incomplete'] = 'Pending'
 
 @api_router.post("/recurring", response_model=RecurringTask)
-async def upsert_recurring(task: RecurringUpsert):
+async def upsert_recurring(task: RecurringUpsert, user_id: CurrentUser):
+    check_timezone(task.timezone)
     if task.id:
-        existing = await db.Recurringtasks.find_one({"id": task.id})
+        existing = await db.Recurringtasks.find_one({"user_id": user_id, "id": task.id}, DOC_PROJECTION)
         if not existing:
             raise HTTPException(status_code=404, detail="Recurring task not found")
-        await db.Recurringtasks.update_one({"id": task.id}, {"$set": {
+        fields = serialize_dates_for_mongo({
             "task_name": task.task_name,
             "quest_rank": task.quest_rank,
             "frequency": task.frequency,
@@ -476,9 +1510,13 @@ async def upsert_recurring(task: RecurringUpsert):
             "until_date": task.until_date,
             "count": task.count,
             "status": task.status,
-        }})
-        updated = await db.Recurringtasks.find_one({"id": task.id}, {"_id": 0})
-        return RecurringTask(**updated)
+        })
+        unset = set_rule_timezone(fields, task)
+        rule = {k: v for k, v in {**existing, **fields}.items() if k not in unset}
+        fields["next_due"] = rule["next_due"] = rule_next_due(rule, rule_today(rule))
+        update = {"$set": fields, "$unset": unset} if unset else {"$set": fields}
+        await db.Recurringtasks.update_one({"user_id": user_id, "id": task.id}, update)
+        return RecurringTask(**rule)
     new_task = RecurringTask(
         task_name=task.task_name,
         quest_rank=task.quest_rank,
@@ -493,15 +1531,15 @@ async def upsert_recurring(task: RecurringUpsert):
         until_date=task.until_date,
         count=task.count,
         status=task.status,
-        start_date=datetime.now(timezone.utc).date(),
+        timezone=task.timezone or None,
+        start_date=local_today(task.timezone),
     )
-    task_data = serialize_dates_for_mongo(new_task.dict())
-    await db.Recurringtasks.insert_one(task_data)
+    await db.Recurringtasks.insert_one(recurring_insert_doc(new_task, user_id))
     return new_task
 
 @api_router.delete("/recurring/{task_id}")
-async def delete_recurring(task_id: str):
-    res = await db.Recurringtasks.delete_one({"id": task_id})
+async def delete_recurring(task_id: str, user_id: CurrentUser):
+    res = await db.Recurringtasks.delete_one({"user_id": user_id, "id": task_id})
     if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Recurring task not found")
     return {"ok": True}
@@ -522,6 +1560,8 @@ def is_today_for_task(today: date, task: Dict[str, Any]) -> bool:
     ends = task.get('ends') or 'never'
     if ends == 'on_date':
         until = task.get('until_date')
+        if isinstance(until, str):
+            until = date.fromisoformat(until)
         if until and today > until:
             return False
     if ends == 'after':
@@ -579,46 +1619,465 @@ def is_today_for_task(today: date, task: Dict[str, Any]) -> bool:
 
     return False
 
-@api_router.post("/recurring/run")
-async def run_recurring_generation():
-    today = datetime.now(timezone.utc).date()
-    # Fetch all recurring tasks
-    tasks = [doc async for doc in db.Recurringtasks.find({}, {"_id": 0})]
+def check_timezone(name: Optional[str]):
+    if not name:
+        return
+    try:
+        ZoneInfo(name)
+    except Exception:
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {name}")
+
+def set_rule_timezone(fields: Dict[str, Any], body: BaseModel) -> Dict[str, str]:
+    """Add body.timezone to a rule update when it was sent. An explicit null or
+    "" clears the stored zone instead, so the rule falls back to RECURRING_TZ.
+    Returns the update's $unset part."""
+    if "timezone" not in body.dict(exclude_unset=True):
+        return {}
+    if body.timezone:
+        fields["timezone"] = body.timezone
+        return {}
+    return {"timezone": ""}
+
+def local_today(tz_name: Optional[str] = None) -> date:
+    return datetime.now(ZoneInfo(tz_name or RECURRING_TZ)).date()
+
+def rule_today(task: Dict[str, Any]) -> date:
+    """Current date in the rule's own timezone"""
+    return local_today(task.get('timezone'))
+
+def next_due_horizon(task: Dict[str, Any]) -> int:
+    """Days to scan before concluding a rule never fires again"""
+    interval = max(1, int(task.get('interval') or 1))
+    freq = task.get('frequency')
+    if freq == 'Daily':
+        return interval
+    if freq in ('Weekly', 'Weekdays'):
+        return 7 * interval + 7
+    # Monthly day 29-31 and Annual Feb 29 can skip several cycles
+    if freq == 'Monthly':
+        return 31 * 12 * interval + 31
+    return 366 * 4 * interval + 366
+
+class CompiledRule(NamedTuple):
+    """Normalized, hashable form of a recurrence rule (usable as a cache key)"""
+    frequency: str
+    interval: int
+    days: Optional[str]
+    monthly_on_date: Optional[int]
+    monthly_mode: Optional[str]
+    monthly_week_index: Optional[int]
+    monthly_weekday: Optional[str]
+    ends: str
+    until_date: Optional[date]
+    count: Optional[int]
+    start_date: date
+    occurrences: int
+
+def compile_rule(task: Dict[str, Any], today: date) -> CompiledRule:
+    """Parse stored strings once; undated rules anchor on `today`"""
+    start = task.get('start_date') or today
+    until = task.get('until_date')
+    days = None
+    if task.get('days'):
+        parts = {p.strip() for p in task['days'].split(',') if p.strip() in WEEKDAY_INDEX}
+        days = ", ".join(sorted(parts, key=WEEKDAY_INDEX.get))
+    return CompiledRule(
+        frequency=task.get('frequency'),
+        interval=max(1, int(task.get('interval') or 1)),
+        days=days,
+        monthly_on_date=task.get('monthly_on_date'),
+        monthly_mode=task.get('monthly_mode'),
+        monthly_week_index=task.get('monthly_week_index'),
+        monthly_weekday=task.get('monthly_weekday'),
+        ends=task.get('ends') or 'never',
+        until_date=date.fromisoformat(until) if isinstance(until, str) else until,
+        count=task.get('count'),
+        start_date=date.fromisoformat(start) if isinstance(start, str) else start,
+        occurrences=int(task.get('occurrences') or 0),
+    )
 
-    created_count = 0
+def rule_candidates(rule: CompiledRule, after: date) -> Iterator[date]:
+    """Ascending dates >= after that can match the rule's pattern (a superset;
+    is_today_for_task has the final say)"""
+    freq = rule.frequency
+    if freq == 'Daily':
+        lag = (after - rule.start_date).days
+        steps = max(0, -(-lag // rule.interval))
+        if steps * rule.interval > (date.max - rule.start_date).days:
+            return
+        d = rule.start_date + timedelta(days=steps * rule.interval)
+        while True:
+            yield d
+            if (date.max - d).days < rule.interval:
+                return
+            d += timedelta(days=rule.interval)
+    elif freq == 'Monthly':
+        y, m = after.year, after.month
+        by_weekday = rule.monthly_mode == 'weekday'
+        wd_idx = WEEKDAY_INDEX.get(rule.monthly_weekday) if rule.monthly_weekday else None
+        target_day = int(rule.monthly_on_date or rule.start_date.day)
+        if (by_weekday and wd_idx is None) or (not by_weekday and not 1 <= target_day <= 31):
+            return
+        while y <= date.max.year:
+            if by_weekday:
+                day = nth_weekday_day(y, m, wd_idx, int(rule.monthly_week_index or 1))
+            else:
+                day = target_day
+            if day <= calendar.monthrange(y, m)[1] and date(y, m, day) >= after:
+                yield date(y, m, day)
+            y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    elif freq == 'Annual':
+        y = after.year
+        while y <= date.max.year:
+            if rule.start_date.day <= calendar.monthrange(y, rule.start_date.month)[1]:
+                d = date(y, rule.start_date.month, rule.start_date.day)
+                if d >= after:
+                    yield d
+            y += 1
+    else:
+        d = after
+        while True:
+            yield d
+            if d == date.max:
+                return
+            d += timedelta(days=1)
+
+def iter_rule_dates(rule: CompiledRule, after: date) -> Iterator[date]:
+    """Occurrence dates >= after, honouring the rule's end condition"""
+    task = {**rule._asdict(), 'ends': 'never'}
+    remaining = rule.count - rule.occurrences if rule.ends == 'after' and rule.count else None
+    if remaining is not None and remaining <= 0:
+        return
+    horizon = next_due_horizon(task)
+    last = after
+    for d in rule_candidates(rule, after):
+        if rule.ends == 'on_date' and rule.until_date and d > rule.until_date:
+            return
+        if (d - last).days > horizon:
+            return  # pattern cannot match any more
+        if is_today_for_task(d, task):
+            yield d
+            last = d
+            if remaining is not None:
+                remaining -= 1
+                if remaining <= 0:
+                    return
+
+@functools.lru_cache(maxsize=4096)
+def preview_rule_dates(rule: CompiledRule, after: date, limit: int) -> Tuple[date, ...]:
+    return tuple(itertools.islice(iter_rule_dates(rule, after), limit))
+
+def rule_next_due(task: Dict[str, Any], today: date) -> Optional[str]:
+    """First date >= today (or > today when already added today) on which the
+    rule fires, as an ISO string; None if it never fires again."""
+    after = today
+    last_added = task.get('last_added')
+    if isinstance(last_added, str):
+        last_added = date.fromisoformat(last_added)
+    if last_added and last_added >= after:
+        after = last_added + timedelta(days=1)
+    d = next(iter_rule_dates(compile_rule(task, today), after), None)
+    return d.isoformat() if d else None
+
+def recurring_insert_doc(rec: RecurringTask, user_id: str) -> Dict[str, Any]:
+    """Mongo document for a new rule of `user_id`, with next_due filled in"""
+    doc = {"user_id": user_id, **serialize_dates_for_mongo(rec.dict())}
+    doc["next_due"] = rule_next_due(doc, rule_today(doc))
+    rec.next_due = date.fromisoformat(doc["next_due"]) if doc["next_due"] else None
+    return doc
+
+def occurrence_key(recurring_id: str, day: date) -> str:
+    return f"{recurring_id}:{day.isoformat()}"
+
+async def insert_occurrences(quests: List[Dict[str, Any]]) -> set:
+    """Insert generated quests, ignoring ones whose occurrence_key already
+    exists (a concurrent or earlier run made them). Returns the indices that
+    were actually inserted."""
+    if not quests:
+        return set()
+    try:
+        await db.ActiveQuests.insert_many(quests, ordered=False)
+        return set(range(len(quests)))
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        if any(we.get("code") != 11000 for we in write_errors):
+            raise
+        return set(range(len(quests))) - {we["index"] for we in write_errors}
+
+def evaluate_recurring_rule(t: Dict[str, Any], today: date) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """(rule_id, quest_doc or None, next_due) for one rule"""
+    # Convert last_added from str to date if string
+    last_added = t.get('last_added')
+    if isinstance(last_added, str):
+        try:
+            t['last_added'] = date.fromisoformat(last_added)
+        except Exception:
+            t['last_added'] = None
+    quest = None
+    if is_today_for_task(today, t) and t.get('last_added') != today:
+        new_q = ActiveQuest(
+            quest_name=t['task_name'],
+            quest_rank=t['quest_rank'],
+            due_date=today,
+            status='Pending',
+            redeem_reward=None,
+            recurring_id=t['id'],
+            is_event=False,
+            occurrence_key=occurrence_key(t['id'], today),
+        )
+        quest = {"user_id": t.get('user_id'), **serialize_dates_for_mongo(new_q.dict())}
+        t = {**t, 'last_added': today, 'occurrences': int(t.get('occurrences') or 0) + 1}
+    return t['id'], quest, rule_next_due(t, today)
+
+def evaluate_recurring_rules(tasks: List[Dict[str, Any]], today: date) -> List[Any]:
+    """Pure evaluation of rules for `today` (safe to run in a worker process).
+
+    Returns (rule_id, quest_doc or None, next_due) per rule; next_due assumes
+    the occurrence is counted when the rule fires. A rule that fails to
+    evaluate is logged and gets no quest and no next_due, so it is not
+    picked up again until it is edited."""
+    results = []
     for t in tasks:
-        # Convert last_added from str to date if string
-        last_added = t.get('last_added')
-        if isinstance(last_added, str):
-            try:
-                t['last_added'] = date.fromisoformat(last_added)
-            except Exception:
-                t['last_added'] = None
-        if is_today_for_task(today, t):
-            # Avoid duplicate add same day
-            if t.get('last_added') == today:
-                continue
-            new_q = ActiveQuest(
-                quest_name=t['task_name'],
-                quest_rank=t['quest_rank'],
-                due_date=today,
-                status='Pending',
-                redeem_reward=None,
-                recurring_id=t['id'],
-                is_event=False,
-            )
-            quest_data = serialize_dates_for_mongo(new_q.dict())
-            await db.ActiveQuests.insert_one(quest_data)
-            # bump counters/last_added
-            updates = {"last_added": today.isoformat(), "occurrences": int(t.get('occurrences') or 0) + 1}
-            await db.Recurringtasks.update_one({"id": t['id']}, {"$set": updates})
-            created_count += 1
-    return {"created": created_count}
+        try:
+            results.append(evaluate_recurring_rule(t, today))
+        except Exception:
+            logger.exception("Skipping recurring rule %s of %s that failed to evaluate", t.get('id'), t.get('user_id'))
+            results.append((t['id'], None, None))
+    return results
+
+# Built once at startup when RECURRING_WORKERS > 1 and shared by every run
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def new_process_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn, not fork: this process already runs Motor's and the executor's threads
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+def rule_partition(rule_id: str, partitions: int) -> int:
+    return zlib.crc32(rule_id.encode()) % partitions
+
+async def evaluate_recurring_rules_parallel(tasks: List[Dict[str, Any]], today: date, pool: ProcessPoolExecutor,
+                                           workers: int) -> List[Any]:
+    """Partition rules by id hash into `workers` shards and evaluate them in `pool`;
+    results come back in the order of `tasks`, like evaluate_recurring_rules"""
+    shards: List[List[Dict[str, Any]]] = [[] for _ in range(workers)]
+    positions: List[List[int]] = [[] for _ in range(workers)]
+    for i, t in enumerate(tasks):
+        shard = rule_partition(t['id'], workers)
+        shards[shard].append(t)
+        positions[shard].append(i)
+    loop = asyncio.get_running_loop()
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(pool, evaluate_recurring_rules, shard, today) for shard in shards if shard
+    ))
+    results: List[Any] = [None] * len(tasks)
+    for part, idx in zip(parts, (p for p in positions if p)):
+        for i, r in zip(idx, part):
+            results[i] = r
+    return results
+
+def zone_filter(zone: str) -> Dict[str, Any]:
+    # rules without a timezone belong to the default zone
+    if zone == RECURRING_TZ:
+        return {"timezone": {"$in": [None, zone]}}
+    return {"timezone": zone}
+
+async def recurring_zones(user_id: Optional[str] = None) -> List[str]:
+    """Timezones that currently have rules (always including the default),
+    across all users unless `user_id` is given"""
+    zones = {RECURRING_TZ}
+    for name in await db.Recurringtasks.distinct("timezone", {"user_id": user_id} if user_id else {}):
+        if not name:
+            continue
+        try:
+            ZoneInfo(name)
+        except Exception:
+            logger.warning("Skipping recurring rules with unknown timezone %r", name)
+            continue
+        zones.add(name)
+    return sorted(zones)
+
+async def generate_recurring_quests(today: date, zone: Optional[str] = None, user_id: Optional[str] = None) -> Dict[str, int]:
+    """Generate `today`'s quests for the rules of one timezone (all rules when zone
+    is None), for every user or just `user_id`"""
+    # Only rules due by today; rules that predate next_due are picked up once
+    due_filter: Dict[str, Any] = {"$or": [{"next_due": {"$lte": today.isoformat()}}, {"next_due": {"$exists": False}}]}
+    if zone:
+        due_filter = {**zone_filter(zone), **due_filter}
+    if user_id:
+        due_filter["user_id"] = user_id
+    tasks = [doc async for doc in db.Recurringtasks.find(due_filter, {"_id": 0})]
+
+    if _process_pool is not None and len(tasks) >= RECURRING_PARALLEL_MIN_RULES:
+        results = await evaluate_recurring_rules_parallel(tasks, today, _process_pool, RECURRING_WORKERS)
+    else:
+        results = evaluate_recurring_rules(tasks, today)
+
+    # results follow `tasks`; rule ids are only unique per user, so updates filter on both
+    owners = [t.get('user_id') for t in tasks]
+    fired = [(owner, rule_id, quest, next_due) for owner, (rule_id, quest, next_due) in zip(owners, results) if quest]
+    inserted = await insert_occurrences([quest for _, _, quest, _ in fired])
+
+    ops = []
+    for i, (owner, rule_id, _, next_due) in enumerate(fired):
+        # the occurrence exists either way; only the run that inserted it counts it
+        update: Dict[str, Any] = {"$set": {"last_added": today.isoformat(), "next_due": next_due}}
+        if i in inserted:
+            update["$inc"] = {"occurrences": 1}
+        ops.append(UpdateOne({"user_id": owner, "id": rule_id}, update))
+    for owner, (rule_id, quest, next_due) in zip(owners, results):
+        if not quest:
+            # missed or not-yet-evaluated rule: move next_due forward
+            ops.append(UpdateOne({"user_id": owner, "id": rule_id}, {"$set": {"next_due": next_due}}))
+    if ops:
+        await db.Recurringtasks.bulk_write(ops, ordered=False)
+    return {"evaluated": len(tasks), "created": len(inserted)}
+
+async def record_recurring_run(trigger: str, zone: str, today: date, started: datetime, elapsed: float, result: Dict[str, int],
+                               user_id: Optional[str] = None):
+    """Persist run metadata in RecurringRuns for monitoring (user_id None: a scheduler run over all users)"""
+    await db.RecurringRuns.insert_one({
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "trigger": trigger,
+        "owner": INSTANCE_ID,
+        "timezone": zone,
+        "run_date": today.isoformat(),
+        "started_at": started,
+        "duration_ms": round(elapsed * 1000, 1),
+        "rules_evaluated": result.get("evaluated", 0),
+        "quests_created": result.get("created", 0),
+    })
+
+async def run_and_record_recurring(trigger: str, zone: str, today: date, user_id: Optional[str] = None) -> Dict[str, int]:
+    started = datetime.now(timezone.utc)
+    t0 = time.perf_counter()
+    result = await generate_recurring_quests(today, zone, user_id)
+    await record_recurring_run(trigger, zone, today, started, time.perf_counter() - t0, result, user_id)
+    return result
+
+@api_router.post("/recurring/run")
+async def run_recurring_generation(user_id: CurrentUser):
+    # every zone generates for its own local date
+    totals = {"evaluated": 0, "created": 0}
+    zones: Dict[str, Dict[str, int]] = {}
+    for zone in await recurring_zones(user_id):
+        result = await run_and_record_recurring("api", zone, local_today(zone), user_id)
+        zones[zone] = result
+        totals["evaluated"] += result["evaluated"]
+        totals["created"] += result["created"]
+    return {**totals, "zones": zones}
+
+@api_router.get("/recurring/runs")
+async def list_recurring_runs(user_id: CurrentUser, limit: int = 20):
+    cur = db.RecurringRuns.find({"user_id": user_id}, DOC_PROJECTION).sort("started_at", -1).limit(max(1, min(limit, 500)))
+    return [doc async for doc in cur]
+
+# ---- Scheduled recurring generation ----
+async def acquire_lease(name: str, run_key: str, ttl_seconds: int) -> bool:
+    """Take the named lease for run_key unless another instance holds it or
+    run_key already completed. Relies on the unique _id: when the filter does
+    not match an existing lock document, the upsert fails with a duplicate key."""
+    now = datetime.now(timezone.utc)
+    try:
+        doc = await db.SchedulerLocks.find_one_and_update(
+            {
+                "_id": name,
+                "done_key": {"$ne": run_key},
+                "$or": [{"expires_at": {"$lte": now}}, {"owner": INSTANCE_ID}],
+            },
+            {"$set": {"owner": INSTANCE_ID, "run_key": run_key, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        return False
+    return bool(doc and doc.get("owner") == INSTANCE_ID)
+
+async def renew_lease(name: str, run_key: str, ttl_seconds: int):
+    res = await db.SchedulerLocks.update_one(
+        {"_id": name, "owner": INSTANCE_ID, "run_key": run_key},
+        {"$set": {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)}},
+    )
+    if not res.matched_count:
+        logger.warning("Lost lease %s for %s", name, run_key)
+
+async def lease_done(name: str, run_key: str) -> bool:
+    return await db.SchedulerLocks.find_one({"_id": name, "done_key": run_key}, {"_id": 1}) is not None
+
+async def heartbeat(renew, every: float):
+    """Call `renew` every `every` seconds until cancelled (run it as a task
+    next to the work a lease or job lease covers)"""
+    while True:
+        await asyncio.sleep(every)
+        try:
+            await renew()
+        except Exception:
+            logger.exception("Lease renewal failed")
+
+async def release_lease(name: str, run_key: str, done: bool):
+    update: Dict[str, Any] = {"expires_at": datetime.now(timezone.utc)}
+    if done:
+        update["done_key"] = run_key
+    await db.SchedulerLocks.update_one({"_id": name, "owner": INSTANCE_ID}, {"$set": update})
+
+def next_scheduled_run(now: datetime, run_at: str, tz: ZoneInfo) -> datetime:
+    hh, mm = (int(p) for p in run_at.split(":"))
+    local_now = now.astimezone(tz)
+    candidate = datetime.combine(local_now.date(), dtime(hh, mm), tzinfo=tz)
+    if candidate <= local_now:
+        candidate = datetime.combine(local_now.date() + timedelta(days=1), dtime(hh, mm), tzinfo=tz)
+    return candidate
+
+async def scheduled_recurring_once(zone: str, run_day: date) -> bool:
+    """Generate run_day's quests for `zone` unless another instance holds the
+    lease. True once the day is done (here or elsewhere); False means retry
+    on a later poll, e.g. to take over from a holder that died mid-run."""
+    lease = f"recurring-generation:{zone}"
+    run_key = run_day.isoformat()
+    if not await acquire_lease(lease, run_key, RECURRING_LEASE_SECONDS):
+        done = await lease_done(lease, run_key)
+        if not done:
+            logger.info("Recurring generation for %s %s is running on another instance", zone, run_key)
+        return done
+    done = False
+    renewer = asyncio.create_task(heartbeat(
+        lambda: renew_lease(lease, run_key, RECURRING_LEASE_SECONDS), RECURRING_LEASE_SECONDS / 3))
+    try:
+        result = await run_and_record_recurring("scheduler", zone, run_day)
+        done = True
+        logger.info("Recurring generation for %s %s: %s", zone, run_key, result)
+    finally:
+        renewer.cancel()
+        await release_lease(lease, run_key, done)
+    return done
+
+_zone_last_run: Dict[str, date] = {}
+
+async def recurring_scheduler_loop():
+    """Each zone runs once per local day, at RECURRING_RUN_AT local time (or
+    right away on startup if that time has already passed)."""
+    hh, mm = (int(p) for p in RECURRING_RUN_AT.split(":"))
+    while True:
+        zones = [RECURRING_TZ]
+        try:
+            zones = await recurring_zones()
+            now = datetime.now(timezone.utc)
+            for zone in zones:
+                local_now = now.astimezone(ZoneInfo(zone))
+                if local_now.time() >= dtime(hh, mm) and _zone_last_run.get(zone) != local_now.date():
+                    if await scheduled_recurring_once(zone, local_now.date()):
+                        _zone_last_run[zone] = local_now.date()
+        except Exception:
+            logger.exception("Scheduled recurring generation failed")
+        now = datetime.now(timezone.utc)
+        next_run = min(next_scheduled_run(now, RECURRING_RUN_AT, ZoneInfo(z)) for z in zones)
+        # wake up at least every RECURRING_SCHEDULER_POLL seconds to pick up new zones
+        await asyncio.sleep(min(RECURRING_SCHEDULER_POLL, max(1.0, (next_run - now).total_seconds())))
 
 # Rules
 @api_router.get("/rules", response_model=Optional[RulesDoc])
-async def get_rules():
-    doc = await db.Rules.find_one({}, {"_id": 0})
+async def get_rules(user_id: CurrentUser):
+    doc = await db.Rules.find_one({"user_id": user_id}, DOC_PROJECTION)
     if not doc:
         return None
     return RulesDoc(**doc)
@@ -627,52 +2086,62 @@ class RulesUpsert(BaseModel):
     content: str
 
 @api_router.put("/rules", response_model=RulesDoc)
-async def put_rules(body: RulesUpsert):
-    # single-document collection behavior
-    existing = await db.Rules.find_one({})
-    if existing:
-        await db.Rules.update_one({"id": existing.get("id")}, {"$set": {"content": body.content}})
-        updated = await db.Rules.find_one({"id": existing.get("id")}, {"_id": 0})
-        return RulesDoc(**updated)
-    doc = RulesDoc(content=body.content)
-    await db.Rules.insert_one(doc.dict())
-    return doc
+async def put_rules(body: RulesUpsert, user_id: CurrentUser):
+    # one document per user (unique user_id index)
+    doc = await db.Rules.find_one_and_update(
+        {"user_id": user_id},
+        {"$set": {"content": body.content}, "$setOnInsert": {"id": str(uuid.uuid4())}},
+        projection=DOC_PROJECTION,
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return RulesDoc(**doc)
 
 # ---- New: Per-quest recurrence management ----
 class QuestRecurrencePayload(BaseModel):
     frequency: Literal['Daily', 'Weekly', 'Weekdays', 'Monthly', 'Annual']
     days: Optional[str] = None
     monthly_on_date: Optional[int] = None
-    interval: Optional[int] = 1
+    interval: Optional[int] = Field(1, ge=1, le=RECURRING_MAX_INTERVAL)
     monthly_mode: Optional[Literal['date','weekday']] = None
     monthly_week_index: Optional[int] = None
     monthly_weekday: Optional[str] = None
     ends: Optional[Literal['never','on_date','after']] = 'never'
     until_date: Optional[date] = None
     count: Optional[int] = None
+    timezone: Optional[str] = None
+
+@api_router.post("/recurring/preview")
+async def preview_recurrence(body: QuestRecurrencePayload, user_id: CurrentUser, n: int = 10, start: Optional[date] = None):
+    """Next n dates a rule with this payload would produce, starting today
+    (in the payload's timezone) unless `start` is given."""
+    check_timezone(body.timezone)
+    start = start or local_today(body.timezone)
+    rule = compile_rule(body.dict(), start)
+    # sparse rules (e.g. one weekday every 365 weeks) scan thousands of days: keep that off the event loop
+    dates = await asyncio.to_thread(preview_rule_dates, rule, start, max(1, min(n, PREVIEW_MAX_DATES)))
+    return {"dates": [d.isoformat() for d in dates]}
 
 @api_router.get("/quests/active/{quest_id}/recurrence", response_model=Optional[RecurringTask])
-async def get_quest_recurrence(quest_id: str):
-    q = await db.ActiveQuests.find_one({"id": quest_id})
+async def get_quest_recurrence(quest_id: str, user_id: CurrentUser):
+    q = await find_quest_with_recurrence(user_id, quest_id)
     if not q:
         raise HTTPException(status_code=404, detail="Quest not found")
-    rec_id = q.get('recurring_id')
-    if not rec_id:
+    if not q["recurrence"]:
         return None
-    rec = await db.Recurringtasks.find_one({"id": rec_id}, {"_id": 0})
-    if not rec:
-        return None
-    return RecurringTask(**rec)
+    return RecurringTask(**q["recurrence"])
 
 @api_router.put("/quests/active/{quest_id}/recurrence", response_model=RecurringTask)
-async def put_quest_recurrence(quest_id: str, body: QuestRecurrencePayload):
-    q = await db.ActiveQuests.find_one({"id": quest_id})
+async def put_quest_recurrence(quest_id: str, body: QuestRecurrencePayload, user_id: CurrentUser):
+    check_timezone(body.timezone)
+    q = await find_quest_with_recurrence(user_id, quest_id)
     if not q:
         raise HTTPException(status_code=404, detail="Quest not found")
     rec_id = q.get('recurring_id')
-    if rec_id:
+    existing = q["recurrence"]
+    if existing:
         # update existing recurring
-        await db.Recurringtasks.update_one({"id": rec_id}, {"$set": {
+        fields = serialize_dates_for_mongo({
             "task_name": q["quest_name"],
             "quest_rank": q["quest_rank"],
             "frequency": body.frequency,
@@ -686,9 +2155,13 @@ async def put_quest_recurrence(quest_id: str, body: QuestRecurrencePayload):
             "until_date": body.until_date,
             "count": body.count,
             "status": q["status"],
-        }})
-        rec = await db.Recurringtasks.find_one({"id": rec_id}, {"_id": 0})
-        return RecurringTask(**rec)
+        })
+        unset = set_rule_timezone(fields, body)
+        rule = {k: v for k, v in {**existing, **fields}.items() if k not in unset}
+        fields["next_due"] = rule["next_due"] = rule_next_due(rule, rule_today(rule))
+        update = {"$set": fields, "$unset": unset} if unset else {"$set": fields}
+        await db.Recurringtasks.update_one({"user_id": user_id, "id": rec_id}, update)
+        return RecurringTask(**rule)
     # create new recurring
     new_rec = RecurringTask(
         task_name=q["quest_name"],
@@ -704,26 +2177,452 @@ async def put_quest_recurrence(quest_id: str, body: QuestRecurrencePayload):
         until_date=body.until_date,
         count=body.count,
         status=q["status"],
-        start_date=datetime.now(timezone.utc).date(),
+        timezone=body.timezone or None,
+        start_date=local_today(body.timezone),
     )
-    await db.Recurringtasks.insert_one(serialize_dates_for_mongo(new_rec.dict()))
-    await db.ActiveQuests.update_one({"id": quest_id}, {"$set": {"recurring_id": new_rec.id}})
+    await db.Recurringtasks.insert_one(recurring_insert_doc(new_rec, user_id))
+    await db.ActiveQuests.update_one({"user_id": user_id, "id": quest_id}, {"$set": {"recurring_id": new_rec.id}})
     return new_rec
 
 @api_router.delete("/quests/active/{quest_id}/recurrence")
-async def delete_quest_recurrence(quest_id: str, delete_rule: bool = True):
-    q = await db.ActiveQuests.find_one({"id": quest_id})
+async def delete_quest_recurrence(quest_id: str, user_id: CurrentUser, delete_rule: bool = True):
+    q = await db.ActiveQuests.find_one({"user_id": user_id, "id": quest_id})
     if not q:
         raise HTTPException(status_code=404, detail="Quest not found")
     rec_id = q.get('recurring_id')
     if not rec_id:
         return {"ok": True}
     # unlink quest
-    await db.ActiveQuests.update_one({"id": quest_id}, {"$set": {"recurring_id": None}})
+    await db.ActiveQuests.update_one({"user_id": user_id, "id": quest_id}, {"$set": {"recurring_id": None}})
     if delete_rule:
-        await db.Recurringtasks.delete_one({"id": rec_id})
+        await db.Recurringtasks.delete_one({"user_id": user_id, "id": rec_id})
     return {"ok": True}
 
+# ---- NDJSON export ----
+# collection -> (time field used by `since` and ordering, model)
+EXPORT_COLLECTIONS: Dict[str, Any] = {
+    "CompletedQuests": ("date_completed", CompletedQuest),
+    "RewardLog": ("date_redeemed", RewardLogItem),
+}
+
+async def iter_ndjson(cursor, model: Type[BaseModel], compress: bool):
+    """Yield one chunk per cursor batch so memory stays bounded by EXPORT_BATCH"""
+    defaults = stored_defaults(model)
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    batch: List[bytes] = []
+    async for doc in cursor:
+        for key, value in defaults.items():
+            doc.setdefault(key, value)
+        batch.append(orjson.dumps(doc, option=orjson.OPT_APPEND_NEWLINE))
+        if len(batch) >= EXPORT_BATCH:
+            chunk = b"".join(batch)
+            batch = []
+            if gz:
+                chunk = gz.compress(chunk)
+                if not chunk:
+                    continue
+            yield chunk
+    chunk = b"".join(batch)
+    if gz:
+        chunk = gz.compress(chunk) + gz.flush()
+    if chunk:
+        yield chunk
+
+@api_router.get("/export/{collection}.ndjson")
+async def export_ndjson(collection: str, request: Request, user_id: CurrentUser, since: Optional[datetime] = None, gzip: Optional[bool] = None):
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown export collection")
+    time_field, model = EXPORT_COLLECTIONS[collection]
+    cur = iter_history(user_id, collection, since, None, sort=True, batch=EXPORT_BATCH, route="export")
+    if gzip is None:
+        gzip = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {"Content-Disposition": f'attachment; filename="{collection}.ndjson"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(iter_ndjson(cur, model, gzip), media_type="application/x-ndjson", headers=headers)
+
+# ---- History archival ----
+# Completions and redemptions older than ARCHIVE_AFTER_DAYS move out of the XP
+# ledger into HistoryArchive parts: {user_id, collection, month: "YYYY-MM",
+# seq, count, first, last, state: pending|done, data: zlib(orjson list of docs)}.
+# ArchiveState keeps {user_id, collection, archived_before}: everything of that
+# user older than the watermark lives in parts, apart from entries appended
+# after the run's ledger snapshot, which stay in the ledger. Snapshots and daily
+# XP rollups are left untouched, so summaries and analytics never read archives;
+# list/export endpoints read them only when the requested range starts before
+# the watermark.
+
+def to_utc_naive(dt: datetime) -> datetime:
+    """Comparable with the naive UTC datetimes Mongo hands back"""
+    if dt.tzinfo:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+async def archive_watermarks(user_id: str, route: Optional[str] = None, session=None) -> Dict[str, Optional[datetime]]:
+    marks: Dict[str, Optional[datetime]] = {c: None for c in EXPORT_COLLECTIONS}
+    async for doc in reader(route).ArchiveState.find({"user_id": user_id}, {"_id": 0}, session=session):
+        marks[doc["collection"]] = doc.get("archived_before")
+    return marks
+
+def pack_archive_docs(docs: List[Dict[str, Any]]) -> bytes:
+    return zlib.compress(orjson.dumps(docs), 6)
+
+def unpack_archive_docs(data: bytes) -> List[Dict[str, Any]]:
+    return orjson.loads(zlib.decompress(data))
+
+async def finish_archive_part(part: Dict[str, Any]):
+    """Drop the originals of a written part, then publish it to readers"""
+    docs = await asyncio.to_thread(unpack_archive_docs, part["data"])
+    kind, _, _ = LEDGER_KINDS[part["collection"]]
+    await db.XpLedger.delete_many({"user_id": part["user_id"], "kind": kind, "id": {"$in": [d["id"] for d in docs]}})
+    await db.HistoryArchive.update_one({"_id": part["_id"]}, {"$set": {"state": "done"}})
+
+async def write_archive_part(user_id: str, collection: str, month: str, docs: List[Dict[str, Any]]):
+    time_field, _ = EXPORT_COLLECTIONS[collection]
+    last = await db.HistoryArchive.find_one({"user_id": user_id, "collection": collection, "month": month}, sort=[("seq", -1)])
+    part = {
+        "user_id": user_id,
+        "collection": collection,
+        "month": month,
+        "seq": (last["seq"] + 1) if last else 0,
+        "count": len(docs),
+        "first": docs[0][time_field],
+        "last": docs[-1][time_field],
+        "state": "pending",
+        "data": await asyncio.to_thread(pack_archive_docs, docs),
+    }
+    res = await db.HistoryArchive.insert_one(part)
+    part["_id"] = res.inserted_id
+    await finish_archive_part(part)
+
+async def archive_history(user_id: str, report=None, older_than_days: Optional[int] = None) -> Dict[str, Any]:
+    """Move a user's old completions/redemptions into monthly compressed archive parts.
+
+    A part is written as pending before its originals are deleted, so a run
+    that dies midway is completed by the next one instead of duplicating rows.
+    Only ledger entries covered by a snapshot are archived, so balances never
+    need the archived entries.
+    """
+    days = ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = day_start(datetime.now(timezone.utc).date() - timedelta(days=days))
+    async for part in db.HistoryArchive.find({"user_id": user_id, "state": "pending"}):
+        await finish_archive_part(part)
+
+    covered = await snapshot_ledger(user_id, force=True)
+    result: Dict[str, Any] = {"archived_before": cutoff.isoformat()}
+    for collection, (time_field, _) in EXPORT_COLLECTIONS.items():
+        archived = 0
+        month: Optional[str] = None
+        batch: List[Dict[str, Any]] = []
+        query = {"user_id": user_id, "kind": LEDGER_KINDS[collection][0], "at": {"$lt": cutoff}, "seq": {"$lte": covered}}
+        cur = db.XpLedger.find(query, LEDGER_PROJECTION).sort("at", 1).batch_size(ARCHIVE_PART_ROWS)
+        async for doc in cur:
+            doc_month = doc[time_field].strftime("%Y-%m")
+            if batch and (doc_month != month or len(batch) >= ARCHIVE_PART_ROWS):
+                await write_archive_part(user_id, collection, month, batch)
+                archived += len(batch)
+                batch = []
+                if report:
+                    await report(archived)
+            month = doc_month
+            batch.append(doc)
+        if batch:
+            await write_archive_part(user_id, collection, month, batch)
+            archived += len(batch)
+        # the watermark only moves forward, even if a run uses a shorter horizon later
+        await db.ArchiveState.update_one(
+            {"user_id": user_id, "collection": collection},
+            {"$max": {"archived_before": cutoff}},
+            upsert=True,
+        )
+        result[collection] = archived
+    return result
+
+async def iter_archived(user_id: str, collection: str, start: Optional[datetime], end: Optional[datetime],
+                        route: Optional[str] = None, session=None):
+    """The user's archived documents of `collection` in [start, end), oldest part first"""
+    time_field, _ = EXPORT_COLLECTIONS[collection]
+    query: Dict[str, Any] = {"user_id": user_id, "collection": collection, "state": "done"}
+    if start:
+        query["last"] = {"$gte": start}
+    if end:
+        query["first"] = {"$lt": end}
+    async for part in reader(route).HistoryArchive.find(query, {"_id": 0}, session=session).sort([("month", 1), ("seq", 1)]):
+        for doc in await asyncio.to_thread(unpack_archive_docs, part["data"]):
+            when = datetime.fromisoformat(doc[time_field])
+            if (start and when < start) or (end and when >= end):
+                continue
+            yield doc
+
+async def iter_history(user_id: str, collection: str, start: Optional[datetime], end: Optional[datetime],
+                       sort: bool = False, batch: int = JSON_STREAM_BATCH, route: Optional[str] = None):
+    """The user's documents of a history collection in [start, end): archived
+    parts first, but only if the range reaches back past the archive watermark,
+    then the ledger entries of the collection's kind.
+
+    The watermark, parts and live documents are read through `route` in one
+    causally consistent session, so members at different lag can't split them."""
+    start = to_utc_naive(start) if start else None
+    end = to_utc_naive(end) if end else None
+    session = await start_read_session(route)
+    try:
+        watermark = (await archive_watermarks(user_id, route, session))[collection]
+        if watermark and (start is None or start < watermark):
+            async for doc in iter_archived(user_id, collection, start, end, route, session):
+                yield doc
+        query: Dict[str, Any] = {"user_id": user_id, "kind": LEDGER_KINDS[collection][0]}
+        rng: Dict[str, Any] = {}
+        if start:
+            rng["$gte"] = start
+        if end:
+            rng["$lt"] = end
+        if rng:
+            query["at"] = rng
+        cur = reader(route).XpLedger.find(query, LEDGER_PROJECTION, session=session)
+        if sort:
+            cur = cur.sort("at", 1)
+        async for doc in cur.batch_size(batch):
+            yield doc
+    finally:
+        if session:
+            await session.end_session()
+
+async def stream_history_list(user_id: str, collection: str, start: Optional[datetime], end: Optional[datetime]) -> StreamingResponse:
+    _, model = EXPORT_COLLECTIONS[collection]
+    return StreamingResponse(
+        iter_json_array(iter_history(user_id, collection, start, end, route="history"), model),
+        media_type="application/json",
+    )
+
+@api_router.post("/archive/run")
+async def run_archive(user_id: CurrentUser, older_than_days: Optional[int] = Query(None, ge=0), wait: bool = False):
+    params = {"older_than_days": older_than_days}
+    if wait:
+        return await archive_history(user_id, **params)
+    return job_accepted(await enqueue_job("archive_history", params, user_id))
+
+# ---- Bulk import ----
+IMPORT_COLLECTIONS: Dict[str, Type[BaseModel]] = {
+    # not ActiveQuest: occurrence keys are only ever set by recurring generation
+    "ActiveQuests": ActiveQuestCreate,
+    "CompletedQuests": CompletedQuest,
+    "Recurringtasks": RecurringTask,
+}
+
+def normalize_import_header(name: str) -> str:
+    """'Quest Name' / 'quest-name' -> 'quest_name' (matches the Sheets column titles)"""
+    return name.strip().lower().replace(" ", "_").replace("-", "_")
+
+async def iter_text_lines(chunks):
+    """Decode an async stream of UTF-8 byte chunks into lines"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def iter_file_chunks(path: str, size: int = 1 << 20):
+    with open(path, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, size)
+            if not chunk:
+                break
+            yield chunk
+
+async def spool_request_body(request: Request) -> str:
+    """Copy the request body to a local file so a background job can read it"""
+    fd, path = tempfile.mkstemp(prefix="import-", suffix=".spool", dir=JOB_SPOOL_DIR)
+    with os.fdopen(fd, "wb") as f:
+        async for chunk in request.stream():
+            await asyncio.to_thread(f.write, chunk)
+    return path
+
+class NeedMoreLines(Exception):
+    pass
+
+class ImportFormatError(ValueError):
+    pass
+
+class CsvLineFeed:
+    """Sync line iterator for csv.reader over lines that arrive asynchronously.
+    When it runs dry mid-stream it raises NeedMoreLines; the caller awaits
+    another line, rewinds, and the reader parses the record again from its
+    first line (quoted cells may span lines)."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.pos = 0
+        self.eof = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self.pos < len(self.lines):
+            self.pos += 1
+            return self.lines[self.pos - 1]
+        if self.eof:
+            raise StopIteration
+        raise NeedMoreLines
+
+    def commit(self):
+        """The lines read so far made complete records"""
+        del self.lines[:self.pos]
+        self.pos = 0
+
+async def iter_csv_records(lines):
+    feed = CsvLineFeed()
+    reader = csv.reader(feed)
+    source = lines.__aiter__()
+    while True:
+        try:
+            values = next(reader)
+        except NeedMoreLines:
+            feed.pos = 0
+            if len(feed.lines) >= IMPORT_CSV_MAX_RECORD_LINES:
+                raise ImportFormatError(f"A CSV record spans more than {IMPORT_CSV_MAX_RECORD_LINES} lines (unterminated quote?)")
+            try:
+                feed.lines.append(await source.__anext__() + "\n")
+            except StopAsyncIteration:
+                feed.eof = True
+            continue
+        except StopIteration:
+            return
+        feed.commit()
+        yield values
+
+async def iter_import_chunks(lines, fmt: str):
+    """Yield lists of (row_number, raw_row) with at most IMPORT_BATCH rows each"""
+    header: Optional[List[str]] = None
+    rows: List[Any] = []
+    row_no = 0
+    async for record in (iter_csv_records(lines) if fmt == "csv" else lines):
+        if fmt == "csv":
+            if not "".join(record).strip():
+                continue
+            if header is None:
+                header = [normalize_import_header(h) for h in record]
+                continue
+            # empty cells fall back to model defaults
+            raw: Any = {k: v for k, v in zip(header, record) if v != ""}
+        else:
+            if not record.strip():
+                continue
+            raw = record
+        row_no += 1
+        rows.append((row_no, raw))
+        if len(rows) >= IMPORT_BATCH:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+async def import_lines(user_id: str, lines, collection: str, fmt: str, report=None) -> Dict[str, Any]:
+    model = IMPORT_COLLECTIONS[collection]
+    received = 0
+    inserted = 0
+    error_count = 0
+    errors: List[Dict[str, Any]] = []
+
+    def add_error(row: int, message: str):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append({"row": row, "error": message})
+
+    async for chunk in iter_import_chunks(lines, fmt):
+        if report:
+            await report(received)
+        received += len(chunk)
+        docs: List[Dict[str, Any]] = []
+        doc_rows: List[int] = []
+        for row_no, raw in chunk:
+            try:
+                data = orjson.loads(raw) if isinstance(raw, str) else raw
+                if not isinstance(data, dict):
+                    raise ValueError("row is not an object")
+                item = model(**data)
+                if isinstance(item, RecurringTask) and item.timezone:
+                    ZoneInfo(item.timezone)
+            except (ValidationError, ValueError, TypeError) as e:
+                add_error(row_no, str(e))
+                continue
+            except ZoneInfoNotFoundError:
+                add_error(row_no, f"Unknown timezone: {item.timezone}")
+                continue
+            # rows can't carry a user_id of their own: the model drops unknown keys
+            if isinstance(item, RecurringTask):
+                item.timezone = item.timezone or None  # "" means RECURRING_TZ, like in the upserts
+                docs.append(recurring_insert_doc(item, user_id))
+            elif collection in LEDGER_KINDS:
+                docs.append(ledger_entry(collection, serialize_dates_for_mongo(item.dict())))  # append_ledger adds user_id
+            else:
+                docs.append({"user_id": user_id, **serialize_dates_for_mongo(item.dict())})
+            doc_rows.append(row_no)
+        if not docs:
+            continue
+        failed: set = set()
+        if collection in LEDGER_KINDS:
+            await append_ledger(user_id, docs)
+            inserted += len(docs)
+        else:
+            try:
+                res = await db[collection].insert_many(docs, ordered=False)
+                inserted += len(res.inserted_ids)
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                inserted += len(docs) - len(write_errors)
+                for we in write_errors:
+                    failed.add(we["index"])
+                    add_error(doc_rows[we["index"]], we.get("errmsg", "write error"))
+        if collection == "CompletedQuests":
+            await bump_xp_rollups(user_id, [
+                (doc["date_completed"], rollup_completion_inc(doc))
+                for i, doc in enumerate(docs) if i not in failed
+            ])
+    if collection == "CompletedQuests" and inserted:
+        await invalidate_xp_cache(user_id)  # imported history may land on already-cached days
+    if report:
+        await report(received, received)
+    return {
+        "collection": collection,
+        "received": received,
+        "inserted": inserted,
+        "error_count": error_count,
+        "errors": errors,
+    }
+
+@api_router.post("/import")
+async def import_rows(request: Request, collection: str, user_id: CurrentUser,
+                      format: Optional[Literal['ndjson', 'csv']] = None, wait: bool = False):
+    if collection not in IMPORT_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown import collection")
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if wait:
+        try:
+            return await import_lines(user_id, iter_text_lines(request.stream()), collection, fmt)
+        except ImportFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    path = await spool_request_body(request)
+    # the spool file is local to this replica, so only this instance may run the job
+    job = await enqueue_job("import", {"collection": collection, "format": fmt, "path": path}, user_id, pinned=True)
+    return job_accepted(job)
+
+async def import_job(user_id: str, params: Dict[str, Any], report) -> Dict[str, Any]:
+    try:
+        lines = iter_text_lines(iter_file_chunks(params["path"]))
+        return await import_lines(user_id, lines, params["collection"], params["format"], report)
+    finally:
+        try:
+            os.remove(params["path"])
+        except FileNotFoundError:
+            pass
+
 # ---- Holidays 2025 ----
 HOLIDAYS_2025 = [
     {"name": "New Year’s Day", "date": date(2025, 1, 1)},
@@ -742,16 +2641,16 @@ HOLIDAYS_2025 = [
 HOLIDAYS_CATEGORY_NAME = "Holidays"
 HOLIDAYS_CATEGORY_COLOR = "#A3B18A"  # soft sage green
 
-async def ensure_holidays_category() -> Category:
-    existing = await db.Categories.find_one({"name": HOLIDAYS_CATEGORY_NAME}, {"_id": 0})
+async def ensure_holidays_category(user_id: str) -> Category:
+    existing = await db.Categories.find_one({"user_id": user_id, "name": HOLIDAYS_CATEGORY_NAME}, DOC_PROJECTION)
     if existing:
         # ensure color is set to the configured value (non-destructive if already same)
         if existing.get("color") != HOLIDAYS_CATEGORY_COLOR:
-            await db.Categories.update_one({"id": existing["id"]}, {"$set": {"color": HOLIDAYS_CATEGORY_COLOR}})
-            existing = await db.Categories.find_one({"id": existing["id"]}, {"_id": 0})
+            await db.Categories.update_one({"user_id": user_id, "id": existing["id"]}, {"$set": {"color": HOLIDAYS_CATEGORY_COLOR}})
+            existing = await db.Categories.find_one({"user_id": user_id, "id": existing["id"]}, DOC_PROJECTION)
         return Category(**existing)
     cat = Category(name=HOLIDAYS_CATEGORY_NAME, color=HOLIDAYS_CATEGORY_COLOR, active=True)
-    await db.Categories.insert_one(cat.dict())
+    await db.Categories.insert_one({"user_id": user_id, **cat.dict()})
     return cat
 
 @api_router.get("/holidays/2025")
@@ -759,16 +2658,24 @@ async def list_holidays_2025():
     return [{"name": h["name"], "date": h["date"].isoformat()} for h in HOLIDAYS_2025]
 
 @api_router.post("/holidays/seed-2025")
-async def seed_holidays_2025():
-    cat = await ensure_holidays_category()
+async def seed_holidays_2025(user_id: CurrentUser, wait: bool = False):
+    if wait:
+        return await seed_holidays(user_id, HOLIDAYS_2025)
+    return job_accepted(await enqueue_job("seed_holidays_2025", {}, user_id))
+
+async def seed_holidays(user_id: str, holidays: List[Dict[str, Any]], report=None) -> Dict[str, Any]:
+    cat = await ensure_holidays_category(user_id)
     created = 0
     skipped = 0
     linked = 0
-    for h in HOLIDAYS_2025:
+    for i, h in enumerate(holidays):
+        if report:
+            await report(i, len(holidays))
         qname = h["name"]
         qdate = h["date"].isoformat()
         # Idempotent check: same name + date + category
         existing = await db.ActiveQuests.find_one({
+            "user_id": user_id,
             "quest_name": qname,
             "due_date": qdate,
             "category_id": cat.id,
@@ -794,8 +2701,8 @@ async def seed_holidays_2025():
                     category_id=cat.id,
                     is_event=True,
                 )
-                await db.Recurringtasks.insert_one(serialize_dates_for_mongo(new_rec.dict()))
-                await db.ActiveQuests.update_one({"id": existing["id"]}, {"$set": {"recurring_id": new_rec.id}})
+                await db.Recurringtasks.insert_one(recurring_insert_doc(new_rec, user_id))
+                await db.ActiveQuests.update_one({"user_id": user_id, "id": existing["id"]}, {"$set": {"recurring_id": new_rec.id}})
                 linked += 1
             else:
                 skipped += 1
@@ -813,7 +2720,7 @@ async def seed_holidays_2025():
             category_id=cat.id,
             is_event=True,
         )
-        await db.ActiveQuests.insert_one(serialize_dates_for_mongo(new_q.dict()))
+        await db.ActiveQuests.insert_one({"user_id": user_id, **serialize_dates_for_mongo(new_q.dict())})
         # create and link Annual recurrence
         new_rec = RecurringTask(
             task_name=new_q.quest_name,
@@ -833,11 +2740,449 @@ async def seed_holidays_2025():
             category_id=cat.id,
             is_event=True,
         )
-        await db.Recurringtasks.insert_one(serialize_dates_for_mongo(new_rec.dict()))
-        await db.ActiveQuests.update_one({"id": new_q.id}, {"$set": {"recurring_id": new_rec.id}})
+        await db.Recurringtasks.insert_one(recurring_insert_doc(new_rec, user_id))
+        await db.ActiveQuests.update_one({"user_id": user_id, "id": new_q.id}, {"$set": {"recurring_id": new_rec.id}})
         created += 1
+    if report:
+        await report(len(holidays), len(holidays))
     return {"created": created, "skipped": skipped, "linked": linked, "category_id": cat.id}
 
+# ---- Background jobs ----
+# Jobs collection: {id, user_id, kind, params, status: queued|running|succeeded|failed,
+# progress: {done, total}, result, error, attempts, owner, lease_expires,
+# pinned_to}. Handlers run on behalf of the user that enqueued the job. Workers in every replica claim queued jobs (or running jobs whose
+# lease expired) with find_one_and_update; a job pinned_to an instance is only
+# claimed there. A pinned job holds a lease from the moment it's queued, which
+# its instance keeps renewing; once that lapses the instance is gone (with the
+# spool file) and any replica fails the job instead of leaving it queued forever.
+
+async def seed_holidays_job(user_id: str, params: Dict[str, Any], report) -> Dict[str, Any]:
+    return await seed_holidays(user_id, HOLIDAYS_2025, report)
+
+async def unlink_category_job(user_id: str, params: Dict[str, Any], report) -> Dict[str, Any]:
+    return await unlink_category(user_id, params["category_id"], report)
+
+async def rebuild_xp_rollups_job(user_id: str, params: Dict[str, Any], report) -> Dict[str, Any]:
+    return await rebuild_xp_rollups(user_id)
+
+async def archive_history_job(user_id: str, params: Dict[str, Any], report) -> Dict[str, Any]:
+    return await archive_history(user_id, report, params.get("older_than_days"))
+
+JOB_HANDLERS: Dict[str, Any] = {
+    "import": import_job,
+    "seed_holidays_2025": seed_holidays_job,
+    "unlink_category": unlink_category_job,
+    "rebuild_xp_rollups": rebuild_xp_rollups_job,
+    "archive_history": archive_history_job,
+}
+
+_job_wakeup: Optional[asyncio.Event] = None
+_job_tasks: List[asyncio.Task] = []
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    status: Literal['queued', 'running', 'succeeded', 'failed']
+    progress: Dict[str, Optional[int]] = {}
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+async def enqueue_job(kind: str, params: Dict[str, Any], user_id: str, pinned: bool = False) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    job = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "kind": kind,
+        "params": params,
+        "status": "queued",
+        "progress": {"done": 0, "total": None},
+        "result": None,
+        "error": None,
+        "attempts": 0,
+        "created_at": now,
+        "started_at": None,
+        "finished_at": None,
+        "owner": None,
+        "lease_expires": now + timedelta(seconds=JOB_LEASE_SECONDS) if pinned else None,
+        "pinned_to": INSTANCE_ID if pinned else None,
+    }
+    await db.Jobs.insert_one(dict(job))
+    if _job_wakeup:
+        _job_wakeup.set()
+    return job
+
+def job_accepted(job: Dict[str, Any], **extra) -> JSONResponse:
+    return JSONResponse(status_code=202, content={
+        **extra,
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/api/jobs/{job['id']}",
+    })
+
+async def claim_job() -> Optional[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    return await db.Jobs.find_one_and_update(
+        {
+            "pinned_to": {"$in": [None, INSTANCE_ID]},
+            "$or": [
+                {"status": "queued"},
+                # owner died mid-run: retry a limited number of times
+                {"status": "running", "lease_expires": {"$lt": now}, "attempts": {"$lt": JOB_MAX_ATTEMPTS}},
+            ],
+        },
+        {
+            "$set": {"status": "running", "owner": INSTANCE_ID, "started_at": now,
+                     "lease_expires": now + timedelta(seconds=JOB_LEASE_SECONDS)},
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+async def run_job(job: Dict[str, Any]):
+    async def report(done: int, total: Optional[int] = None):
+        await db.Jobs.update_one({"id": job["id"], "owner": INSTANCE_ID}, {"$set": {
+            "progress": {"done": done, "total": total},
+        }})
+
+    async def renew():
+        # handlers may go longer than a lease between reports (or never report)
+        await db.Jobs.update_one({"id": job["id"], "owner": INSTANCE_ID, "status": "running"}, {"$set": {
+            "lease_expires": datetime.now(timezone.utc) + timedelta(seconds=JOB_LEASE_SECONDS),
+        }})
+
+    handler = JOB_HANDLERS.get(job["kind"])
+    update: Dict[str, Any]
+    renewer = asyncio.create_task(heartbeat(renew, JOB_LEASE_SECONDS / 3))
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {job['kind']}")
+        result = await handler(job.get("user_id"), job.get("params") or {}, report)
+        update = {"status": "succeeded", "result": result}
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job["id"], job["kind"])
+        update = {"status": "failed", "error": str(e)}
+    finally:
+        renewer.cancel()
+    update["finished_at"] = datetime.now(timezone.utc)
+    await db.Jobs.update_one({"id": job["id"], "owner": INSTANCE_ID}, {"$set": update})
+
+async def renew_pinned_jobs():
+    await db.Jobs.update_many({"status": "queued", "pinned_to": INSTANCE_ID}, {"$set": {
+        "lease_expires": datetime.now(timezone.utc) + timedelta(seconds=JOB_LEASE_SECONDS),
+    }})
+
+async def fail_abandoned_jobs() -> int:
+    now = datetime.now(timezone.utc)
+    res = await db.Jobs.update_many(
+        {
+            "status": {"$in": ["queued", "running"]},
+            "lease_expires": {"$lt": now},
+            "$or": [
+                # pinned to an instance that stopped renewing: nobody else can run it
+                {"pinned_to": {"$nin": [None, INSTANCE_ID]}},
+                # out of retries, so claim_job won't pick it up again
+                {"status": "running", "attempts": {"$gte": JOB_MAX_ATTEMPTS}},
+            ],
+        },
+        {"$set": {"status": "failed", "error": "The worker running this job stopped before it finished", "finished_at": now}},
+    )
+    if res.modified_count:
+        logger.warning("Failed %s abandoned job(s)", res.modified_count)
+    return res.modified_count
+
+async def job_lease_loop():
+    while True:
+        try:
+            await renew_pinned_jobs()
+            await fail_abandoned_jobs()
+        except Exception:
+            logger.exception("Job lease upkeep failed")
+        await asyncio.sleep(max(JOB_LEASE_SECONDS / 3, JOB_POLL_SECONDS))
+
+async def job_worker_loop():
+    while True:
+        try:
+            job = await claim_job()
+        except Exception:
+            logger.exception("Claiming a job failed")
+            job = None
+        if job:
+            try:
+                await run_job(job)
+            except Exception:
+                # run_job records handler errors itself; this is the final status write
+                logger.exception("Recording the outcome of job %s failed", job["id"])
+            continue
+        try:
+            await asyncio.wait_for(_job_wakeup.wait(), timeout=JOB_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _job_wakeup.clear()
+
+@api_router.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str, user_id: CurrentUser):
+    doc = await db.Jobs.find_one({"id": job_id, "user_id": user_id}, DOC_PROJECTION)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return Job(**doc)
+
+# ---- Metrics ----
+# Per-process counters keyed by (method, route template); each replica/worker
+# exposes its own and Prometheus sums them.
+
+class RouteStats:
+    __slots__ = ("buckets", "count", "seconds", "statuses", "mongo_calls", "mongo_seconds", "serialize_seconds")
+
+    def __init__(self):
+        self.buckets = [0] * len(METRICS_BUCKETS)
+        self.count = 0
+        self.seconds = 0.0
+        self.statuses: Dict[int, int] = {}
+        self.mongo_calls = 0
+        self.mongo_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+    def observe(self, status: int, seconds: float, prof: RequestProfile):
+        for i, le in enumerate(METRICS_BUCKETS):
+            if seconds <= le:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.seconds += seconds
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.mongo_calls += prof.mongo_calls
+        self.mongo_seconds += prof.mongo_seconds
+        self.serialize_seconds += prof.serialize_seconds
+
+_ROUTE_STATS: Dict[Tuple[str, str], RouteStats] = {}
+
+def prometheus_labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+def render_metrics() -> str:
+    out: List[str] = []
+    stats = sorted(_ROUTE_STATS.items())
+
+    def header(name: str, kind: str, help_text: str):
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+
+    header("quest_http_request_duration_seconds", "histogram", "Request latency by route, including streamed bodies")
+    for (method, route), st in stats:
+        cumulative = 0
+        for le, n in zip(METRICS_BUCKETS, st.buckets):
+            cumulative += n
+            out.append(f"quest_http_request_duration_seconds_bucket{prometheus_labels(method=method, route=route, le=le)} {cumulative}")
+        out.append(f"quest_http_request_duration_seconds_bucket{prometheus_labels(method=method, route=route, le='+Inf')} {st.count}")
+        out.append(f"quest_http_request_duration_seconds_sum{prometheus_labels(method=method, route=route)} {st.seconds}")
+        out.append(f"quest_http_request_duration_seconds_count{prometheus_labels(method=method, route=route)} {st.count}")
+    header("quest_http_responses_total", "counter", "Responses by route and status code")
+    for (method, route), st in stats:
+        for status, n in sorted(st.statuses.items()):
+            out.append(f"quest_http_responses_total{prometheus_labels(method=method, route=route, status=status)} {n}")
+    for name, attr, help_text in (
+        ("quest_mongo_commands_total", "mongo_calls", "MongoDB commands issued while serving the route"),
+        ("quest_mongo_seconds_total", "mongo_seconds", "Time spent in MongoDB round trips while serving the route"),
+        ("quest_serialize_seconds_total", "serialize_seconds", "Time spent validating/encoding response bodies"),
+    ):
+        header(name, "counter", help_text)
+        for (method, route), st in stats:
+            out.append(f"{name}{prometheus_labels(method=method, route=route)} {getattr(st, attr)}")
+    return "\n".join(out) + "\n"
+
+class ProfilingMiddleware:
+    """Times each HTTP request end to end (streamed bodies included) and
+    records it under the matched route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        prof = RequestProfile()
+        token = _request_profile.set(prof)
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    # a streamed body is still being produced: this covers work up to the headers
+                    timing = (
+                        f"app;dur={(time.perf_counter() - t0) * 1000:.1f}, "
+                        f"db;desc=\"{prof.mongo_calls} calls\";dur={prof.mongo_seconds * 1000:.1f}, "
+                        f"ser;dur={prof.serialize_seconds * 1000:.1f}"
+                    )
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            _request_profile.reset(token)
+            route = scope.get("route")
+            # unmatched paths share one label so scanners can't blow up the series count
+            key = (scope["method"], getattr(route, "path", "unmatched"))
+            stats = _ROUTE_STATS.get(key)
+            if stats is None:
+                stats = _ROUTE_STATS[key] = RouteStats()
+            stats.observe(status, elapsed, prof)
+
+# ---- Response compression ----
+
+class GzipStream:
+    def __init__(self):
+        self._z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._z.compress(data) + self._z.flush()
+
+class BrotliStream:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.process(data) + self._c.finish()
+
+class ZstdStream:
+    def __init__(self):
+        self._c = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.compress(data) + self._c.flush()
+
+# preferred first
+RESPONSE_CODECS: Dict[str, Any] = {
+    name: codec for name, codec in (("zstd", ZstdStream if zstandard else None),
+                                    ("br", BrotliStream if brotli else None),
+                                    ("gzip", GzipStream))
+    if codec
+}
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Best codec the client accepts (q > 0), in server preference order"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return next((name for name in RESPONSE_CODECS if name in accepted), None)
+
+async def run_codec(fn, data: bytes) -> bytes:
+    if len(data) >= COMPRESS_THREAD_MIN:
+        return await asyncio.to_thread(fn, data)
+    return fn(data)
+
+class CompressionMiddleware:
+    """Compresses JSON/NDJSON/text responses with zstd, br or gzip.
+
+    A body that fits in a single message is compressed whole if it reaches
+    COMPRESS_MIN_SIZE. A streamed body is buffered until it reaches the
+    threshold, then compressed chunk by chunk with a sync flush so the client
+    keeps receiving data. Responses with their own Content-Encoding (the gzip
+    NDJSON export) pass through untouched."""
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = COMPRESS_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            return await self.app(scope, receive, send)
+
+        start: Optional[Dict[str, Any]] = None
+        passthrough = False
+        pending = b""
+        stream = None
+
+        def mark_encoded(message: Dict[str, Any], length: Optional[int]):
+            headers = MutableHeaders(scope=message)
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            if length is None:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(length)
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough, pending, stream
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] < 200 or message["status"] in (204, 304)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if stream is not None:
+                data = await run_codec(stream.compress if more else stream.finish, body)
+                return await send({"type": "http.response.body", "body": data, "more_body": more})
+
+            pending += body
+            if len(pending) < self.minimum_size:
+                if not more:
+                    # ended below the threshold: not worth an encoding
+                    await send(start)
+                    await send({"type": "http.response.body", "body": pending, "more_body": False})
+                return
+            stream = RESPONSE_CODECS[encoding]()
+            if not more:
+                data = await run_codec(stream.finish, pending)
+                mark_encoded(start, len(data))
+            else:
+                data = await run_codec(stream.compress, pending)
+                mark_encoded(start, None)
+            pending = b""
+            await send(start)
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)):
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if credentials is None or not secrets.compare_digest(credentials.credentials.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -847,7 +3192,10 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ProfilingMiddleware)
 
 # Configure logging
 logging.basicConfig(
@@ -856,6 +3204,135 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Single-tenant indexes replaced by their user_id-prefixed versions
+LEGACY_INDEXES = {
+    "ActiveQuests": ["id_1", "category_id_1", "quest_name_1_due_date_1_category_id_1", "occurrence_key_1"],
+    "Categories": ["id_1", "name_1"],
+    "RewardStore": ["id_1", "reward_name_1"],
+    "RewardInventory": ["id_1", "date_redeemed_-1", "unused_date_redeemed", "unused_by_reward"],
+    "Rules": ["id_1"],
+    "XpDailyRollups": ["day_1"],
+    "RecurringRuns": ["started_at_-1"],
+    "HistoryArchive": ["collection_1_month_1_seq_1", "state_1"],
+    "ArchiveState": ["collection_1"],
+}
+
+async def drop_legacy_indexes():
+    for name, indexes in LEGACY_INDEXES.items():
+        existing = await db[name].index_information()
+        for index in indexes:
+            if index not in existing:
+                continue
+            try:
+                await db[name].drop_index(index)
+            except OperationFailure as e:
+                if e.code != 27:  # IndexNotFound: another replica dropped it first
+                    raise
+
+@app.on_event("startup")
+async def ensure_indexes():
+    await drop_legacy_indexes()
+    await db.Users.create_index("username", unique=True)
+    await db.Users.create_index("id", unique=True)
+    await db.Users.create_index("created_at")
+    # Point lookups issued by the handlers (see benchmarks/check_query_plans.py);
+    # every per-user index leads with user_id so a request only touches its owner's keys
+    await db.ActiveQuests.create_index([("user_id", 1), ("id", 1)])
+    await db.ActiveQuests.create_index([("user_id", 1), ("category_id", 1)])
+    await db.ActiveQuests.create_index([("user_id", 1), ("quest_name", 1), ("due_date", 1), ("category_id", 1)])
+    await db.Categories.create_index([("user_id", 1), ("id", 1)])
+    await db.Categories.create_index([("user_id", 1), ("name", 1)])
+    await db.RewardStore.create_index([("user_id", 1), ("id", 1)])
+    await db.RewardStore.create_index([("user_id", 1), ("reward_name", 1)])
+    await db.RewardInventory.create_index([("user_id", 1), ("id", 1)])
+    await db.RewardInventory.create_index([("user_id", 1), ("date_redeemed", -1)])
+    # unused items only: the ?used=false list and the grouped view
+    await db.RewardInventory.create_index(
+        [("user_id", 1), ("date_redeemed", -1)],
+        name="user_unused_date_redeemed",
+        partialFilterExpression={"used": False},
+    )
+    await db.RewardInventory.create_index(
+        [("user_id", 1), ("reward_name", 1), ("date_redeemed", 1), ("id", 1)],
+        name="user_unused_by_reward",
+        partialFilterExpression={"used": False},
+    )
+    await db.Rules.create_index("user_id", unique=True)
+    await db.XpLedger.create_index([("user_id", 1), ("seq", 1)], unique=True)
+    await db.XpLedger.create_index([("user_id", 1), ("kind", 1), ("at", 1)])
+    await db.XpLedger.create_index([("user_id", 1), ("at", 1)])
+    await db.XpLedger.create_index([("user_id", 1), ("id", 1)])
+    await db.XpSnapshots.create_index([("user_id", 1), ("seq", 1)], unique=True)
+    await db.XpDailyRollups.create_index([("user_id", 1), ("day", 1)], unique=True)
+    await db.RecurringRuns.create_index([("user_id", 1), ("started_at", -1)])
+    # the scheduler evaluates every user's rules by zone and id
+    await db.Recurringtasks.create_index([("timezone", 1), ("next_due", 1)])
+    await db.Recurringtasks.create_index("id")
+    await db.Recurringtasks.create_index([("user_id", 1), ("id", 1)])
+    await db.Recurringtasks.create_index([("user_id", 1), ("next_due", 1)])
+    await db.Jobs.create_index("id")
+    await db.HistoryArchive.create_index([("user_id", 1), ("collection", 1), ("month", 1), ("seq", 1)], unique=True)
+    await db.HistoryArchive.create_index([("user_id", 1), ("state", 1)])
+    await db.ArchiveState.create_index([("user_id", 1), ("collection", 1)], unique=True)
+    await db.Jobs.create_index([("status", 1), ("created_at", 1)])
+    await db.ActiveQuests.create_index(
+        [("user_id", 1), ("occurrence_key", 1)],
+        unique=True,
+        partialFilterExpression={"occurrence_key": {"$type": "string"}},
+    )
+    # rules saved before intervals were bounded: <= 0 always behaved as 1
+    for bad, value in (({"$lt": 1}, 1), ({"$gt": RECURRING_MAX_INTERVAL}, RECURRING_MAX_INTERVAL)):
+        res = await db.Recurringtasks.update_many({"interval": bad}, {"$set": {"interval": value}, "$unset": {"next_due": ""}})
+        if res.modified_count:
+            logger.warning("Clamped the interval of %d recurring rules to %d", res.modified_count, value)
+    # imported with "timezone": "", which zone_filter never matched
+    await db.Recurringtasks.update_many({"timezone": ""}, {"$unset": {"timezone": ""}})
+    await migrate_history_to_ledger()
+    # First start with existing history: backfill the rollups once, per owner
+    # (None: data from before accounts, claimed later by the first user)
+    if not await db.XpDailyRollups.find_one({}):
+        owners = set(await db.XpLedger.distinct("user_id"))
+        if await db.XpLedger.find_one({"user_id": None}, {"_id": 1}):
+            owners.add(None)
+        try:
+            for owner in owners:
+                logger.info("Backfilled XP rollups for %s: %s", owner, await rebuild_xp_rollups(owner))
+        except BulkWriteError:
+            logger.info("XP rollup backfill raced with another replica; skipping")
+
+@app.on_event("startup")
+async def warn_default_jwt_secret():
+    if not os.environ.get('JWT_SECRET'):
+        logger.warning("JWT_SECRET is not set: using a random per-process secret, tokens won't survive a restart or work across replicas")
+
+_scheduler_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_job_workers():
+    global _job_wakeup
+    _job_wakeup = asyncio.Event()
+    for _ in range(JOB_WORKERS):
+        _job_tasks.append(asyncio.create_task(job_worker_loop()))
+    _job_tasks.append(asyncio.create_task(job_lease_loop()))
+
+@app.on_event("startup")
+async def start_process_pool():
+    global _process_pool
+    if RECURRING_WORKERS > 1:
+        _process_pool = new_process_pool(RECURRING_WORKERS)
+
+@app.on_event("startup")
+async def start_recurring_scheduler():
+    global _scheduler_task
+    if RECURRING_SCHEDULER:
+        _scheduler_task = asyncio.create_task(recurring_scheduler_loop())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if _scheduler_task:
+        _scheduler_task.cancel()
+    for task in _job_tasks:
+        task.cancel()
+    if _process_pool:
+        _process_pool.shutdown(wait=False)
     client.close()
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""
+Read routing and the XP cache hold-off.
+
+The routing checks drive the app against a real replica set and look at which
+member served each read: history, analytics and exports should go to a
+secondary, complete, redeem and the XP summary stay on the primary. They run
+when TEST_REPLICA_SET_URL points at a replica set with a secondary (see
+benchmarks/check_read_routing.py for a local three-member setup) and are
+skipped otherwise. The hold-off checks need no database.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "benchmarks"))
+
+import check_read_routing  # noqa: E402
+from check_read_routing import CHECKS, NotAReplicaSet, measure_routing, misrouted, server  # noqa: E402
+
+REPLICA_SET_URL = os.environ.get("TEST_REPLICA_SET_URL")
+
+
+@pytest.fixture(scope="module")
+def routing():
+    if not REPLICA_SET_URL:
+        pytest.skip("TEST_REPLICA_SET_URL is not set")
+    from pymongo.errors import ServerSelectionTimeoutError
+
+    saved = server.client, server.db
+    try:
+        _, _, rows = asyncio.run(measure_routing(REPLICA_SET_URL, os.environ.get("TEST_DB_NAME", "quest_routing_test")))
+    except (NotAReplicaSet, ServerSelectionTimeoutError) as e:
+        pytest.skip(f"no usable replica set: {e}")
+    finally:
+        server.client, server.db = saved
+    return {template: row for template, row in zip((c[1] for c in CHECKS), rows)}
+
+
+@pytest.mark.parametrize("method, template, route", CHECKS, ids=[f"{m} {t}" for m, t, _ in CHECKS])
+def test_route_reads_from_expected_member(routing, method, template, route):
+    _, _, expect, status, reads, on_primary, members = routing[template]
+    assert status < 400
+    assert reads > 0
+    assert not misrouted(expect, reads, on_primary), f"expected reads on the {expect}, got {members}"
+
+
+def test_lagging_routes_are_the_history_routes():
+    for route in ("history", "analytics", "export"):
+        if server.ROUTE_READ_PREFERENCE[route] in ("secondary", "secondaryPreferred"):
+            assert check_read_routing.expected_member(route) == "secondary"
+    assert check_read_routing.expected_member(None) == "primary"
+
+
+class FakeUsers:
+    """Just enough of db.Users for the XP cache version: one user document"""
+
+    def __init__(self, user_id):
+        self.doc = {"id": user_id}
+
+    async def find_one(self, query, projection=None):
+        return dict(self.doc) if query.get("id") == self.doc["id"] else None
+
+    async def update_one(self, query, update):
+        if query.get("id") == self.doc["id"]:
+            for field, n in update.get("$inc", {}).items():
+                self.doc[field] = self.doc.get(field, 0) + n
+            self.doc.update(update.get("$set", {}))
+
+
+@pytest.fixture
+def lagging_analytics(monkeypatch):
+    user_id = "hold-off-user"
+    monkeypatch.setitem(server.ROUTE_READ_PREFERENCE, "analytics", "secondaryPreferred")
+    monkeypatch.setattr(server, "_XP_CACHE_HOLD", {})
+    monkeypatch.setattr(server, "_XP_CACHE_VERSION", {})
+    monkeypatch.setattr(server, "_XP_DAY_CACHE", server.OrderedDict())
+    monkeypatch.setattr(server, "db", SimpleNamespace(Users=FakeUsers(user_id)))
+
+    async def query_xp_days(user_id, start, end, route=None):
+        return {start + timedelta(days=i): server.empty_day_stats() for i in range((end - start).days + 1)}
+
+    monkeypatch.setattr(server, "query_xp_days", query_xp_days)
+    return user_id
+
+
+def test_primary_reads_cache_every_closed_day(lagging_analytics):
+    asyncio.run(server.invalidate_xp_cache(lagging_analytics))
+    assert server.xp_cacheable_before(lagging_analytics, None) == datetime.now(timezone.utc).date()
+
+
+def test_secondary_reads_leave_the_staleness_window_uncached(lagging_analytics):
+    settled = (datetime.now(timezone.utc) - timedelta(seconds=server.READ_MAX_STALENESS)).date()
+    assert server.xp_cacheable_before(lagging_analytics, "analytics") == settled
+
+
+def test_secondary_reads_are_not_cached_after_an_invalidation(lagging_analytics):
+    asyncio.run(server.invalidate_xp_cache(lagging_analytics))
+    assert server.xp_cacheable_before(lagging_analytics, "analytics") == date.min
+
+
+def test_hold_off_ends_after_the_staleness_window(lagging_analytics):
+    asyncio.run(server.invalidate_xp_cache(lagging_analytics))
+    server._XP_CACHE_HOLD[lagging_analytics] = time.monotonic() - 1
+    assert server.xp_cacheable_before(lagging_analytics, "analytics") > date.min
+    assert lagging_analytics not in server._XP_CACHE_HOLD
+
+
+def test_xp_days_skips_the_cache_during_the_hold_off(lagging_analytics):
+    today = datetime.now(timezone.utc).date()
+    start, end = today - timedelta(days=10), today - timedelta(days=5)
+
+    asyncio.run(server.invalidate_xp_cache(lagging_analytics))
+    asyncio.run(server.xp_days(lagging_analytics, start, end, route="analytics"))
+    assert not server._XP_DAY_CACHE[lagging_analytics]
+
+    asyncio.run(server.xp_days(lagging_analytics, start, end))
+    assert sorted(server._XP_DAY_CACHE[lagging_analytics]) == [start + timedelta(days=i) for i in range(6)]
+
+
+def test_invalidation_by_another_process_drops_cached_days(lagging_analytics):
+    today = datetime.now(timezone.utc).date()
+    start, end = today - timedelta(days=10), today - timedelta(days=5)
+    asyncio.run(server.xp_days(lagging_analytics, start, end))
+    assert server._XP_DAY_CACHE[lagging_analytics]
+
+    # another replica imports history: only the version in Users changes
+    server.db.Users.doc.update(xp_cache_version=1, xp_cache_invalidated_at=datetime.now(timezone.utc))
+    asyncio.run(server.xp_days(lagging_analytics, start, end, route="analytics"))
+    assert not server._XP_DAY_CACHE[lagging_analytics]
+    assert server.xp_cacheable_before(lagging_analytics, "analytics") == date.min
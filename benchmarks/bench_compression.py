@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Response compression benchmark for CompressionMiddleware's codecs
+Encodes list payloads shaped like /quests/active and /quests/completed at
+each --sizes (documents), then compresses them with every available codec
+(gzip, br, zstd at the server's configured levels), both as one body and
+streamed in JSON_STREAM_BATCH-document chunks with a flush per chunk, the
+way the middleware compresses streamed responses. Reports output bytes,
+bytes saved and CPU milliseconds per response.
+
+    python benchmarks/bench_compression.py --sizes 5,50,500,5000,50000
+    python benchmarks/bench_compression.py --json > compression.json
+
+Codec levels come from GZIP_LEVEL, BROTLI_QUALITY and ZSTD_LEVEL, as in
+the server.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench_database")
+
+import orjson  # noqa: E402
+
+import server  # noqa: E402
+from gen_dataset import active_docs, completed_docs  # noqa: E402
+
+PAYLOADS = {
+    "active": lambda rnd, n: active_docs(rnd, n, date(2025, 6, 1)),
+    "completed": lambda rnd, n: completed_docs(rnd, n, date(2024, 6, 1), 365),
+}
+
+
+def encode_chunks(docs):
+    """JSON array chunks as iter_json_array yields them"""
+    chunks = [b"["]
+    for i in range(0, len(docs), server.JSON_STREAM_BATCH):
+        batch = docs[i:i + server.JSON_STREAM_BATCH]
+        chunks.append((b"," if i else b"") + b",".join(orjson.dumps(doc) for doc in batch))
+    chunks.append(b"]")
+    return chunks
+
+
+def compress_whole(codec, chunks):
+    return len(codec().finish(b"".join(chunks)))
+
+
+def compress_streamed(codec, chunks):
+    stream = codec()
+    return sum(len(stream.compress(chunk)) for chunk in chunks[:-1]) + len(stream.finish(chunks[-1]))
+
+
+def measure(fn, codec, chunks, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.process_time()
+        size = fn(codec, chunks)
+        samples.append(time.process_time() - t0)
+    return size, statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", default="5,50,500,5000,50000", help="documents per response")
+    parser.add_argument("--payload", choices=sorted(PAYLOADS), action="append", help="default: all")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=45)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for payload in args.payload or sorted(PAYLOADS):
+        for n in [int(s) for s in args.sizes.split(",")]:
+            docs = [
+                json.loads(orjson.dumps(doc, default=str))
+                for doc in PAYLOADS[payload](random.Random(args.seed), n)
+            ]
+            chunks = encode_chunks(docs)
+            raw = sum(len(c) for c in chunks)
+            for name, codec in server.RESPONSE_CODECS.items():
+                for mode, fn in (("whole", compress_whole), ("streamed", compress_streamed)):
+                    size, cpu_ms = measure(fn, codec, chunks, args.repeat)
+                    results.append({
+                        "payload": payload, "docs": n, "codec": name, "mode": mode,
+                        "raw_bytes": raw, "bytes": size, "saved": 1 - size / raw,
+                        "cpu_ms": round(cpu_ms, 3), "mb_per_s": round(raw / 1e6 / (cpu_ms / 1000), 1) if cpu_ms else None,
+                        "below_threshold": raw < server.COMPRESS_MIN_SIZE,
+                    })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"🗜️  Compression (threshold {server.COMPRESS_MIN_SIZE} B, gzip {server.GZIP_LEVEL}, "
+          f"br {server.BROTLI_QUALITY}, zstd {server.ZSTD_LEVEL}, codecs {', '.join(server.RESPONSE_CODECS)})")
+    print(f"  {'payload':<10} {'docs':>6} {'raw':>10} {'codec':<5} {'mode':<8} {'bytes':>9} {'saved':>7} {'cpu ms':>8} {'MB/s':>7}")
+    for r in results:
+        note = "  (sent uncompressed)" if r["below_threshold"] else ""
+        print(f"  {r['payload']:<10} {r['docs']:>6} {r['raw_bytes']:>10} {r['codec']:<5} {r['mode']:<8} "
+              f"{r['bytes']:>9} {r['saved']:>7.1%} {r['cpu_ms']:>8.2f} {r['mb_per_s'] or 0:>7.1f}{note}")
+
+
+if __name__ == "__main__":
+    main()
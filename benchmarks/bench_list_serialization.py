@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+List serialization microbenchmark
+Compares the old per-document Pydantic path (Model(**doc) + response_model
+revalidation + JSONResponse) with the orjson streaming fast path.
+Runs offline: documents are generated in memory, no MongoDB needed.
+"""
+
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench_database")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import APIRoute, serialize_response  # noqa: E402
+
+import server  # noqa: E402
+
+N_DOCS = int(os.environ.get("BENCH_DOCS", "50000"))
+REPEAT = int(os.environ.get("BENCH_REPEAT", "3"))
+RANKS = ["Common", "Rare", "Epic", "Legendary"]
+
+
+class FakeCursor:
+    """Minimal async cursor over an in-memory list"""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def batch_size(self, n):
+        return self
+
+    def __aiter__(self):
+        return self._gen()
+
+    async def _gen(self):
+        for doc in self.docs:
+            yield doc
+
+
+def make_docs(kind, n):
+    base = datetime(2024, 1, 1, 8, 30)
+    docs = []
+    for i in range(n):
+        rank = RANKS[i % 4]
+        if kind == "active":
+            docs.append({
+                "id": str(uuid.uuid4()),
+                "quest_name": f"Quest {i}",
+                "quest_rank": rank,
+                "due_date": (date(2024, 1, 1) + timedelta(days=i % 365)).isoformat(),
+                "due_time": "09:00" if i % 2 else None,
+                "duration_minutes": 60,
+                "status": "Pending",
+                "redeem_reward": None,
+                "recurring_id": None,
+                "category_id": None,
+                "is_event": False,
+            })
+        elif kind == "completed":
+            docs.append({
+                "id": str(uuid.uuid4()),
+                "quest_name": f"Quest {i}",
+                "quest_rank": rank,
+                "xp_earned": server.RANK_XP[rank],
+                "date_completed": base + timedelta(minutes=i),
+            })
+        else:
+            docs.append({
+                "id": str(uuid.uuid4()),
+                "date_redeemed": base + timedelta(minutes=i),
+                "reward_name": "1 Hour of Gaming",
+                "xp_cost": 100,
+            })
+    return docs
+
+
+def route_field(path):
+    for route in server.app.routes:
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods:
+            return route.response_field
+    raise KeyError(path)
+
+
+async def old_path(docs, model, field):
+    items = [model(**doc) async for doc in FakeCursor(docs)]
+    content = await serialize_response(field=field, response_content=items, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def fast_path(docs, model):
+    chunks = [chunk async for chunk in server.iter_json_array(FakeCursor(docs), model)]
+    return b"".join(chunks)
+
+
+async def best_of(fn):
+    best = float("inf")
+    body = b""
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        body = await fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, body
+
+
+async def main():
+    cases = [
+        ("/api/quests/active", "active", server.ActiveQuest),
+        ("/api/quests/completed", "completed", server.CompletedQuest),
+        ("/api/rewards/log", "log", server.RewardLogItem),
+    ]
+    print(f"🚀 List serialization benchmark ({N_DOCS} documents, best of {REPEAT})")
+    print("=" * 70)
+    for path, kind, model in cases:
+        docs = make_docs(kind, N_DOCS)
+        field = route_field(path)
+        old_t, old_body = await best_of(lambda: old_path(docs, model, field))
+        new_t, new_body = await best_of(lambda: fast_path(docs, model))
+        print(f"{path:<24} before {old_t * 1000:8.1f} ms   after {new_t * 1000:8.1f} ms   "
+              f"speedup {old_t / new_t:5.1f}x   ({len(old_body)} -> {len(new_body)} bytes)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
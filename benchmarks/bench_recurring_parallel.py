@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Recurring rule evaluation scaling benchmark
+Evaluates a synthetic rule set with evaluate_recurring_rules_parallel at
+1..N worker processes and reports wall time and speedup over one worker.
+Runs offline: rules are generated in memory, nothing is written to MongoDB.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench_database")
+
+import server  # noqa: E402
+
+N_RULES = int(os.environ.get("BENCH_RULES", "50000"))
+MAX_WORKERS = int(os.environ.get("BENCH_WORKERS", str(os.cpu_count() or 1)))
+WEEKDAYS = list(server.WEEKDAY_INDEX)
+
+
+def make_rules(n, today, seed=42):
+    rnd = random.Random(seed)
+    rules = []
+    for _ in range(n):
+        freq = rnd.choice(server.FREQUENCY_OPTIONS)
+        rule = {
+            "id": str(uuid.UUID(int=rnd.getrandbits(128))),
+            "task_name": "Rule",
+            "quest_rank": rnd.choice(list(server.RANK_XP)),
+            "frequency": freq,
+            "interval": rnd.choice([1, 1, 1, 2, 3]),
+            "ends": "never",
+            "occurrences": 0,
+            "start_date": (today - timedelta(days=rnd.randint(0, 1000))).isoformat(),
+            "last_added": None,
+        }
+        if freq == "Weekly":
+            rule["days"] = ", ".join(rnd.sample(WEEKDAYS, rnd.randint(1, 3)))
+        if freq == "Monthly":
+            if rnd.random() < 0.5:
+                rule.update(monthly_mode="weekday", monthly_week_index=rnd.choice([1, 2, 3, 4, -1]),
+                            monthly_weekday=rnd.choice(WEEKDAYS))
+            else:
+                rule.update(monthly_mode="date", monthly_on_date=rnd.randint(1, 31))
+        rules.append(rule)
+    return rules
+
+
+async def main():
+    today = date.today()
+    rules = make_rules(N_RULES, today)
+    print(f"🚀 Recurring evaluation scaling ({N_RULES} rules, up to {MAX_WORKERS} workers)")
+    print("=" * 60)
+    base = None
+    for workers in range(1, MAX_WORKERS + 1):
+        batch = [dict(r) for r in rules]
+        if workers == 1:
+            t0 = time.perf_counter()
+            results = server.evaluate_recurring_rules(batch, today)
+            elapsed = time.perf_counter() - t0
+        else:
+            with server.new_process_pool(workers) as pool:
+                # warm the pool so process start-up is not measured
+                await server.evaluate_recurring_rules_parallel(batch[:workers], today, pool, workers)
+                t0 = time.perf_counter()
+                results = await server.evaluate_recurring_rules_parallel(batch, today, pool, workers)
+                elapsed = time.perf_counter() - t0
+        base = base or elapsed
+        fired = sum(1 for _, quest, _ in results if quest)
+        print(f"workers={workers:<3} {elapsed * 1000:9.1f} ms   speedup {base / elapsed:5.2f}x   fired={fired}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the server.py hot paths
+Runs against the in-process ASGI app (httpx ASGITransport, no network) and
+either an in-memory store (mongomock-motor) or a local MongoDB, and writes
+the results to a JSON baseline. With --compare, timings are checked against
+an earlier baseline and regressions beyond --tolerance fail the run.
+
+Covers: is_today_for_task, nth_weekday_day, serialize_dates_for_mongo,
+ledger_balance (/xp/summary), run_recurring_generation, the streamed list endpoints at
+each --sizes, and concurrent complete/redeem requests.
+
+Everything runs as one bench user; --tenants other users get the same
+amount of data alongside, which per-user indexes should make free.
+
+    python benchmarks/bench_suite.py --store memory --sizes 1000,100000
+    python benchmarks/bench_suite.py --store mongo --compare benchmarks/baseline.json
+
+The mongo store drops and reuses the BENCH_DB_NAME database (default
+quest_bench) on MONGO_URL.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench_database")
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from bench_recurring_parallel import make_rules  # noqa: E402
+from gen_dataset import active_docs, completed_docs, redemption_docs  # noqa: E402
+
+BENCH_DB_NAME = os.environ.get("BENCH_DB_NAME", "quest_bench")
+BENCH_USER = "bench-user"
+TENANTS = 0
+STORE = "memory"
+HISTORY_DAYS = 366
+SEED_BATCH = 10000
+
+
+def use_store(kind):
+    global STORE
+    STORE = kind
+    if kind == "memory":
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("--store memory needs mongomock-motor (pip install mongomock-motor)")
+        server.client = AsyncMongoMockClient()
+    server.db = server.client[BENCH_DB_NAME]
+
+
+async def reset_store():
+    for name in await server.db.list_collection_names():
+        await server.db.drop_collection(name)
+    await server.invalidate_xp_cache(BENCH_USER)
+    # mongomock checks unique indexes by scanning, which would dominate every insert
+    if STORE == "mongo":
+        await server.ensure_indexes()
+
+
+def summarize(samples, ops):
+    med = statistics.median(samples)
+    return {
+        "median_s": round(med, 6),
+        "min_s": round(min(samples), 6),
+        "ops": ops,
+        "us_per_op": round(med / ops * 1e6, 3) if ops else None,
+    }
+
+
+def time_sync(fn, ops, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples, ops)
+
+
+async def time_async(fn, ops, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples, ops)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+# ---- Fixtures ----
+
+def owners():
+    """The bench user, then the --tenants bystanders"""
+    return [BENCH_USER] + [f"tenant-{i}" for i in range(TENANTS)]
+
+
+async def seed(collection, docs):
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= SEED_BATCH:
+            await server.db[collection].insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await server.db[collection].insert_many(batch, ordered=False)
+
+
+async def seed_ledger(user_id, collection, docs):
+    """Append history through the app's ledger path, so snapshots are written as in production"""
+    batch = []
+    for doc in docs:
+        batch.append(server.ledger_entry(collection, doc))
+        if len(batch) >= SEED_BATCH:
+            await server.append_ledger(user_id, batch)
+            batch = []
+    if batch:
+        await server.append_ledger(user_id, batch)
+
+
+# ---- Benchmarks ----
+
+def bench_pure(repeat):
+    today = date.today()
+    rules = make_rules(20000, today)
+    months = [(y, m) for y in range(2020, 2030) for m in range(1, 13)]
+    sample = server.ActiveQuest(quest_name="Bench", quest_rank="Epic", due_date=today).dict()
+    return {
+        "is_today_for_task": time_sync(
+            lambda: [server.is_today_for_task(today, rule) for rule in rules], len(rules), repeat),
+        "nth_weekday_day": time_sync(
+            lambda: [server.nth_weekday_day(y, m, wd, n) for y, m in months for wd in range(7) for n in (1, 2, 3, 4, -1)],
+            len(months) * 35, repeat),
+        "serialize_dates_for_mongo": time_sync(
+            lambda: [server.serialize_dates_for_mongo(sample) for _ in range(100000)], 100000, repeat),
+    }
+
+
+async def bench_xp_summary(size, repeat):
+    await reset_store()
+    rnd = random.Random(1)
+    start = date.today() - timedelta(days=HISTORY_DAYS - 1)
+    for user_id in owners():
+        await seed_ledger(user_id, "CompletedQuests", completed_docs(rnd, size, start, HISTORY_DAYS, user_id=user_id))
+        await seed_ledger(user_id, "RewardLog",
+                          (log for log, _ in redemption_docs(rnd, size // 10, start, HISTORY_DAYS, user_id=user_id)))
+        await server.rebuild_xp_rollups(user_id)
+    return await time_async(lambda: server.ledger_balance(BENCH_USER), 1, repeat)
+
+
+async def bench_generation(rules, repeat):
+    today = date.today()
+    docs = [server.recurring_insert_doc(server.RecurringTask(**rule), user_id)
+            for user_id in owners() for rule in make_rules(rules, today)]
+    samples = []
+    for _ in range(repeat):
+        await reset_store()
+        await seed("Recurringtasks", iter(docs))
+        t0 = time.perf_counter()
+        await server.run_recurring_generation(BENCH_USER)
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples, rules)
+
+
+async def bench_lists(http, size, repeat):
+    await reset_store()
+    rnd = random.Random(2)
+    today = date.today()
+    start = today - timedelta(days=HISTORY_DAYS - 1)
+    for user_id in owners():
+        await seed("ActiveQuests", active_docs(rnd, size, today, user_id=user_id))
+        await seed_ledger(user_id, "CompletedQuests", completed_docs(rnd, size, start, HISTORY_DAYS, user_id=user_id))
+        await seed_ledger(user_id, "RewardLog", (log for log, _ in redemption_docs(rnd, size, start, HISTORY_DAYS, user_id=user_id)))
+    results = {}
+    for path in ("/api/quests/active", "/api/quests/completed", "/api/rewards/log"):
+        nbytes = 0
+
+        async def fetch():
+            nonlocal nbytes
+            r = await http.get(path)
+            r.raise_for_status()
+            nbytes = len(r.content)
+
+        await fetch()  # warm-up: first request pays route/model setup
+        results[f"GET {path} n={size}"] = {**await time_async(fetch, size, repeat), "bytes": nbytes}
+    return results
+
+
+async def run_concurrent(http, requests, concurrency):
+    """Fire (method, path, json) requests from `concurrency` workers; returns
+    wall time, per-request latencies and status counts."""
+    queue = list(reversed(requests))
+    latencies, statuses = [], {}
+
+    async def worker():
+        while queue:
+            method, path, body = queue.pop()
+            t0 = time.perf_counter()
+            r = await http.request(method, path, json=body)
+            latencies.append(time.perf_counter() - t0)
+            statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - t0, latencies, statuses
+
+
+def concurrency_result(wall, latencies, statuses):
+    return {
+        "median_s": round(wall, 6),
+        "ops": len(latencies),
+        "throughput_rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+async def bench_concurrency(http, n, redeems, concurrency):
+    await reset_store()
+    rnd = random.Random(3)
+    today = date.today()
+    quests = list(active_docs(rnd, n, today, user_id=BENCH_USER))
+    await seed("ActiveQuests", iter(quests))
+    wall, lat, st = await run_concurrent(
+        http, [("POST", f"/api/quests/active/{q['id']}/complete", None) for q in quests], concurrency)
+    results = {f"complete n={n} c={concurrency}": concurrency_result(wall, lat, st)}
+
+    # A reward priced so the balance covers half of the redeem attempts
+    balance = (await server.ledger_balance(BENCH_USER))["balance"]
+    affordable = redeems // 2
+    reward = (await http.post("/api/rewards/store", json={
+        "reward_name": "Bench reward", "xp_cost": max(1, balance // affordable),
+    })).json()
+    affordable = balance // reward["xp_cost"]
+    wall, lat, st = await run_concurrent(
+        http, [("POST", "/api/rewards/redeem", {"reward_id": reward["id"]})] * redeems, concurrency)
+    res = concurrency_result(wall, lat, st)
+    # > 0 means the balance check raced and XP went negative
+    res["overspent"] = max(0, st.get(200, 0) - affordable)
+    results[f"redeem n={redeems} c={concurrency}"] = res
+    return results
+
+
+# ---- Baseline comparison ----
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, cur in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old or not old.get("median_s"):
+            continue
+        ratio = cur["median_s"] / old["median_s"]
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"  {name:<45} {old['median_s']:>10.4f}s -> {cur['median_s']:>10.4f}s  x{ratio:.2f} {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent).stdout.strip() or None
+    except OSError:
+        return None
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--store", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--sizes", default=None, help="list endpoint sizes (default 1000,100000,1000000; memory: 1000,100000)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--rules", type=int, default=5000, help="recurring rules for the generation benchmark")
+    parser.add_argument("--summary-docs", type=int, default=100000, help="completions behind ledger_balance")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--completes", type=int, default=2000, help="concurrent quest completions")
+    parser.add_argument("--redeems", type=int, default=200, help="concurrent redeem attempts (half are affordable)")
+    parser.add_argument("--tenants", type=int, default=0, help="other users seeded with the same data as the bench user")
+    parser.add_argument("--out", default=str(Path(__file__).resolve().parent / "baseline.json"))
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    sizes_default = "1000,100000" if args.store == "memory" else "1000,100000,1000000"
+    sizes = [int(s) for s in (args.sizes or sizes_default).split(",")]
+    use_store(args.store)
+    global TENANTS
+    TENANTS = args.tenants
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    transport = httpx.ASGITransport(app=server.app)
+
+    print(f"🚀 Benchmark suite (store={args.store}, sizes={sizes}, repeat={args.repeat})")
+    results = {}
+    print("  pure functions ...", flush=True)
+    results.update(bench_pure(args.repeat))
+    print("  ledger_balance ...", flush=True)
+    results[f"ledger_balance n={args.summary_docs}"] = await bench_xp_summary(args.summary_docs, args.repeat)
+    print("  run_recurring_generation ...", flush=True)
+    results[f"run_recurring_generation rules={args.rules}"] = await bench_generation(args.rules, args.repeat)
+    # tokens aren't checked against Users, so the bench user needs no account
+    token = server.issue_token({"id": BENCH_USER, "username": "bench"}).access_token
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                 headers={"Authorization": f"Bearer {token}"}) as http:
+        for size in sizes:
+            print(f"  list endpoints n={size} ...", flush=True)
+            results.update(await bench_lists(http, size, args.repeat))
+        print(f"  complete/redeem c={args.concurrency} ...", flush=True)
+        results.update(await bench_concurrency(http, args.completes, args.redeems, args.concurrency))
+    if args.store == "mongo":
+        await server.client.drop_database(BENCH_DB_NAME)
+
+    for name, res in results.items():
+        extra = f"  p95 {res['p95_ms']}ms  {res['statuses']}" if "p95_ms" in res else f"  {res['us_per_op']} µs/op"
+        print(f"  {name:<45} {res['median_s']:>10.4f}s{extra}")
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "git": git_revision(),
+            "store": args.store,
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+            "tenants": args.tenants,
+        },
+        "results": results,
+    }
+    regressions = []
+    if args.compare:
+        print(f"📊 Compared with {args.compare}")
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Wrote {args.out}")
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
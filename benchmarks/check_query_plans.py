@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression checker
+Runs explain("executionStats") for every query shape server.py issues, with
+parameters sampled from the target database, and flags plans that scan a
+whole collection (COLLSCAN, or a $lookup that scans its foreign collection)
+or sort in memory (SORT / $sort). Docs-examined vs docs-returned ratios are
+printed for every shape.
+
+Run it against a local mongod loaded with gen_dataset.py. It exits
+non-zero when anything is flagged, so it can gate CI:
+
+    python benchmarks/gen_dataset.py --drop --users 1000 --completed 200000
+    python benchmarks/check_query_plans.py
+
+Every per-user shape is sampled for the owner of one quest and should
+only touch that user's keys (examined close to returned, whatever the number
+of users). Shapes marked full_scan are expected to scan and are only checked
+for in-memory sorts. When a handler gains a new query, add its shape to
+SHAPES below.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench_database")
+
+from pymongo import MongoClient  # noqa: E402
+
+import server  # noqa: E402
+
+
+class Shape:
+    def __init__(self, name, source, collection, command, full_scan=False):
+        self.name = name
+        self.source = source  # server.py function issuing the query
+        self.collection = collection
+        self.command = command  # sample -> explainable command document
+        self.full_scan = full_scan
+
+
+def find(coll, filter, sort=None, limit=None, projection=None):
+    cmd = {"find": coll, "filter": filter}
+    if sort:
+        cmd["sort"] = sort
+    if limit:
+        cmd["limit"] = limit
+    cmd["projection"] = projection or {"_id": 0}
+    return cmd
+
+
+def update(coll, q, u, multi=False):
+    return {"update": coll, "updates": [{"q": q, "u": u, "multi": multi}]}
+
+
+def delete(coll, q, many=False):
+    return {"delete": coll, "deletes": [{"q": q, "limit": 0 if many else 1}]}
+
+
+def aggregate(coll, pipeline):
+    return {"aggregate": coll, "pipeline": pipeline, "cursor": {}}
+
+
+def day_start(d):
+    return datetime.combine(d, datetime.min.time())
+
+
+SHAPES = [
+    # Categories
+    Shape("categories list sorted by name", "list_categories", "Categories",
+          lambda s: find("Categories", {"user_id": s["user_id"]}, sort={"name": 1})),
+    Shape("category by name", "create_category", "Categories",
+          lambda s: find("Categories", {"user_id": s["user_id"], "name": s["category"]["name"]}, limit=1)),
+    Shape("category by id", "patch_category", "Categories",
+          lambda s: find("Categories", {"user_id": s["user_id"], "id": s["category"]["id"]}, limit=1)),
+    Shape("category delete by id", "delete_category", "Categories",
+          lambda s: delete("Categories", {"user_id": s["user_id"], "id": s["category"]["id"]})),
+    Shape("unlink quests by category_id", "unlink_category", "ActiveQuests",
+          lambda s: update("ActiveQuests", {"user_id": s["user_id"], "category_id": s["category"]["id"]},
+                           {"$set": {"category_id": None}}, multi=True)),
+    # Active quests
+    Shape("active quests list", "list_active_quests", "ActiveQuests",
+          lambda s: find("ActiveQuests", {"user_id": s["user_id"]})),
+    Shape("active quest by id", "get_active_quest", "ActiveQuests",
+          lambda s: find("ActiveQuests", {"user_id": s["user_id"], "id": s["quest"]["id"]}, limit=1)),
+    Shape("active quest update by id", "update_active_quest", "ActiveQuests",
+          lambda s: update("ActiveQuests", {"user_id": s["user_id"], "id": s["quest"]["id"]}, {"$set": {"status": "Pending"}})),
+    Shape("active quest delete by id", "delete_active_quest", "ActiveQuests",
+          lambda s: delete("ActiveQuests", {"user_id": s["user_id"], "id": s["quest"]["id"]})),
+    Shape("active quest + rule $lookup", "find_quest_with_recurrence", "ActiveQuests",
+          lambda s: aggregate("ActiveQuests", [
+              {"$match": {"user_id": s["user_id"], "id": s["quest"]["id"]}},
+              {"$limit": 1},
+              {"$lookup": {"from": "Recurringtasks", "localField": "recurring_id", "foreignField": "id", "as": "recurrence"}},
+              {"$project": {"_id": 0, "user_id": 0, "recurrence._id": 0}},
+          ])),
+    Shape("holiday by (quest_name, due_date, category_id)", "seed_holidays", "ActiveQuests",
+          lambda s: find("ActiveQuests", {
+              "user_id": s["user_id"], "quest_name": s["holiday"]["quest_name"], "due_date": s["holiday"]["due_date"],
+              "category_id": s["holiday"]["category_id"],
+          }, limit=1, projection={"_id": 1})),
+    # Recurring rules
+    Shape("rules list", "list_recurring", "Recurringtasks",
+          lambda s: find("Recurringtasks", {"user_id": s["user_id"]})),
+    Shape("rule by id", "upsert_recurring", "Recurringtasks",
+          lambda s: find("Recurringtasks", {"user_id": s["user_id"], "id": s["rule"]["id"]}, limit=1)),
+    Shape("rules by id $in (embed)", "embed_recurrences", "Recurringtasks",
+          lambda s: find("Recurringtasks", {"user_id": s["user_id"], "id": {"$in": s["rule_ids"]}})),
+    Shape("due rules for a zone", "generate_recurring_quests", "Recurringtasks",
+          lambda s: find("Recurringtasks", {
+              **server.zone_filter(server.RECURRING_TZ),
+              "$or": [{"next_due": {"$lte": s["today"]}}, {"next_due": {"$exists": False}}],
+          })),
+    Shape("a user's due rules", "generate_recurring_quests", "Recurringtasks",
+          lambda s: find("Recurringtasks", {
+              **server.zone_filter(server.RECURRING_TZ),
+              "$or": [{"next_due": {"$lte": s["today"]}}, {"next_due": {"$exists": False}}],
+              "user_id": s["user_id"],
+          })),
+    Shape("recurring runs, newest first", "list_recurring_runs", "RecurringRuns",
+          lambda s: find("RecurringRuns", {"user_id": s["user_id"]}, sort={"started_at": -1}, limit=20)),
+    # History
+    Shape("completed quests in range", "iter_history", "XpLedger",
+          lambda s: find("XpLedger", {"user_id": s["user_id"], "kind": "quest", "at": {"$gte": s["month_ago"], "$lt": s["now"]}})),
+    Shape("completed quests export since", "export_ndjson", "XpLedger",
+          lambda s: find("XpLedger", {"user_id": s["user_id"], "kind": "quest", "at": {"$gte": s["month_ago"]}}, sort={"at": 1})),
+    Shape("reward log in range", "iter_history", "XpLedger",
+          lambda s: find("XpLedger", {"user_id": s["user_id"], "kind": "reward", "at": {"$gte": s["month_ago"], "$lt": s["now"]}})),
+    Shape("archive candidates", "archive_history", "XpLedger",
+          lambda s: find("XpLedger", {
+              "user_id": s["user_id"], "kind": "quest", "at": {"$lt": s["year_ago"]}, "seq": {"$lte": s["snapshot_seq"]},
+          }, sort={"at": 1})),
+    Shape("ledger delete by id $in", "finish_archive_part", "XpLedger",
+          lambda s: delete("XpLedger", {"user_id": s["user_id"], "kind": "quest", "id": {"$in": s["ledger_ids"]}}, many=True)),
+    Shape("today's XP from the ledger", "aggregate_xp_days", "XpLedger",
+          lambda s: aggregate("XpLedger", [
+              {"$match": {"user_id": s["user_id"], "at": {"$gte": s["today_start"], "$lt": s["tomorrow_start"]}}},
+              {"$group": {"_id": {"day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$at"}}, "kind": "$kind"},
+                          "xp": {"$sum": "$amount"}}},
+          ])),
+    Shape("last ledger seq", "last_ledger_seq", "XpLedger",
+          lambda s: find("XpLedger", {"user_id": s["user_id"]}, sort={"seq": -1}, limit=1, projection={"_id": 0, "seq": 1})),
+    Shape("latest snapshot", "latest_ledger_snapshot", "XpSnapshots",
+          lambda s: find("XpSnapshots", {"user_id": s["user_id"]}, sort={"seq": -1}, limit=1)),
+    Shape("ledger tail after the snapshot", "ledger_balance", "XpLedger",
+          lambda s: aggregate("XpLedger", [
+              {"$match": {"user_id": s["user_id"], "seq": {"$gt": s["snapshot_seq"]}}},
+              {"$group": {"_id": None, "xp": {"$sum": "$amount"}}},
+          ])),
+    Shape("closed-day XP totals", "xp_opening_balance", "XpDailyRollups",
+          lambda s: aggregate("XpDailyRollups", [
+              {"$match": {"user_id": s["user_id"], "day": {"$lt": s["today"]}}},
+              {"$group": {"_id": None, "earned": {"$sum": "$earned"}, "spent": {"$sum": "$spent"}}},
+          ])),
+    Shape("rollups for a day range", "query_xp_days", "XpDailyRollups",
+          lambda s: find("XpDailyRollups", {"user_id": s["user_id"], "day": {"$gte": s["month_ago_day"], "$lte": s["today"]}})),
+    Shape("archive parts for a range", "iter_archived", "HistoryArchive",
+          lambda s: find("HistoryArchive", {
+              "user_id": s["user_id"], "collection": "CompletedQuests", "state": "done", "last": {"$gte": s["year_ago"]},
+          }, sort={"month": 1, "seq": 1})),
+    # Rewards
+    Shape("reward store list", "list_reward_store", "RewardStore",
+          lambda s: find("RewardStore", {"user_id": s["user_id"]})),
+    Shape("cart rewards by id/name", "find_cart_rewards", "RewardStore",
+          lambda s: find("RewardStore", {"user_id": s["user_id"], "$or": [
+              {"id": {"$in": [s["reward"]["id"]]}}, {"reward_name": {"$in": [s["reward"]["reward_name"]]}},
+          ]})),
+    Shape("inventory newest first", "list_reward_inventory", "RewardInventory",
+          lambda s: find("RewardInventory", {"user_id": s["user_id"]}, sort={"date_redeemed": -1})),
+    Shape("unused inventory newest first", "list_reward_inventory", "RewardInventory",
+          lambda s: find("RewardInventory", {"user_id": s["user_id"], "used": False}, sort={"date_redeemed": -1})),
+    Shape("unused inventory grouped by reward", "list_unused_inventory_groups", "RewardInventory",
+          lambda s: aggregate("RewardInventory", [
+              {"$match": {"user_id": s["user_id"], "used": False}},
+              {"$sort": {"reward_name": 1, "date_redeemed": 1}},
+              {"$group": {"_id": "$reward_name", "count": {"$sum": 1}, "next_id": {"$first": "$id"}}},
+          ])),
+    Shape("inventory item by id", "use_reward", "RewardInventory",
+          lambda s: find("RewardInventory", {"user_id": s["user_id"], "id": s["inventory"]["id"]}, limit=1, projection={"_id": 1})),
+    Shape("inventory use if unused", "use_reward", "RewardInventory",
+          lambda s: {
+              "findAndModify": "RewardInventory",
+              "query": {"user_id": s["user_id"], "id": s["inventory"]["id"], "used": False},
+              "update": {"$set": {"used": True}},
+          }),
+    # Accounts
+    Shape("user by username", "login", "Users",
+          lambda s: find("Users", {"username": s["username"]}, limit=1)),
+    Shape("oldest user", "register", "Users",
+          lambda s: find("Users", {}, sort={"created_at": 1}, limit=1, projection={"_id": 0, "id": 1})),
+    # Jobs
+    Shape("job by id", "get_job", "Jobs",
+          lambda s: find("Jobs", {"id": "00000000-0000-4000-8000-000000000000", "user_id": s["user_id"]}, limit=1)),
+    Shape("claim next job", "claim_job", "Jobs",
+          lambda s: {
+              "findAndModify": "Jobs",
+              "query": {
+                  "pinned_to": {"$in": [None, server.INSTANCE_ID]},
+                  "$or": [
+                      {"status": "queued"},
+                      {"status": "running", "lease_expires": {"$lt": s["now"]}, "attempts": {"$lt": server.JOB_MAX_ATTEMPTS}},
+                  ],
+              },
+              "sort": {"created_at": 1},
+              "update": {"$set": {"status": "running"}},
+          }),
+    Shape("rules doc", "get_rules", "Rules",
+          lambda s: find("Rules", {"user_id": s["user_id"]}, limit=1)),
+]
+
+
+def sample_params(db):
+    """Parameters for one user's requests: the owner of a sampled quest"""
+    today = date.today()
+    quest = db.ActiveQuests.find_one({"category_id": {"$ne": None}}, {"_id": 0}) or db.ActiveQuests.find_one({}, {"_id": 0}) or {}
+    user_id = quest.get("user_id", "missing")
+    pick = lambda coll, filter=None: db[coll].find_one({"user_id": user_id, **(filter or {})}, {"_id": 0}) or {}  # noqa: E731
+    user = db.Users.find_one({"id": user_id}, {"_id": 0, "username": 1}) or {}
+    return {
+        "user_id": user_id,
+        "username": user.get("username", "missing"),
+        "quest": {"id": "missing", **quest},
+        "holiday": {"quest_name": "missing", "due_date": "2025-01-01", "category_id": None, **pick("ActiveQuests", {"is_event": True})},
+        "category": {"id": "missing", "name": "missing", **pick("Categories")},
+        "rule": {"id": "missing", **pick("Recurringtasks")},
+        "rule_ids": [d["id"] for d in db.Recurringtasks.find({"user_id": user_id}, {"id": 1}).limit(1000)],
+        "ledger_ids": [d["id"] for d in db.XpLedger.find({"user_id": user_id, "kind": "quest"}, {"id": 1}).limit(1000)],
+        "snapshot_seq": (db.XpSnapshots.find_one({"user_id": user_id}, {"seq": 1}, sort=[("seq", -1)]) or {}).get("seq", 0),
+        "reward": {"id": "missing", "reward_name": "missing", **pick("RewardStore")},
+        "inventory": {"id": "missing", **pick("RewardInventory")},
+        "today": today.isoformat(),
+        "month_ago_day": (today - timedelta(days=30)).isoformat(),
+        "now": datetime.utcnow(),
+        "month_ago": day_start(today - timedelta(days=30)),
+        "year_ago": day_start(today - timedelta(days=365)),
+        "today_start": day_start(today),
+        "tomorrow_start": day_start(today + timedelta(days=1)),
+    }
+
+
+def walk(node, key):
+    """All values stored under `key` anywhere in node, skipping rejected plans"""
+    if isinstance(node, dict):
+        for k, v in node.items():
+            if k == "rejectedPlans":
+                continue
+            if k == key:
+                yield v
+            yield from walk(v, key)
+    elif isinstance(node, list):
+        for item in node:
+            yield from walk(item, key)
+
+
+def analyze(explain):
+    stages, indexes = [], []
+    for plan in walk(explain, "winningPlan"):
+        stages += [s for s in walk(plan, "stage") if isinstance(s, str)]
+        indexes += list(walk(plan, "indexName"))
+    # aggregation stages that were not pushed down into the query layer
+    for stage in explain.get("stages", []):
+        name = next(iter(stage))
+        if name != "$cursor":
+            stages.append(name)
+    examined = sum(s.get("totalDocsExamined", 0) for s in walk(explain, "executionStats"))
+    keys = sum(s.get("totalKeysExamined", 0) for s in walk(explain, "executionStats"))
+    returned = sum(s.get("nReturned", 0) for s in walk(explain, "executionStats"))
+    lookup_scans = sum(v for v in walk(explain, "collectionScans") if isinstance(v, int))
+    return {
+        "stages": stages, "indexes": sorted(set(indexes)),
+        "examined": examined, "keys": keys, "returned": returned, "lookup_scans": lookup_scans,
+    }
+
+
+def check(shape, result):
+    flags = []
+    if "COLLSCAN" in result["stages"] and not shape.full_scan:
+        flags.append("COLLSCAN")
+    if result["lookup_scans"]:
+        flags.append("LOOKUP_COLLSCAN")
+    if "SORT" in result["stages"] or "$sort" in result["stages"]:
+        flags.append("IN_MEMORY_SORT")
+    return flags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--mongo-url", default=os.environ["MONGO_URL"])
+    parser.add_argument("--db", default=os.environ.get("BENCH_DB_NAME", "quest_bench"))
+    parser.add_argument("--no-ensure-indexes", action="store_true", help="check the database's indexes as they are")
+    parser.add_argument("--verbose", action="store_true", help="print the winning plan stages")
+    args = parser.parse_args()
+
+    if not args.no_ensure_indexes:
+        server.client = server.AsyncIOMotorClient(args.mongo_url)
+        server.db = server.client[args.db]
+        asyncio.run(server.ensure_indexes())
+    client = MongoClient(args.mongo_url)
+    db = client[args.db]
+    if not db.ActiveQuests.estimated_document_count():
+        print(f"⚠️  {args.db} has no quests; plans on empty collections say little (load it with gen_dataset.py)")
+    params = sample_params(db)
+
+    print(f"{'shape':<50}{'examined':>10}{'keys':>10}{'returned':>10}{'ratio':>9}  plan")
+    flagged = []
+    for shape in SHAPES:
+        explain = db.command("explain", shape.command(params), verbosity="executionStats")
+        result = analyze(explain)
+        flags = check(shape, result)
+        ratio = result["examined"] / max(result["returned"], 1)
+        plan = ", ".join(result["indexes"]) or ("COLLSCAN" if "COLLSCAN" in result["stages"] else "-")
+        if args.verbose:
+            plan += f"  [{' > '.join(result['stages'])}]"
+        print(f"{shape.name:<50}{result['examined']:>10}{result['keys']:>10}{result['returned']:>10}{ratio:>9.1f}  "
+              f"{plan}{'  ❌ ' + ' '.join(flags) if flags else ''}")
+        if flags:
+            flagged.append((shape, flags))
+
+    if flagged:
+        print(f"\n❌ {len(flagged)} query shape(s) need an index:")
+        for shape, flags in flagged:
+            print(f"  {shape.collection}: {shape.name} ({shape.source}) -> {', '.join(flags)}")
+        sys.exit(1)
+    print(f"\n✅ {len(SHAPES)} query shapes use indexes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Read-routing checker
+Drives the app in-process (httpx ASGITransport) against a replica set and
+records which member served every command, to check the per-route read
+preferences: history lists, analytics and exports should be read from a
+secondary, while complete, redeem and the XP summary stay on the primary.
+It exits non-zero when a route is served by the wrong member;
+backend/tests/test_read_routing.py runs the same checks under pytest.
+
+It needs a replica set with at least one secondary, e.g. three local members:
+
+    for p in 27017 27018 27019; do mkdir -p /tmp/rs$p; mongod --replSet rs0 --port $p --dbpath /tmp/rs$p --fork --logpath /tmp/rs$p.log; done
+    mongosh --port 27017 --eval 'rs.initiate({_id: "rs0", members: [0, 1, 2].map(i => ({_id: i, host: "localhost:" + (27017 + i)}))})'
+    MONGO_URL="mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0" python benchmarks/check_read_routing.py
+
+The READ_PREFERENCE_* / READ_CONCERN_* / READ_MAX_STALENESS settings are
+taken from the environment, like the server's.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+import uuid
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0")
+os.environ.setdefault("DB_NAME", "bench_database")
+
+import httpx  # noqa: E402
+from pymongo import monitoring  # noqa: E402
+
+import server  # noqa: E402
+
+# commands that only read; anything else must go to the primary regardless
+READ_COMMANDS = {"find", "getMore", "aggregate", "count", "distinct"}
+
+
+class CommandLog(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        self.commands.append((event.command_name, event.connection_id))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# (method, path template, read route; None: primary only)
+CHECKS = [
+    ("GET", "/quests/completed", "history"),
+    ("GET", "/rewards/log", "history"),
+    ("GET", "/xp/analytics", "analytics"),
+    ("GET", "/export/CompletedQuests.ndjson", "export"),
+    ("GET", "/xp/summary", None),
+    ("POST", "/quests/active/{quest_id}/complete", None),
+    ("POST", "/rewards/redeem", None),
+]
+
+
+def expected_member(route):
+    mode = server.ROUTE_READ_PREFERENCE[route] if route else "primary"
+    if mode in ("primary", "primaryPreferred"):
+        return "primary"
+    return "any" if mode == "nearest" else "secondary"
+
+
+async def seed(http):
+    """One user with a quest to complete, a reward to redeem and some history"""
+    today = date.today().isoformat()
+    quests = []
+    for i in range(3):
+        r = await http.post("/api/quests/active", json={
+            "quest_name": f"Routing quest {i}", "quest_rank": "Legendary", "due_date": today, "status": "Pending",
+        })
+        r.raise_for_status()
+        quests.append(r.json()["id"])
+    for quest_id in quests[1:]:
+        (await http.post(f"/api/quests/active/{quest_id}/complete")).raise_for_status()
+    store = (await http.get("/api/rewards/store")).json()
+    return {"quest_id": quests[0], "reward_id": min(store, key=lambda r: r["xp_cost"])["id"]}
+
+
+class NotAReplicaSet(Exception):
+    pass
+
+
+def misrouted(expect, reads, on_primary):
+    return (expect == "primary" and on_primary != reads) or (expect == "secondary" and on_primary > 0)
+
+
+async def measure_routing(mongo_url, db_name, settle=2.0):
+    """Run every CHECKS request as a throwaway user and return (hello, primary,
+    rows), one row per check: (method, template, expect, status, reads,
+    reads on the primary, members that served reads)"""
+    log = CommandLog()
+    server.client = server.AsyncIOMotorClient(mongo_url, event_listeners=[log])
+    server.db = server.client[db_name]
+    hello = await server.db.command("hello")
+    if not hello.get("setName"):
+        raise NotAReplicaSet(f"{mongo_url} is not a replica set")
+    if len(hello.get("hosts", [])) + len(hello.get("passives", [])) < 2:
+        raise NotAReplicaSet("the replica set has no secondaries; every read would go to the primary")
+    # let the client discover every member before routing anything
+    await asyncio.sleep(settle)
+
+    user_id = f"routing-{uuid.uuid4()}"
+    token = server.issue_token({"id": user_id, "username": "routing-check"}).access_token
+    transport = httpx.ASGITransport(app=server.app)
+    rows = []
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://routing",
+                                     headers={"Authorization": f"Bearer {token}"}) as http:
+            ids = await seed(http)
+            primary = server.client.primary
+            for method, template, route in CHECKS:
+                body = {"reward_id": ids["reward_id"]} if template == "/rewards/redeem" else None
+                log.commands.clear()
+                r = await http.request(method, "/api" + template.format(**ids), json=body)
+                reads = [member for name, member in log.commands if name in READ_COMMANDS]
+                rows.append((method, template, expected_member(route), r.status_code, len(reads),
+                             sum(1 for member in reads if member == primary),
+                             sorted({f"{m[0]}:{m[1]}" for m in reads})))
+    finally:
+        for name in await server.db.list_collection_names():
+            await server.db[name].delete_many({"user_id": user_id})
+    return hello, primary, rows
+
+
+async def run(args):
+    try:
+        hello, primary, rows = await measure_routing(args.mongo_url, args.db, args.settle)
+    except NotAReplicaSet as e:
+        sys.exit(f"❌ {e}")
+    print(f"🚀 {hello['setName']}: primary {primary[0]}:{primary[1]}, read preferences {server.ROUTE_READ_PREFERENCE}, "
+          f"max staleness {server.READ_MAX_STALENESS}s")
+    print(f"\n{'route':<46}{'expect':>10}{'reads':>7}{'on primary':>12}  members")
+    failures = []
+    for method, template, expect, status, reads, on_primary, members in rows:
+        bad = misrouted(expect, reads, on_primary)
+        print(f"{method + ' ' + template:<46}{expect:>10}{reads:>7}{on_primary:>12}  {', '.join(members)}"
+              f"{'  ❌' if bad else ''}")
+        if status >= 400:
+            failures.append((template, f"HTTP {status}"))
+        if bad:
+            failures.append((template, f"expected reads on the {expect}"))
+
+    if failures:
+        print(f"\n❌ {len(failures)} route(s) misrouted:")
+        for template, why in failures:
+            print(f"  {template}: {why}")
+        sys.exit(1)
+    print("\n✅ Every route read from the expected member")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--mongo-url", default=os.environ["MONGO_URL"])
+    parser.add_argument("--db", default=os.environ.get("BENCH_DB_NAME", "quest_bench"))
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to wait for replica set discovery")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    t0 = time.perf_counter()
+    asyncio.run(run(args))
+    print(f"({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
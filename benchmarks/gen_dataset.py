@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator
+Builds a production-shaped, deterministic dataset straight into MongoDB with
+bulk inserts: years of completions and redemptions in the XP ledger (plus a
+skewed used/unused RewardInventory), Recurringtasks covering every frequency
+and monthly mode, categories, the 2025 holidays and open ActiveQuests. The
+ledger snapshots and daily XP rollups are written from the same data, so
+/xp/summary and analytics agree with the history without a rebuild.
+
+Data belongs to --users accounts (user00000, user00001, ... all with the
+password in BENCH_PASSWORD) with the history spread evenly across them; each
+user gets their own categories, reward store and holidays.
+
+The same --seed and --today always produce the same documents, so the
+benchmark suite and load tests can share fixtures. Collections are split into
+shards generated and inserted by --workers processes.
+
+    python benchmarks/gen_dataset.py --drop --completed 8000000 --workers 8
+    python benchmarks/gen_dataset.py --db quest_bench --drop --completed 100000 --manifest /tmp/ds.json
+    python benchmarks/gen_dataset.py --drop --users 10000 --completed 5000000 --recurring 50000 --active 100000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench_database")
+
+from pymongo import MongoClient, ReplaceOne  # noqa: E402
+
+import server  # noqa: E402
+
+RANKS = list(server.RANK_XP)
+RANK_WEIGHTS = [60, 25, 10, 5]
+WEEKDAYS = list(server.WEEKDAY_INDEX)
+ZONES = [None, "UTC", "America/New_York", "America/Los_Angeles", "Europe/Berlin", "Asia/Tokyo"]
+REWARDS = [
+    ("1 Hour of Movie", 100), ("$1 Credit", 25), ("1 Hour of Gaming", 100), ("1 Hour of Scrolling", 100),
+    ("Coffee Out", 50), ("Dessert", 75), ("Book", 300), ("Day Off", 1000),
+]
+SHARD_SIZE = 250000
+LEDGER_JOBS = ("completed", "redemptions")
+BENCH_PASSWORD = os.environ.get("BENCH_PASSWORD", "bench-password")
+
+
+def seeded(seed, *parts):
+    """Independent, reproducible stream per (collection, shard)"""
+    return random.Random(":".join(str(p) for p in (seed, *parts)))
+
+
+def new_id(rnd):
+    return str(uuid.UUID(int=rnd.getrandbits(128), version=4))
+
+
+def history_moment(rnd, start, days):
+    """Random UTC time within [start, start + days); weekends are quieter"""
+    day = rnd.randrange(days)
+    if (start + timedelta(days=day)).weekday() >= 5 and rnd.random() < 0.4:
+        day = rnd.randrange(days)
+    return datetime.combine(start + timedelta(days=day), dtime(rnd.randrange(6, 23), rnd.randrange(60)))
+
+
+def owned(doc, user_id):
+    return {"user_id": user_id, **doc} if user_id else doc
+
+
+def rule_doc(rec, user_id, today):
+    """Like server.recurring_insert_doc, but with next_due as of `today` (the
+    --today anchor) instead of the wall clock"""
+    doc = {"user_id": user_id, **server.serialize_dates_for_mongo(rec.dict())}
+    doc["next_due"] = server.rule_next_due(doc, today)
+    return doc
+
+
+# ---- Document generators (also used by bench_suite.py) ----
+
+def completed_docs(rnd, n, start, days, categories=(), user_id=None):
+    for i in range(n):
+        rank = rnd.choices(RANKS, RANK_WEIGHTS)[0]
+        yield owned({
+            "id": new_id(rnd),
+            "quest_name": f"Quest {i}",
+            "quest_rank": rank,
+            "xp_earned": server.RANK_XP[rank],
+            "date_completed": history_moment(rnd, start, days),
+            "category_id": rnd.choice(categories) if categories and rnd.random() < 0.7 else None,
+        }, user_id)
+
+
+def redemption_docs(rnd, n, start, days, rewards=REWARDS, user_id=None):
+    """(RewardLog, RewardInventory) pairs; old items are mostly used, recent ones mostly not"""
+    end = datetime.combine(start + timedelta(days=days), dtime.min)
+    for _ in range(n):
+        name, cost = rnd.choice(rewards)
+        when = history_moment(rnd, start, days)
+        age = (end - when).days
+        used = rnd.random() < (0.95 if age > 30 else 0.3)
+        yield (
+            owned({"id": new_id(rnd), "date_redeemed": when, "reward_name": name, "xp_cost": cost}, user_id),
+            owned({
+                "id": new_id(rnd), "date_redeemed": when, "reward_name": name, "xp_cost": cost,
+                "used": used,
+                "used_at": when + timedelta(hours=rnd.randint(1, 24 * max(1, min(age, 30)))) if used else None,
+            }, user_id),
+        )
+
+
+def active_docs(rnd, n, today, categories=(), user_id=None):
+    for i in range(n):
+        yield owned(server.serialize_dates_for_mongo(server.ActiveQuest(
+            id=new_id(rnd),
+            quest_name=f"Active {i}",
+            quest_rank=rnd.choices(RANKS, RANK_WEIGHTS)[0],
+            due_date=today + timedelta(days=rnd.randint(-30, 60)),
+            due_time=f"{rnd.randrange(7, 22):02d}:{rnd.choice([0, 15, 30, 45]):02d}" if rnd.random() < 0.4 else None,
+            duration_minutes=rnd.choice([None, 15, 30, 60, 90]),
+            status=rnd.choice(["Pending", "Pending", "In Progress"]),
+            category_id=rnd.choice(categories) if categories and rnd.random() < 0.6 else None,
+        ).dict()), user_id)
+
+
+# every frequency, plus each monthly mode
+RULE_SHAPES = [(f, None) for f in server.FREQUENCY_OPTIONS if f != "Monthly"] + [("Monthly", "date"), ("Monthly", "weekday")]
+
+
+def recurring_docs(rnd, n, today, categories=(), user_id=None):
+    for i in range(n):
+        freq, mode = RULE_SHAPES[i % len(RULE_SHAPES)]
+        rule = {
+            "id": new_id(rnd),
+            "task_name": f"Rule {i}",
+            "quest_rank": rnd.choices(RANKS, RANK_WEIGHTS)[0],
+            "frequency": freq,
+            "interval": rnd.choice([1, 1, 1, 2, 3]),
+            "start_date": today - timedelta(days=rnd.randint(0, 1000)),
+            "category_id": rnd.choice(categories) if categories and rnd.random() < 0.5 else None,
+            "timezone": rnd.choice(ZONES),
+        }
+        if freq == "Weekly":
+            rule["days"] = ", ".join(sorted(rnd.sample(WEEKDAYS, rnd.randint(1, 3)), key=WEEKDAYS.index))
+        elif freq == "Monthly" and mode == "date":
+            rule.update(monthly_mode="date", monthly_on_date=rnd.randint(1, 31))
+        elif freq == "Monthly":
+            rule.update(monthly_mode="weekday", monthly_week_index=rnd.choice([1, 2, 3, 4, 5, -1]),
+                        monthly_weekday=rnd.choice(WEEKDAYS))
+        ends = rnd.choices(["never", "on_date", "after"], [80, 10, 10])[0]
+        rule["ends"] = ends
+        if ends == "on_date":
+            rule["until_date"] = today + timedelta(days=rnd.randint(-60, 365))
+        elif ends == "after":
+            rule["count"] = rnd.randint(1, 50)
+            rule["occurrences"] = rnd.randint(0, rule["count"])
+        yield rule_doc(server.RecurringTask(**rule), user_id, today)
+
+
+def holiday_docs(rnd, user_id, today):
+    """Holidays category, its event quests and their Annual recurrences (same shape as /holidays/seed-2025)"""
+    cat = server.Category(id=new_id(rnd), name=server.HOLIDAYS_CATEGORY_NAME, color=server.HOLIDAYS_CATEGORY_COLOR)
+    quests, rules = [], []
+    for h in server.HOLIDAYS_2025:
+        rec = server.RecurringTask(
+            id=new_id(rnd), task_name=h["name"], quest_rank="Common", frequency="Annual",
+            start_date=h["date"], category_id=cat.id, is_event=True,
+        )
+        quests.append(owned(server.serialize_dates_for_mongo(server.ActiveQuest(
+            id=new_id(rnd), quest_name=h["name"], quest_rank="Common", due_date=h["date"],
+            recurring_id=rec.id, category_id=cat.id, is_event=True,
+        ).dict()), user_id))
+        rules.append(rule_doc(rec, user_id, today))
+    return owned(cat.dict(), user_id), quests, rules
+
+
+def user_docs(rnd, n, categories, password_hash, today):
+    """Users with their categories, reward stores and holidays (one shared password)"""
+    users, owners, static = [], [], {"Categories": [], "RewardStore": [], "ActiveQuests": [], "Recurringtasks": []}
+    created = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    for i in range(n):
+        user_id = new_id(rnd)
+        users.append({"id": user_id, "username": f"user{i:05d}", "password_hash": password_hash,
+                      "created_at": created + timedelta(seconds=i)})
+        cats = [
+            owned(server.Category(id=new_id(rnd), name=f"Category {j}", color=f"#{rnd.randrange(0x1000000):06x}",
+                                  active=rnd.random() < 0.85).dict(), user_id)
+            for j in range(categories)
+        ]
+        holiday_cat, holiday_quests, holiday_rules = holiday_docs(rnd, user_id, today)
+        static["Categories"] += cats + [holiday_cat]
+        static["RewardStore"] += [
+            owned(server.RewardStoreItem(id=new_id(rnd), reward_name=name, xp_cost=cost).dict(), user_id)
+            for name, cost in REWARDS
+        ]
+        static["ActiveQuests"] += holiday_quests
+        static["Recurringtasks"] += holiday_rules
+        owners.append((user_id, [c["id"] for c in cats]))
+    return users, owners, static
+
+
+def split(count, parts):
+    """Spread count over parts as evenly as possible"""
+    return [count // parts + (1 if i < count % parts else 0) for i in range(parts)]
+
+
+# ---- Loading ----
+
+def add_rollup(rollups, key, inc):
+    user_id, when = key
+    bucket = rollups.setdefault((user_id, when.date().isoformat()), {})
+    for key, n in inc.items():
+        bucket[key] = bucket.get(key, 0) + n
+
+
+def insert_batches(coll, docs, batch_size):
+    batch, inserted = [], 0
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            coll.insert_many(batch, ordered=False)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        coll.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return inserted
+
+
+def shard_counts(count, shard, owners):
+    """Documents per owner in a shard: every shard spreads its documents over
+    all users, starting where the previous one left off"""
+    counts = split(count, owners)
+    offset = shard * SHARD_SIZE % owners
+    return counts[-offset:] + counts[:-offset] if offset else counts
+
+
+def ledger_seqs(jobs, owners):
+    """First ledger seq per owner for each completion/redemption shard, numbering
+    each user's entries in job order; also returns each owner's next free seq"""
+    next_seq = [1] * owners
+    firsts = {}
+    for kind, shard, count in jobs:
+        if kind in LEDGER_JOBS:
+            firsts[kind, shard] = list(next_seq)
+            for i, n in enumerate(shard_counts(count, shard, owners)):
+                next_seq[i] += n
+    return firsts, next_seq
+
+
+def add_ledger_sum(sums, user_id, seq, amount):
+    """Per (user, snapshot interval) earned/spent, for writing the ledger snapshots"""
+    bucket = sums.setdefault((user_id, (seq - 1) // server.LEDGER_SNAPSHOT_EVERY), [0, 0])
+    bucket[0 if amount > 0 else 1] += abs(amount)
+
+
+def ledger_docs(collection, owners, first_seqs, owner_docs, sums):
+    """owner_docs(user_id, cats, n) documents as ledger entries numbered from the owner's first seq"""
+    for (user_id, cats, n), seq in zip(owners, first_seqs):
+        for doc in owner_docs(user_id, cats, n):
+            entry = {"seq": seq, **server.ledger_entry(collection, doc)}
+            add_ledger_sum(sums, user_id, seq, entry["amount"])
+            seq += 1
+            yield entry
+
+
+def load_shard(job):
+    """Generate and insert one shard in a worker process; returns its rollup
+    increments and ledger snapshot sums"""
+    kind, shard, count, ctx, first_seqs = job
+    rnd = seeded(ctx["seed"], kind, shard)
+    start, days = date.fromisoformat(ctx["start"]), ctx["days"]
+    today = date.fromisoformat(ctx["today"])
+    client = MongoClient(ctx["mongo_url"])
+    db = client[ctx["db"]]
+    rollups, sums = {}, {}
+    counts = shard_counts(count, shard, len(ctx["owners"]))
+    owners = [(user_id, cats, n) for (user_id, cats), n in zip(ctx["owners"], counts)]
+    try:
+        if kind == "completed":
+            def docs(user_id, cats, n):
+                for doc in completed_docs(rnd, n, start, days, cats, user_id):
+                    add_rollup(rollups, (user_id, doc["date_completed"]), server.rollup_completion_inc(doc))
+                    yield doc
+            insert_batches(db.XpLedger, ledger_docs("CompletedQuests", owners, first_seqs, docs, sums), ctx["batch"])
+        elif kind == "redemptions":
+            inventory = []
+
+            def docs(user_id, cats, n):
+                for log, inv in redemption_docs(rnd, n, start, days, user_id=user_id):
+                    add_rollup(rollups, (user_id, log["date_redeemed"]), server.rollup_redemption_inc(log))
+                    inventory.append(inv)
+                    if len(inventory) >= ctx["batch"]:
+                        db.RewardInventory.insert_many(inventory, ordered=False)
+                        inventory.clear()
+                    yield log
+            insert_batches(db.XpLedger, ledger_docs("RewardLog", owners, first_seqs, docs, sums), ctx["batch"])
+            if inventory:
+                db.RewardInventory.insert_many(inventory, ordered=False)
+        elif kind == "active":
+            insert_batches(db.ActiveQuests, (doc for user_id, cats, n in owners
+                                             for doc in active_docs(rnd, n, today, cats, user_id)), ctx["batch"])
+        elif kind == "recurring":
+            insert_batches(db.Recurringtasks, (doc for user_id, cats, n in owners
+                                               for doc in recurring_docs(rnd, n, today, cats, user_id)), ctx["batch"])
+    finally:
+        client.close()
+    return kind, count, rollups, sums
+
+
+def shards(kind, total):
+    return [(kind, i, min(SHARD_SIZE, total - i * SHARD_SIZE)) for i in range((total + SHARD_SIZE - 1) // SHARD_SIZE)]
+
+
+def snapshot_docs(sums, next_seqs, owners):
+    """XpSnapshots documents for every full snapshot interval of each user's ledger"""
+    every = server.LEDGER_SNAPSHOT_EVERY
+    last_seq = {user_id: seq - 1 for (user_id, _), seq in zip(owners, next_seqs)}
+    totals = {}
+    now = datetime.now(timezone.utc)
+    for (user_id, bucket), (earned, spent) in sorted(sums.items()):
+        seq = (bucket + 1) * every
+        if seq > last_seq[user_id]:
+            continue
+        total = totals.setdefault(user_id, [0, 0])
+        total[0] += earned
+        total[1] += spent
+        yield {"user_id": user_id, "seq": seq, "earned": total[0], "spent": total[1], "balance": total[0] - total[1], "at": now}
+
+
+def rollup_doc(user_id, day, inc):
+    doc = {"user_id": user_id, "day": day, **server.empty_day_stats()}
+    for key, n in inc.items():
+        if "." in key:
+            field, sub = key.split(".", 1)
+            doc[field][sub] = doc[field].get(sub, 0) + n
+        else:
+            doc[key] += n
+    return doc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--mongo-url", default=os.environ["MONGO_URL"])
+    parser.add_argument("--db", default=os.environ.get("BENCH_DB_NAME", "quest_bench"))
+    parser.add_argument("--drop", action="store_true", help="drop the database first (required if it has data)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--today", type=date.fromisoformat, default=date.today(), help="anchor date (YYYY-MM-DD)")
+    parser.add_argument("--years", type=int, default=3, help="span of completion/redemption history")
+    parser.add_argument("--completed", type=int, default=1000000)
+    parser.add_argument("--redemptions", type=int, default=None, help="default: about 60%% of the earned XP")
+    parser.add_argument("--recurring", type=int, default=5000)
+    parser.add_argument("--active", type=int, default=5000)
+    parser.add_argument("--categories", type=int, default=25, help="per user")
+    parser.add_argument("--users", type=int, default=1, help="accounts the documents are spread over")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch", type=int, default=10000, help="documents per insert_many")
+    parser.add_argument("--manifest", help="write counts, seed and timing as JSON here")
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_url)
+    db = client[args.db]
+    if db.list_collection_names():
+        if not args.drop:
+            sys.exit(f"Database {args.db!r} is not empty; pass --drop to replace it")
+        client.drop_database(args.db)
+
+    days = 365 * args.years
+    start = args.today - timedelta(days=days)
+    if args.redemptions is None:
+        avg_xp = sum(server.RANK_XP[r] * w for r, w in zip(RANKS, RANK_WEIGHTS)) / sum(RANK_WEIGHTS)
+        avg_cost = sum(c for _, c in REWARDS) / len(REWARDS)
+        args.redemptions = int(args.completed * avg_xp * 0.6 / avg_cost)
+
+    t0 = time.perf_counter()
+    rnd = seeded(args.seed, "static")
+    # one (deliberately slow) hash for everyone
+    users, owners, static = user_docs(rnd, args.users, args.categories, server.pwd_context.hash(BENCH_PASSWORD), args.today)
+    insert_batches(db.Users, users, args.batch)
+    for name, docs in static.items():
+        insert_batches(db[name], docs, args.batch)
+
+    ctx = {
+        "seed": args.seed, "mongo_url": args.mongo_url, "db": args.db, "batch": args.batch,
+        "start": start.isoformat(), "days": days, "today": args.today.isoformat(),
+        "owners": owners,
+    }
+    jobs = [
+        shard
+        for kind, total in (("completed", args.completed), ("redemptions", args.redemptions),
+                            ("recurring", args.recurring), ("active", args.active))
+        for shard in shards(kind, total)
+    ]
+    first_seqs, next_seqs = ledger_seqs(jobs, len(owners))
+    jobs = [(kind, shard, count, ctx, first_seqs.get((kind, shard))) for kind, shard, count in jobs]
+    print(f"🚀 Generating into {args.db} ({len(jobs)} shards, {args.workers} workers, seed {args.seed})")
+    rollups, sums, counts = {}, {}, {}
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for kind, count, shard_rollups, shard_sums in pool.map(load_shard, jobs):
+            counts[kind] = counts.get(kind, 0) + count
+            for day, inc in shard_rollups.items():
+                bucket = rollups.setdefault(day, {})
+                for key, n in inc.items():
+                    bucket[key] = bucket.get(key, 0) + n
+            for key, (earned, spent) in shard_sums.items():
+                bucket = sums.setdefault(key, [0, 0])
+                bucket[0] += earned
+                bucket[1] += spent
+            print(f"  {kind}: {counts[kind]} ({time.perf_counter() - t0:.1f}s)", flush=True)
+    snapshots = insert_batches(db.XpSnapshots, snapshot_docs(sums, next_seqs, owners), args.batch)
+
+    ops = [
+        ReplaceOne({"user_id": user_id, "day": day}, rollup_doc(user_id, day, inc), upsert=True)
+        for (user_id, day), inc in sorted(rollups.items())
+    ]
+    for i in range(0, len(ops), args.batch):
+        db.XpDailyRollups.bulk_write(ops[i:i + args.batch], ordered=False)
+
+    # app indexes (and nothing else: rollups already exist, so no backfill, and
+    # there is no pre-ledger history to migrate)
+    server.client = server.AsyncIOMotorClient(args.mongo_url)
+    server.db = server.client[args.db]
+    asyncio.run(server.ensure_indexes())
+
+    elapsed = time.perf_counter() - t0
+    total = sum(db[name].estimated_document_count() for name in db.list_collection_names())
+    print(f"✅ {total} documents in {elapsed:.1f}s ({total / elapsed:,.0f} docs/s)")
+    if args.manifest:
+        with open(args.manifest, "w") as f:
+            json.dump({
+                "db": args.db, "seed": args.seed, "today": args.today.isoformat(), "years": args.years,
+                "users": args.users, "password": BENCH_PASSWORD,
+                "counts": {
+                    "XpLedger": args.completed + args.redemptions, "XpSnapshots": snapshots,
+                    "RewardInventory": args.redemptions, "Recurringtasks": args.recurring + len(static["Recurringtasks"]),
+                    "ActiveQuests": args.active + len(static["ActiveQuests"]), "Categories": len(static["Categories"]),
+                    "Users": len(users),
+                    "XpDailyRollups": len(ops),
+                },
+                "total_documents": total,
+                "seconds": round(elapsed, 1),
+                "created": datetime.now(timezone.utc).isoformat(),
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
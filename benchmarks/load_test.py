@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Load generator modeled on the frontend's traffic
+Virtual users replay what App.js does: every mutation is followed by
+fetchAll (GET /quests/active), drag/resize in the calendar fires bursts of
+quest:patch PATCHes, quick-create is a POST followed by PUT .../recurrence,
+and the rewards page loads store/log/inventory in parallel and refreshes the
+XP summary after a redemption.
+
+Every virtual user is its own account (user00000, user00001, ... as created
+by gen_dataset.py --users, password BENCH_PASSWORD): it logs in, or registers
+if the account doesn't exist, and sends its token with every request. Users
+start spread over --ramp seconds so the (deliberately slow) password checks
+don't all land at once.
+
+Reports throughput plus p50/p95/p99 latency and error rates per route.
+
+    python benchmarks/load_test.py --url http://localhost:8001 --users 50 --duration 60
+    python benchmarks/load_test.py --url http://localhost:8001 --users 10000 --ramp 120 --think 30 --duration 600
+    python benchmarks/load_test.py --in-process --users 10 --duration 10
+
+--in-process serves the app through httpx's ASGITransport on an in-memory
+store (mongomock-motor) seeded with a small fixture; useful as a smoke test.
+Point --url at a server loaded with gen_dataset.py for real measurements.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench_database")
+
+import httpx  # noqa: E402
+
+BENCH_PASSWORD = os.environ.get("BENCH_PASSWORD", "bench-password")
+IN_PROCESS_FIXTURE_USERS = 5
+RANKS = ["Common", "Rare", "Epic", "Legendary"]
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+RECURRENCE_CHOICES = ["none", "none", "Daily", "Weekly", "Weekdays", "Monthly", "Annual"]
+# relative weight of each user action
+DEFAULT_MIX = {
+    "open_app": 2,
+    "drag_burst": 4,
+    "quick_create": 3,
+    "sidebar_create": 1,
+    "update_row": 2,
+    "complete": 3,
+    "delete": 1,
+    "rewards": 2,
+    "history": 1,
+}
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+
+    def record(self, route, seconds, status):
+        self.latencies.setdefault(route, []).append(seconds)
+        per_route = self.statuses.setdefault(route, {})
+        per_route[status] = per_route.get(status, 0) + 1
+
+    def record_error(self, route, exc):
+        self.errors.setdefault(route, {})
+        name = type(exc).__name__
+        self.errors[route][name] = self.errors[route].get(name, 0) + 1
+
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class User:
+    """One browser tab: keeps the quest list from its last fetchAll, like the React state"""
+
+    def __init__(self, http, stats, rnd, think, username):
+        self.http = http
+        self.stats = stats
+        self.rnd = rnd
+        self.think = think
+        self.username = username
+        self.headers = {}
+        self.quests = []
+        self.store_items = []
+
+    async def call(self, method, template, json_body=None, params=None, **ids):
+        """Request `template` (recorded as the route label) with {ids} filled in"""
+        route = f"{method} {template}"
+        t0 = time.perf_counter()
+        try:
+            r = await self.http.request(method, "/api" + template.format(**ids), json=json_body, params=params,
+                                        headers=self.headers)
+        except httpx.HTTPError as e:
+            self.stats.record_error(route, e)
+            return None
+        self.stats.record(route, time.perf_counter() - t0, r.status_code)
+        return r
+
+    async def pause(self, scale=1.0):
+        await asyncio.sleep(self.rnd.uniform(0, self.think * scale))
+
+    async def fetch_all(self):
+        r = await self.call("GET", "/quests/active")
+        if r is not None and r.status_code == 200:
+            self.quests = r.json()
+
+    def pick_quest(self):
+        return self.rnd.choice(self.quests) if self.quests else None
+
+    async def sign_in(self):
+        creds = {"username": self.username, "password": BENCH_PASSWORD}
+        r = await self.call("POST", "/auth/login", creds)
+        if r is not None and r.status_code == 401:
+            r = await self.call("POST", "/auth/register", creds)
+        if r is None or r.status_code not in (200, 201):
+            return False
+        self.headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        return True
+
+    # ---- actions ----
+
+    async def open_app(self):
+        await asyncio.gather(self.fetch_all(), self.call("GET", "/categories"), self.call("GET", "/xp/summary"))
+
+    async def drag_burst(self):
+        # several drags/resizes in a row; each mouseup dispatches quest:patch -> PATCH + fetchAll
+        quest = self.pick_quest()
+        if not quest:
+            return await self.fetch_all()
+        for _ in range(self.rnd.randint(3, 8)):
+            if self.rnd.random() < 0.5:
+                patch = {"duration_minutes": self.rnd.choice([15, 30, 45, 60, 90, 120])}
+            else:
+                day = date.today() + timedelta(days=self.rnd.randint(-3, 10))
+                patch = {"due_date": day.isoformat(), "due_time": f"{self.rnd.randrange(6, 22):02d}:{self.rnd.choice([0, 15, 30, 45]):02d}"}
+            await self.call("PATCH", "/quests/active/{id}", patch, id=quest["id"])
+            await self.fetch_all()
+            await self.pause(0.2)
+
+    async def quick_create(self):
+        all_day = self.rnd.random() < 0.2
+        body = {
+            "quest_name": f"Load quest {self.rnd.getrandbits(32):08x}",
+            "quest_rank": self.rnd.choice(RANKS),
+            "due_date": (date.today() + timedelta(days=self.rnd.randint(0, 14))).isoformat(),
+            "due_time": None if all_day else f"{self.rnd.randrange(6, 22):02d}:00",
+            "duration_minutes": None if all_day else self.rnd.choice([30, 60, 90]),
+            "status": "Pending",
+            "category_id": None,
+        }
+        r = await self.call("POST", "/quests/active", body)
+        frequency = self.rnd.choice(RECURRENCE_CHOICES)
+        if r is not None and r.status_code == 200 and frequency != "none":
+            rec = {"frequency": frequency}
+            if frequency == "Weekly":
+                rec["days"] = ", ".join(self.rnd.sample(WEEKDAYS, self.rnd.randint(1, 3)))
+            await self.call("PUT", "/quests/active/{id}/recurrence", rec, id=r.json()["id"])
+        await self.fetch_all()
+
+    async def sidebar_create(self):
+        body = {
+            "quest_name": f"Sidebar quest {self.rnd.getrandbits(32):08x}",
+            "quest_rank": self.rnd.choice(RANKS),
+            "due_date": (date.today() + timedelta(days=self.rnd.randint(0, 7))).isoformat(),
+            "due_time": None,
+            "status": "Pending",
+            "duration_minutes": 60,
+        }
+        await self.call("POST", "/quests/active", body)
+        if self.rnd.random() < 0.3:
+            await self.call("POST", "/recurring", {
+                "task_name": body["quest_name"], "quest_rank": body["quest_rank"], "frequency": "Daily", "status": "Pending",
+            })
+        await self.fetch_all()
+
+    async def update_row(self):
+        quest = self.pick_quest()
+        if quest:
+            await self.call("PATCH", "/quests/active/{id}", {"status": self.rnd.choice(["Pending", "In Progress"])}, id=quest["id"])
+        await self.fetch_all()
+
+    async def complete(self):
+        quest = self.pick_quest()
+        if quest:
+            await self.call("POST", "/quests/active/{id}/complete", id=quest["id"])
+            if quest in self.quests:
+                self.quests.remove(quest)
+        await self.fetch_all()
+
+    async def delete(self):
+        quest = self.pick_quest()
+        if quest:
+            await self.call("DELETE", "/quests/active/{id}", id=quest["id"])
+            if quest in self.quests:
+                self.quests.remove(quest)
+        await self.fetch_all()
+
+    async def load_rewards(self):
+        store, _, _ = await asyncio.gather(
+            self.call("GET", "/rewards/store"), self.call("GET", "/rewards/log"), self.call("GET", "/rewards/inventory"))
+        if store is not None and store.status_code == 200:
+            self.store_items = store.json()
+
+    async def rewards(self):
+        await self.load_rewards()
+        if not self.store_items:
+            return
+        cheapest = min(self.store_items, key=lambda r: r["xp_cost"])
+        r = await self.call("POST", "/rewards/redeem", {"reward_id": cheapest["id"]})
+        if r is not None and r.status_code == 200:
+            await asyncio.gather(self.load_rewards(), self.call("GET", "/xp/summary"))
+
+    async def history(self):
+        await self.call("GET", "/quests/completed")
+
+    async def run(self, mix, deadline, delay=0.0):
+        actions, weights = zip(*mix.items())
+        await asyncio.sleep(delay)
+        if not await self.sign_in():
+            return
+        await self.open_app()
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rnd.choices(actions, weights)[0])()
+            await self.pause()
+
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, (text or "").split(",")):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            sys.exit(f"Unknown action {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    return {k: v for k, v in mix.items() if v > 0}
+
+
+def report(stats, elapsed):
+    rows = []
+    for route in sorted(set(stats.latencies) | set(stats.errors)):
+        lat = sorted(stats.latencies.get(route, []))
+        statuses = stats.statuses.get(route, {})
+        transport_errors = sum(stats.errors.get(route, {}).values())
+        total = len(lat) + transport_errors
+        failed = transport_errors + sum(n for s, n in statuses.items() if s >= 500)
+        client_errors = sum(n for s, n in statuses.items() if 400 <= s < 500)
+        rows.append({
+            "route": route,
+            "requests": total,
+            "rps": round(total / elapsed, 2),
+            "p50_ms": round(percentile(lat, 50) * 1000, 2) if lat else None,
+            "p95_ms": round(percentile(lat, 95) * 1000, 2) if lat else None,
+            "p99_ms": round(percentile(lat, 99) * 1000, 2) if lat else None,
+            "error_rate": round(failed / total, 4) if total else 0.0,
+            "client_error_rate": round(client_errors / total, 4) if total else 0.0,
+            "statuses": {str(k): v for k, v in sorted(statuses.items())},
+            "transport_errors": stats.errors.get(route, {}),
+        })
+    total = sum(r["requests"] for r in rows)
+    failed = sum(r["error_rate"] * r["requests"] for r in rows)
+    print(f"\n{'route':<46}{'req':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'err%':>7}{'4xx%':>7}")
+    for r in rows:
+        fmt = lambda v: f"{v:>9.1f}" if v is not None else f"{'-':>9}"  # noqa: E731
+        print(f"{r['route']:<46}{r['requests']:>7}{r['rps']:>8.1f}{fmt(r['p50_ms'])}{fmt(r['p95_ms'])}{fmt(r['p99_ms'])}"
+              f"{r['error_rate'] * 100:>7.2f}{r['client_error_rate'] * 100:>7.2f}")
+    print(f"\nTotal: {total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s), "
+          f"error rate {failed / total * 100 if total else 0:.2f}%")
+    return {"elapsed_s": round(elapsed, 2), "requests": total, "rps": round(total / elapsed, 2), "routes": rows}
+
+
+async def in_process_client(users):
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("--in-process needs mongomock-motor (pip install mongomock-motor)")
+    import server
+    from gen_dataset import active_docs, completed_docs, new_id, seeded
+
+    server.client = AsyncMongoMockClient()
+    server.db = server.client["load_test"]
+    today = date.today()
+    # the first few accounts come with data; everyone else registers and starts empty
+    password_hash = server.pwd_context.hash(BENCH_PASSWORD)
+    for i in range(min(users, IN_PROCESS_FIXTURE_USERS)):
+        rnd = seeded(1, "user", i)
+        user_id = new_id(rnd)
+        await server.db.Users.insert_one({
+            "id": user_id, "username": f"user{i:05d}", "password_hash": password_hash,
+            "created_at": datetime.now(timezone.utc),
+        })
+        await server.db.ActiveQuests.insert_many(list(active_docs(rnd, 200, today, user_id=user_id)))
+        history = completed_docs(rnd, 2000, today - timedelta(days=90), 90, user_id=user_id)
+        await server.append_ledger(user_id, [server.ledger_entry("CompletedQuests", doc) for doc in history])
+        await server.rebuild_xp_rollups(user_id)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://load-test")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", default=os.environ.get("LOAD_TEST_URL", "http://localhost:8001"),
+                        help="server base URL (without /api)")
+    parser.add_argument("--in-process", action="store_true", help="serve the app in-process on an in-memory store")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users, one account each")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--ramp", type=float, default=0, help="seconds over which users start")
+    parser.add_argument("--connections", type=int, default=1000, help="max open connections")
+    parser.add_argument("--think", type=float, default=0.5, help="max think time between actions (seconds)")
+    parser.add_argument("--mix", help="override action weights, e.g. drag_burst=10,history=0")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--json", help="write the report as JSON here")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.in_process:
+        http = await in_process_client(args.users)
+    else:
+        http = httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                 limits=httpx.Limits(max_connections=min(args.users * 4, args.connections)))
+    stats = Stats()
+    print(f"🚀 {args.users} users for {args.duration:.0f}s against "
+          f"{'in-process app' if args.in_process else args.url} (mix: {mix})")
+    async with http:
+        t0 = time.perf_counter()
+        deadline = t0 + args.duration
+        await asyncio.gather(*(
+            User(http, stats, random.Random(f"{args.seed}:{i}"), args.think, f"user{i:05d}").run(
+                mix, deadline, args.ramp * i / args.users)
+            for i in range(args.users)
+        ))
+        elapsed = time.perf_counter() - t0
+    result = report(stats, elapsed)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"users": args.users, "duration": args.duration, "ramp": args.ramp, "mix": mix, **result}, f, indent=2)
+        print(f"📝 Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -11,6 +11,8 @@ import sys
 import random
 import string
 
+from auth_helper import auth_headers
+
 # Use the production backend URL from frontend/.env
 BASE_URL = "https://fd8786ae-2506-4181-9443-332a0afbad8b.preview.emergentagent.com/api"
 
@@ -18,6 +20,7 @@ class CategoriesHolidaysTester:
     def __init__(self):
         self.base_url = BASE_URL
         self.session = requests.Session()
+        self.session.headers.update(auth_headers(self.base_url))
         self.test_results = []
         self.created_category_id = None
         self.created_quest_id = None
@@ -161,7 +164,7 @@ class CategoriesHolidaysTester:
             return False
             
         try:
-            response = self.session.delete(f"{self.base_url}/categories/{self.created_category_id}")
+            response = self.session.delete(f"{self.base_url}/categories/{self.created_category_id}", params={"wait": "true"})
             if response.status_code == 200:
                 data = response.json()
                 if data.get("ok") is True:
@@ -236,7 +239,7 @@ class CategoriesHolidaysTester:
     def test_holidays_seed_first_time(self):
         """3) Holidays seeding - POST /api/holidays/seed-2025 once => response contains created:11, skipped:0, category_id"""
         try:
-            response = self.session.post(f"{self.base_url}/holidays/seed-2025")
+            response = self.session.post(f"{self.base_url}/holidays/seed-2025", params={"wait": "true"})
             if response.status_code == 200:
                 data = response.json()
                 created = data.get("created", 0)
@@ -264,7 +267,7 @@ class CategoriesHolidaysTester:
     def test_holidays_seed_idempotent(self):
         """3) Holidays seeding - POST /api/holidays/seed-2025 again => created:0, skipped:11"""
         try:
-            response = self.session.post(f"{self.base_url}/holidays/seed-2025")
+            response = self.session.post(f"{self.base_url}/holidays/seed-2025", params={"wait": "true"})
             if response.status_code == 200:
                 data = response.json()
                 created = data.get("created", 0)
@@ -359,7 +362,7 @@ class CategoriesHolidaysTester:
             test_quest_id = quest_response.json().get("id")
             
             # Delete the category
-            delete_response = self.session.delete(f"{self.base_url}/categories/{test_category_id}")
+            delete_response = self.session.delete(f"{self.base_url}/categories/{test_category_id}", params={"wait": "true"})
             if delete_response.status_code != 200:
                 self.log_test("Category delete unlink behavior", False, f"Failed to delete test category: {delete_response.status_code}")
                 return False
@@ -9,6 +9,8 @@ import json
 from datetime import datetime, date
 import sys
 
+from auth_helper import auth_headers
+
 # Use the production backend URL from frontend/.env
 BASE_URL = "https://fd8786ae-2506-4181-9443-332a0afbad8b.preview.emergentagent.com/api"
 
@@ -16,6 +18,7 @@ class FocusedTester:
     def __init__(self):
         self.base_url = BASE_URL
         self.session = requests.Session()
+        self.session.headers.update(auth_headers(self.base_url))
         self.test_results = []
         
     def log_test(self, test_name, success, details=""):
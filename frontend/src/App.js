@@ -28,11 +28,69 @@ function hexToRgba(hex, alpha=0.2){
   }catch{ return `rgba(0,0,0,${alpha})`; }
 }
 
+// Bearer token from /auth/login or /auth/register; a 401 anywhere signs out
+const TOKEN_KEY = "authToken";
+const getToken = () => { try{ return localStorage.getItem(TOKEN_KEY); }catch{ return null; } };
+const setToken = (token) => {
+  try{ token ? localStorage.setItem(TOKEN_KEY, token) : localStorage.removeItem(TOKEN_KEY); }catch{}
+  window.dispatchEvent(new CustomEvent('auth:change', { detail: { token } }));
+};
+
 function useApi() {
-  const api = useMemo(() => axios.create({ baseURL: API }), []);
+  const api = useMemo(() => {
+    const instance = axios.create({ baseURL: API });
+    instance.interceptors.request.use((config) => {
+      const token = getToken();
+      if (token) config.headers.Authorization = `Bearer ${token}`;
+      return config;
+    });
+    instance.interceptors.response.use(undefined, (error) => {
+      if (error?.response?.status === 401 && getToken()) setToken(null);
+      return Promise.reject(error);
+    });
+    return instance;
+  }, []);
   return api;
 }
 
+function Login(){
+  const [mode, setMode] = useState("login");
+  const [form, setForm] = useState({ username: "", password: "" });
+  const [error, setError] = useState("");
+  const submit = async (e) => {
+    e.preventDefault();
+    setError("");
+    try{
+      const { data } = await axios.post(`${API}/auth/${mode}`, form);
+      setToken(data.access_token);
+    }catch(err){
+      const detail = err?.response?.data?.detail;
+      setError(typeof detail === 'string' ? detail : (mode === 'login' ? 'Login failed' : 'Registration failed'));
+    }
+  };
+  return (
+    <div className="container" style={{maxWidth:360, marginTop:64}}>
+      <div className="card">
+        <h2>Quest Tracker</h2>
+        <form onSubmit={submit}>
+          <input className="input" placeholder="Username" autoComplete="username" value={form.username}
+            onChange={e=>setForm({...form, username: e.target.value})} style={{marginTop:8}} />
+          <input className="input" type="password" placeholder="Password" value={form.password}
+            autoComplete={mode === 'login' ? 'current-password' : 'new-password'}
+            onChange={e=>setForm({...form, password: e.target.value})} style={{marginTop:8}} />
+          {error ? <div className="small" style={{marginTop:8, color:'#B56576'}}>{error}</div> : null}
+          <div className="row" style={{marginTop:12, justifyContent:'space-between'}}>
+            <button type="button" className="btn secondary" onClick={()=>{ setMode(mode === 'login' ? 'register' : 'login'); setError(""); }}>
+              {mode === 'login' ? 'Create account' : 'Have an account?'}
+            </button>
+            <button type="submit" className="btn">{mode === 'login' ? 'Log in' : 'Register'}</button>
+          </div>
+        </form>
+      </div>
+    </div>
+  );
+}
+
 function Navbar() {
   return (
     <div className="navbar">
@@ -44,6 +102,7 @@ function Navbar() {
           <NavLink to="/rewards" className={({isActive}) => `nav-item ${isActive ? 'nav-item-active' : 'nav-item-inactive'}`}>Rewards</NavLink>
           <NavLink to="/recurring" className={({isActive}) => `nav-item ${isActive ? 'nav-item-active' : 'nav-item-inactive'}`}>Recurring</NavLink>
           <NavLink to="/rules" className={({isActive}) => `nav-item ${isActive ? 'nav-item-active' : 'nav-item-inactive'}`}>Rules</NavLink>
+          <button className="btn secondary" onClick={()=>setToken(null)}>Log out</button>
         </div>
       </div>
     </div>
@@ -618,7 +677,7 @@ function useCategories(){
     return data;
   };
   const patch = async (id, body) => { await api.patch(`/categories/${id}`, body); await load(); };
-  const remove = async (id) => { await api.delete(`/categories/${id}`); await load(); };
+  const remove = async (id) => { await api.delete(`/categories/${id}`, { params: { wait: true } }); await load(); };
   useEffect(()=>{ load(); },[]);
   return { cats, load, create, patch, remove };
 }
@@ -890,7 +949,7 @@ function ActiveQuests({ hideExtras=false }){
                     ) : (
                       <>
                         <button className="btn secondary" onClick={()=>startEdit(c)}>Edit</button>
-                        <button className="btn secondary" onClick={async ()=>{ if (confirm('Delete category? Tasks will be unlinked.')) await removeCat(c.id); }}>Delete</button>
+                        <button className="btn secondary" onClick={async ()=>{ if (confirm('Delete category? Tasks will be unlinked.')) { await removeCat(c.id); await fetchAll(); } }}>Delete</button>
                       </>
                     )}
                   </div>
@@ -1277,6 +1336,13 @@ function Rewards(){
 }
 
 function App(){
+  const [token, setTokenState] = useState(getToken());
+  useEffect(()=>{
+    const handler = (e) => setTokenState(e.detail.token);
+    window.addEventListener('auth:change', handler);
+    return () => window.removeEventListener('auth:change', handler);
+  },[]);
+  if (!token) return <Login />;
   return (
     <BrowserRouter>
       <Navbar />
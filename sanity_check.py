@@ -8,6 +8,8 @@ import requests
 import json
 from datetime import datetime, date
 
+from auth_helper import auth_headers
+
 # Use the production backend URL from frontend/.env
 BASE_URL = "https://fd8786ae-2506-4181-9443-332a0afbad8b.preview.emergentagent.com/api"
 
@@ -37,7 +39,7 @@ def test_list_quests():
     """Test GET /api/quests/active"""
     print("\n🔍 Testing GET /api/quests/active...")
     try:
-        response = requests.get(f"{BASE_URL}/quests/active")
+        response = requests.get(f"{BASE_URL}/quests/active", headers=auth_headers(BASE_URL))
         if response.status_code == 200:
             data = response.json()
             print("✅ List active quests: PASS")
@@ -7,10 +7,13 @@ import requests
 import json
 from datetime import datetime, date, timedelta
 
+from auth_helper import auth_headers
+
 BASE_URL = "https://fd8786ae-2506-4181-9443-332a0afbad8b.preview.emergentagent.com/api"
 
 def test_core_flow():
     session = requests.Session()
+    session.headers.update(auth_headers(BASE_URL))
     
     print("1. Testing health and root endpoints...")
     health = session.get(f"{BASE_URL}/health").json()